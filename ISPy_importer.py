@@ -21,6 +21,7 @@ import io
 import zipfile
 import tarfile
 import os
+import threading
 
 from contextlib import contextmanager
 from urllib import request, parse
@@ -56,6 +57,7 @@ class HttpImporter(object):
 The 'modules' parameter is a list, with the names of the modules/packages that can be imported from the given URL.
 The 'base_url' parameter is a string containing the URL where the repository/directory is served through HTTP/S
 It is better to not use this class directly, but through its wrappers ('remote_repo', 'github_repo', etc).
+The 'executor' parameter, if given, replaces the sandboxed 'exec' for running module sources: executor(source, globals, locals).
     """
 
     TAR_ARCHIVE = 'tar'
@@ -67,14 +69,16 @@ It is better to not use this class directly, but through its wrappers ('remote_r
         WEB_ARCHIVE
     ]
 
-    def __init__(self, g, cauterer, modules, base_url, zip_pwd=None):
+    def __init__(self, g, cauterer, modules, base_url, zip_pwd=None,
+                 executor=None):
         self.globals = g
         self.cauterer = cauterer
+        self.executor = executor
         self.module_names = modules
         self.base_url = base_url.strip()
         if parse.urlparse(self.base_url).netloc and self.base_url[-1] != '/':
             self.base_url += '/'
-        self.in_progress = {}
+        self.threads = threading.local()    # 'in_progress', per thread
         self.__zip_pwd = zip_pwd
 
         try:
@@ -92,6 +96,15 @@ It is better to not use this class directly, but through its wrappers ('remote_r
             self._paths = _list_archive(self.archive)
 
 
+    @property
+    def in_progress(self):
+        "Names this thread is looking up - a recursion guard"
+        try:
+            return self.threads.in_progress
+        except AttributeError:
+            self.threads.in_progress = {}
+            return self.threads.in_progress
+
     def _mod_to_filepaths(self, fullname):
         suffix = '.py'
         # get the python module name
@@ -205,9 +218,11 @@ It is better to not use this class directly, but through its wrappers ('remote_r
             mod.__path__ = ['/'.join(mod.__file__.split('/')[:-1]) + '/']
         except:
             mod.__path__ = self.base_url
-        # clone globals
+        # clone globals - a flat copy: module-level code and class bodies read
+        # globals with direct dict lookups, so a layered namespace falling back
+        # on 'self.globals' through '__missing__' would not be seen there.
+        # The cauterer seals its own copy of '__builtins__'.
         g = self.globals.copy()
-        g['__builtins__'] = g['__builtins__'].copy()
         g.update(mod.__dict__)
         self.cauterer(g)
         
@@ -219,8 +234,8 @@ It is better to not use this class directly, but through its wrappers ('remote_r
             mod = module_src.read()	# gets the entire file
         else:
             logger.debug("[+] Ready to execute '%s' code" % name)
-            self.globals['__builtins__']['exec'](module_src.decode('utf-8'), g,
-                                                 imports.copy())
+            executor = self.executor or self.globals['__builtins__']['exec']
+            executor(module_src.decode('utf-8'), g, imports.copy())
         logger.info("[+] '%s' imported succesfully!" % name)
         return mod
 
@@ -313,9 +328,10 @@ def _detect_filetype(base_url):
 
 
 class Importer:
-    def __init__(self, g, cauterer):
+    def __init__(self, g, cauterer, executor=None):
         self.globals = g
         self.cauterer = cauterer
+        self.executor = executor
         self.searchstack = []
 
     def get_loader(self, fullname):
@@ -331,7 +347,7 @@ def __loader__(name, imports={}, data=None, timeout=0):
 
     def add_remote_repo(self, names, base_url, zip_pwd=None):
         importer = HttpImporter(self.globals, self.cauterer, names, base_url,
-                                zip_pwd)
+                                zip_pwd, self.executor)
         self.searchstack.insert(0, importer)
         return importer
     def remove_remote_repo(self, importer):
@@ -4,7 +4,7 @@ import jwt
 if not '__mod' in globals():
     import sys
     globals()['__mod'] = sys.modules[__name__]
-    __main__ = sys.modules['__main__']
+    __main__ = sys.modules.get('encap') or sys.modules['__main__']
     jwt.algorithms.json = __main__.Rjson
     jwt.api_jwk.json = __main__.Rjson
     jwt.api_jws.json = __main__.Rjson
@@ -1,11 +1,18 @@
-import types
+import types, weakref, threading
 import re, json
 
 import traceback
 
+from hamt import HamtMap
+
 
 from sys import modules as sysmodules
-__main__ = sysmodules['__main__']
+# the host module - 'encap', whether imported or run as the main script
+__main__ = sysmodules.get('encap') or sysmodules['__main__']
+
+# serializes locking classes and building the shared view types, for
+# sandboxes run on several threads
+_lock = threading.RLock()
 
 # To make classes read-only, we need metaclasses.  To make the metaclasses
 # read-only, we need to block access to the most fundamental metaclass(es).
@@ -109,11 +116,13 @@ class Freeze_meta(type, metaclass=ReadOnly2_meta):
         raise RuntimeError(f"Cannot modify - class '{cls.__name__}' is locked.")
 
     def lock(cls):
-        if getattr(cls, '__locked__', None) != cls:
-            if hasattr(cls, '__Rsupermap__'):
-                cls.__Rsupermap__ = Dict(cls.__Rsupermap__).lock()
-                cls.__Rsupermap__ = cls.__Rsupermap__.as_dict(__main__.makeapi)
-            cls.__locked__ = cls
+        with _lock:
+            if getattr(cls, '__locked__', None) != cls:
+                if hasattr(cls, '__Rsupermap__'):
+                    cls.__Rsupermap__ = Dict(cls.__Rsupermap__).lock()
+                    cls.__Rsupermap__ = cls.__Rsupermap__.as_dict(
+                                            __main__.makeapi)
+                cls.__locked__ = cls
 Freeze_meta.metalock()
 
 class Object(metaclass=Freeze_meta):
@@ -125,6 +134,30 @@ class Object(metaclass=Freeze_meta):
         super().__setattr__('__proxydict__', Dict())
 
     def __getattribute__(self, attr):
+        # Most data lives in the proxy dict: look there first - without
+        # raising - unless the class itself may resolve or intercept the name
+        if type(attr) == str and attr != '__proxydict__':
+            cls = type(self)
+            names = _class_names.entries.get(id(cls))
+            if names != None:
+                proxied = not attr in names[0]
+            else:
+                proxied = not class_has(cls, attr)
+            if proxied and cls.__getattr__ is __class__.__getattr__:
+                try:
+                    d = proxy_dict(super().__getattribute__('__proxydict__'))
+                except AttributeError:  # not initialized yet
+                    d = None
+                if d != None:
+                    store, pending = d.store, d.__pending__
+                    if attr in store:
+                        if pending == None or not attr in pending:
+                            return store[attr]
+                    elif pending == None:
+                        try:
+                            return super().__getattribute__(attr)
+                        except AttributeError:
+                            raise AttributeError(attr) from None
         try:
             return super().__getattribute__(attr)
         except AttributeError:
@@ -133,7 +166,7 @@ class Object(metaclass=Freeze_meta):
     def __setattr__(self, attr, val):
         if attr in [ '__locked__', '__proxydict__' ]:
             raise AttributeError(f"Protected attribute '{attr}'")
-        if hasattr(self, attr) and not attr in self.__proxydict__:
+        if not attr in self.__proxydict__ and hasattr(self, attr):
             if getattr(self, '__locked__', False):
                 raise RuntimeError('Cannot modify - object is locked.')
             super().__setattr__(attr, val)
@@ -147,7 +180,7 @@ class Object(metaclass=Freeze_meta):
     def __delattr__(self, attr):
         if attr in [ '__locked__', '__proxydict__' ]:
             raise AttributeError(f"Protected attribute '{attr}'")
-        if hasattr(self, attr) and not attr in self.__proxydict__:
+        if not attr in self.__proxydict__ and hasattr(self, attr):
             if getattr(self, '__locked__', False):
                 raise RuntimeError('Cannot modify - object is locked.')
             super().__delattr__(attr)
@@ -172,12 +205,12 @@ class Object(metaclass=Freeze_meta):
         # remove the first and last newlines to mimic Python REPL
         return '{' + re.subn('\n[ \t]+}', ' }', jsonstr[3:-2])[0] + ' }'
 
-    def lock(self):
+    def lock(self, lazy: bool=False):
         if not self.__locked__:
             super().__setattr__('__locked__', True)
-            self.__proxydict__.lock()
+            self.__proxydict__.lock(lazy)
         return self
-    def lockdown(self, mkapi):
+    def lockdown(self, mkapi, lazy: bool=False):
         if isinstance(self.__proxydict__, Dict):
             if self.__locked__ == True:
                 raise RuntimeError(f"{__class__.__name__} - 'lock()' called " +
@@ -185,7 +218,7 @@ class Object(metaclass=Freeze_meta):
             p = self.__proxydict__
             super().__delattr__('__proxydict__')
             super().__setattr__('__proxydict__',
-                                p.lockdown(mkapi).as_dict(mkapi))
+                                p.lockdown(mkapi, lazy).as_dict(mkapi))
             super().__setattr__('__locked__', True)
         return self
     @classmethod
@@ -242,30 +275,83 @@ class Dict(metaclass=ReadOnly_meta):
         if getattr(self, '__locked__', False):
             raise RuntimeError('Cannot modify - object is locked.')
         self.__locked__ = False
+        self.__pending__ = None         # children a lazy lock has yet to do
+        self.__mkapi__ = None
         self.store = dict(*argv, **kwargs)
 
     def __repr__(self):
+        self.settle()
         return repr(self.store)
 
-    def lock(self):
+    def lock(self, lazy: bool=False):
+        """
+        Locks this object and, recursively, nested 'Dict's.  If 'lazy', the
+        nested ones are only locked when first handed out.
+        """
         if not self.__locked__:
+            if lazy:
+                pending = { i for i in self.store
+                              if issubclass(type(self.store[i]), __class__) }
+                super().__setattr__('__pending__', pending or None)
             self.__locked__ = True
+            if not lazy:
+                for i in self.store:
+                    if issubclass(type(self.store[i]), __class__):
+                        self.store[i].lock()
+        return self
+    def lockdown(self, mkapi, lazy: bool=False):
+        """
+        Locks this object and turns nested 'Dict's into 'as_dict()' views
+        (nested 'Object's are locked down).  If 'lazy', that is done for each
+        child when it is first handed out.
+        """
+        pending = None
+        if lazy:
+            pending = { i for i in self.store
+                          if issubclass(type(self.store[i]), __class__) or
+                             issubclass(type(self.store[i]), Object) } or None
+        else:
             for i in self.store:
                 if issubclass(type(self.store[i]), __class__):
-                    self.store[i].lock()
-        return self
-    def lockdown(self, mkapi):
-        for i in self.store:
-            if issubclass(type(self.store[i]), __class__):
-                self.store[i] = self.store[i].lockdown(mkapi).as_dict(mkapi)
-            elif issubclass(type(self.store[i]), Object):
-                self.store[i].lockdown(mkapi)
+                    self.store[i] = self.store[i].lockdown(mkapi).as_dict(mkapi)
+                elif issubclass(type(self.store[i]), Object):
+                    self.store[i].lockdown(mkapi)
+        super().__setattr__('__mkapi__', mkapi)
+        super().__setattr__('__pending__', pending)
         if not self.__locked__:
             self.__locked__ = True
         return self
-
+    def settle(self, *keys):
+        """
+        Does the work a lazy 'lock()'/'lockdown()' deferred for children
+        'keys' (all of them if none are given)
+        """
+        if self.__pending__ == None:
+            return self
+        with _lock:                     # re-checked: settled meanwhile?
+            pending = self.__pending__
+            if pending == None:
+                return self
+            mkapi = self.__mkapi__
+            for i in keys or list(pending):
+                if not i in pending:
+                    continue
+                child = self.store[i]
+                if mkapi == None:
+                    if issubclass(type(child), __class__):
+                        child.lock(True)
+                elif issubclass(type(child), __class__):
+                    self.store[i] = child.lockdown(mkapi, True).as_dict(mkapi)
+                elif issubclass(type(child), Object):
+                    child.lockdown(mkapi, True)
+                pending.discard(i)      # only once the value is final
+            if not pending:
+                super().__setattr__('__pending__', None)
+        return self
 
     def __getitem__(self, item):
+        if self.__pending__ != None:
+            self.settle(item)
         return self.store[item]
 
     def __setitem__(self, item, val):
@@ -305,10 +391,14 @@ class Dict(metaclass=ReadOnly_meta):
             return self.store.clear()
         raise RuntimeError('Cannot modify - object is locked.')
     def copy(self):
+        self.settle()
         return __class__(self.store.copy())
     def get(self, key, *argv):
+        if self.__pending__ != None:
+            self.settle(key)
         return self.store.get(key, *argv)
     def items(self):
+        self.settle()
         return self.store.items();
     def keys(self):
         return self.store.keys();
@@ -322,7 +412,7 @@ class Dict(metaclass=ReadOnly_meta):
         raise RuntimeError('Cannot modify - object is locked.')
     def setdefault(self, key, *argv):
         if key in self.store:
-            return self.store[key]
+            return self[key]
         if not getattr(self, '__locked__', False):
             return self.store.setfault(key, *argv)
         raise RuntimeError('Cannot modify - object is locked.')
@@ -331,8 +421,14 @@ class Dict(metaclass=ReadOnly_meta):
             return self.store.update(*argv, **kwargs)
         raise RuntimeError('Cannot modify - object is locked.')
     def values(self):
+        self.settle()
         return self.store.values()
 
+    view_methods = ('__contains__', '__getitem__', '__setitem__',
+                    '__delitem__', 'iter', 'clear', 'len', 'copy', 'get',
+                    'items', 'keys', 'pop', 'popitem', 'setdefault', 'update',
+                    'values')
+
     def make_interface(self, mkapi):
         "Returns an Object instance containing only the interface (methods)"
         intf = Object()
@@ -378,17 +474,204 @@ def fn(self, key, *argv, **kwargs):
         return intf
 
     def as_dict(self, mkapi):
-        def blocked(a):
-            raise AttributeError("'dict' object has no attribute '" + a + "'")
-        w = self.make_interface(mkapi).wrap()
-        w.__class__.__getattr__ = mkapi("fn = lambda attr: b(attr)",
-                                        b=blocked)._c
-        w.__class__.__setattr__ = mkapi("fn = lambda self, attr, v: b(attr)",
-                                        b=blocked)
-        w.__class__.__delattr__ = mkapi("fn = lambda self, attr: b(attr)",
-                                        b=blocked)
-        w.__class__.lock()
-        return w
+        """
+        Returns a 'dict'-like view forwarding to this object.  All views share
+        one precompiled type (see 'mapping_view()'); 'mkapi' is accepted for
+        compatibility only.
+        """
+        return mapping_view(self, __class__.view_methods)
+
+    def as_mapping(self):
+        '''
+        Locks and returns a read-only view of the content that reads the
+        'store' directly (see 'sealed_view()'), e.g. as '__builtins__' of
+        sandboxed code
+        '''
+        return sealed_view(self.lock().settle().store)
+
+class PDict(Dict):
+    """
+    'Dict' over a persistent map ('hamt.HamtMap'): 'copy()' is O(1), and the
+    copies share structure with the original through later updates too
+    """
+    def __init__(self, *argv, **kwargs):
+        super().__init__()
+        self.store = HamtMap(*argv, **kwargs)
+
+    def copy(self):
+        self.settle()
+        return __class__(self.store)
+
+
+class StateTable:
+    """
+    Host-side storage of per-instance state for shared sandbox-facing types.
+    Entries are keyed by 'id()' and dropped when the instance is collected, so
+    nothing reachable from the instance itself (slots, '__dict__') refers to
+    the state.
+    """
+    def __init__(self):
+        self.entries = {}
+
+    def bind(self, obj, state):
+        key = id(obj)
+        entries = self.entries
+        def drop(_):
+            entries.pop(key, None)
+        entries[key] = (state, weakref.ref(obj, drop))
+        return obj
+
+    def __len__(self):
+        return len(self.entries)
+
+
+_view_signatures = {
+    '__contains__': ('self, k', 'k'),
+    '__getitem__': ('self, i', 'i'),
+    '__setitem__': ('self, i, v', 'i, v'),
+    '__delitem__': ('self, i', 'i'),
+    'get': ('self, key, *argv', 'key, *argv'),
+    'pop': ('self, key, *argv', 'key, *argv'),
+    'setdefault': ('self, key, *argv', 'key, *argv'),
+    'update': ('self, *argv, **kwargs', '*argv, **kwargs'),
+}
+_view_types = {}
+_view_targets = {}                      # view type -> getter of a view's target
+
+def _view_repr(view, target):
+    try:
+        jsonstr = json.dumps(dict(view), indent=2, default=Object.jsondefault)
+        # remove the first and last newlines to mimic Python REPL
+        return '{' + re.subn('\n[ \t]+}', ' }', jsonstr[3:-2])[0] + ' }'
+    except TypeError:
+        return object.__repr__(target)
+
+def _blocked(a):
+    raise AttributeError("'dict' object has no attribute '" + a + "'")
+
+def _make_view_type(methods: tuple, blockget: bool):
+    # Always built with the host's 'makeapi' - a caller-supplied one would be
+    # handed the target getter.
+    mkapi = __main__.makeapi
+    cls = Freeze_meta('wrapper', (), {
+        '__slots__': ('__weakref__', '__target__'),
+        '__dict__': property(mkapi('fn = lambda self: None')) })
+    # The target's slot is only reachable through its descriptor, which
+    # leaves the class: with it, the methods get the target of a view they
+    # are handed, and nothing else.
+    slot = cls.__dict__['__target__']
+    del cls.__target__
+    T = slot.__get__
+
+    for name in methods:
+        parms, args = _view_signatures.get(name, ('self', ''))
+        setattr(cls, name, mkapi(f'fn = lambda {parms}: ' +
+                                 f'T(self).{name}({args})', T=T))
+    cls.__repr__ = mkapi('fn = lambda self: r(self, T(self))',
+                         r=_view_repr, T=T)
+    if blockget:
+        cls.__getattr__ = mkapi('fn = lambda self, attr: b(attr)', b=_blocked)
+    cls.__setattr__ = mkapi('fn = lambda self, attr, v: b(attr)', b=_blocked)
+    cls.__delattr__ = mkapi('fn = lambda self, attr: b(attr)', b=_blocked)
+
+    cls.lock()
+    _view_targets[cls] = T
+    return cls, slot.__set__
+
+def mapping_view(target, methods: tuple, blockget: bool=True):
+    """
+    Returns a read-only-interface view forwarding 'methods' to 'target'.
+    Views with the same interface share one locked type, built on first use.
+    The target is held in a slot of the view that only the type's methods
+    (and 'proxy_dict()') can read.
+    """
+    try:
+        cls, bind = _view_types[methods, blockget]
+    except KeyError:
+        with _lock:
+            if (methods, blockget) not in _view_types:
+                _view_types[methods, blockget] = _make_view_type(methods,
+                                                                 blockget)
+            cls, bind = _view_types[methods, blockget]
+    view = object.__new__(cls)
+    bind(view, target)
+    return view
+
+# the methods of a sealed view, closing over its 'store' only
+_SEALED_METHODS = """
+def fn(store):
+  def blocked(self, attr, *argv):
+    b(attr)
+  return { '__slots__': ('__weakref__',),
+           '__contains__': lambda self, k: k in store,
+           '__getitem__': lambda self, i: store[i],
+           '__iter__': lambda self: store.__iter__(),
+           '__len__': lambda self: store.__len__(),
+           'get': lambda self, key, *argv: store.get(key, *argv),
+           'copy': lambda self: store.copy(),
+           'keys': lambda self: store.copy().keys(),
+           'items': lambda self: store.copy().items(),
+           'values': lambda self: store.copy().values(),
+           '__repr__': lambda self: r(self, self),
+           '__dict__': P(lambda self: None),
+           '__getattr__': blocked, '__setattr__': blocked,
+           '__delattr__': blocked }
+"""
+_sealed_methods = None
+
+def sealed_view(store: dict):
+    """
+    A read-only view of 'store' whose lookups the interpreter makes without
+    a detour through a 'Dict' - for '__builtins__'.  Unlike a 'mappingproxy',
+    it hands 'store' to nobody: not to the other operand of '==' or '|', nor
+    through a 'dict' view's '.mapping' ('keys()' and the like are of a copy).
+    Each view has a locked type of its own, whose methods know 'store' only.
+    """
+    global _sealed_methods
+    if _sealed_methods == None:
+        with _lock:
+            if _sealed_methods == None:
+                _sealed_methods = __main__.makeapi(_SEALED_METHODS,
+                                                   b=_blocked, r=_view_repr,
+                                                   P=property)
+    cls = Freeze_meta('wrapper', (), _sealed_methods(store))
+    cls.lock()
+    return object.__new__(cls)
+
+_class_names = StateTable()             # locked class -> attribute names
+
+def class_has(cls, attr):
+    """
+    Whether instances of 'cls' resolve 'attr' through their class (if not,
+    'hasattr(cls, attr)' may still be True - a false positive only).  The
+    names are cached once 'cls' and all its bases are locked.
+    """
+    entry = _class_names.entries.get(id(cls))
+    if entry != None:
+        return attr in entry[0]
+    if getattr(cls, '__locked__', None) == cls:
+        mro = type.__dict__['__mro__'].__get__(cls)
+        if all(c == object or getattr(c, '__locked__', None) == c
+               for c in mro):
+            names = frozenset(k for c in mro
+                                for k in type.__dict__['__dict__'].__get__(c))
+            _class_names.bind(cls, names)
+            return attr in names
+    return hasattr(cls, attr)
+
+def proxy_dict(p):
+    """
+    The 'Dict' behind a proxy dict - a 'Dict' or a view of one - or None.
+    Keys in its '__pending__' must be read through it, not its 'store'.
+    """
+    if type(p) != Dict:
+        target = _view_targets.get(type(p))
+        if target == None:
+            return None
+        p = target(p)
+        if type(p) != Dict:
+            return None
+    return p
 
 def HideBases(to_hide: tuple, *bases):
     if type(to_hide) != tuple or not all(isinstance(i, type) for i in to_hide):
@@ -453,6 +736,16 @@ def HideBases(to_hide: tuple, *bases):
 
     return hbcls
 
+_tracebacks = threading.local()
+
+def _traceback_grants():
+    "'id()'s of the 'RException's whose tracebacks this thread may read"
+    try:
+        return _tracebacks.granted
+    except AttributeError:
+        _tracebacks.granted = set()
+        return _tracebacks.granted
+
 class RException(BaseException,
                  metaclass=HideBases((BaseException,)).metalock()):
     "Exception replacement that does not leak the global scope"
@@ -461,14 +754,22 @@ class RException(BaseException,
         self.access_verify = None
 
     def with_traceback(self, tb):
-        self.access_verify = __main__.Interact.prog
-        ret = super().with_traceback(tb)
-        self.access_verify = None
-        return ret
+        # grants access to this thread only - not to sandboxes running on
+        # others while it lasts
+        granted = _traceback_grants()
+        regrant = id(self) in granted
+        granted.add(id(self))
+        try:
+            return super().with_traceback(tb)
+        finally:
+            if not regrant:
+                granted.discard(id(self))
 
     @property
     def __traceback__(self):
-        if self.access_verify == __main__.Interact.prog:
+        if id(self) in _traceback_grants() or\
+           (self.access_verify != None and
+            self.access_verify == getattr(__main__.Interact, 'prog', None)):
             return super().__traceback__
         return traceback.format_tb(super().__traceback__)
 #RException.lock()
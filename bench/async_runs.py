@@ -0,0 +1,57 @@
+'''
+'Sandbox.run_async()' from an event loop: its overhead over 'run()', many
+sandboxes awaited with 'asyncio.gather()', how long a run past its deadline
+takes to be stopped, and how late the loop's own timers fire meanwhile.
+'''
+
+import time, asyncio
+
+from harness import load_encap, best_of, report
+
+encap = load_encap()
+
+N = 200
+SANDBOXES = 10
+SOURCE = "sum(i * i for i in range(2000))"
+SPIN = 'while True:\n    pass'
+
+async def lag(samples: list):
+    "Records how late a 1 ms sleep wakes up, until cancelled"
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        samples.append(time.perf_counter() - start - 0.001)
+
+async def main():
+    sandbox = encap.Sandbox.create()
+    report('run()', best_of(lambda: sandbox.run(SOURCE), number=N), N, 'run')
+    await sandbox.run_async(SOURCE)     # its thread is started
+    start = time.perf_counter()
+    for _ in range(N):
+        await sandbox.run_async(SOURCE)
+    report('await run_async(), one at a time', time.perf_counter() - start,
+           N, 'run')
+
+    sandboxes = [ encap.Sandbox.create() for _ in range(SANDBOXES) ]
+    samples = []
+    ticker = asyncio.create_task(lag(samples))
+    start = time.perf_counter()
+    for _ in range(N // SANDBOXES):
+        await asyncio.gather(*(s.run_async(SOURCE) for s in sandboxes))
+    elapsed = time.perf_counter() - start
+    ticker.cancel()
+    report(f"gather() over {SANDBOXES} sandboxes", elapsed, N, 'run')
+    samples.sort()
+    report('  loop timer lateness, p50', samples[len(samples) // 2],
+           unit='tick')
+    report('  loop timer lateness, max', samples[-1], unit='tick')
+
+    for timeout in [ 0.01, 0.1 ]:
+        start = time.perf_counter()
+        res = await sandbox.run_async(SPIN, timeout=timeout)
+        assert type(res.error) == TimeoutError
+        await sandbox.run_async('None')   # the spinning run has stopped
+        report(f"deadline {timeout} s, until the sandbox is free",
+               time.perf_counter() - start - timeout, unit='stop')
+
+asyncio.run(main())
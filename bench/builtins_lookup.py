@@ -0,0 +1,33 @@
+'''
+Cost of builtin name lookups (LOAD_GLOBAL falling through to __builtins__)
+in sandboxed code: the locked 'Dict.as_dict()' wrapper used previously,
+versus the 'Dict.as_mapping()' view that 'cauterize()' installs now.
+'''
+
+from harness import load_encap, best_of, report
+
+encap = load_encap()
+
+N = 200000
+LOOP = f'''
+def loop(n):
+    t = 0
+    for i in range(n):
+        t += len(s) + abs(i) + min(i, 1)
+    return t
+result = loop({N})
+'''
+
+def sandbox_globals(builtins):
+    b = encap.gBuiltIns.copy()
+    return encap.Globals({ '__builtins__': builtins(b), '__name__': 'bench',
+                           's': 'abc' })
+
+for label, builtins in [
+        ('as_dict() wrapper', lambda b: b.as_dict(encap.makeapi)),
+        ('as_mapping() view', lambda b: b.as_mapping()),
+        ('plain dict (no write protection)', lambda b: dict(b.store)) ]:
+    g = sandbox_globals(builtins)
+    cache = encap.LRUCache()
+    t = best_of(lambda: encap.Rexec(LOOP, 'exec', g, {}, cache=cache))
+    report(label, t, N, 'iteration')
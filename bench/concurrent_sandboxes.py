@@ -0,0 +1,121 @@
+'''
+Dozens of sandboxes in one process, run by a thread pool: every job builds a
+'Sandbox' with its own input, imports a module, formats, raises, round-trips
+JSON and sums - its result is checked against that input, so crosstalk
+through the host's shared caches and tables shows as a wrong answer.  First
+16 threads start at once, cold, racing to build the lazy module namespaces;
+then throughput at 1 to 8 threads.  tests/test_lazy_threads.py runs the
+same jobs, and the traceback crosstalk check, as part of the test suite.
+
+Under a GIL, threads add correctness risk but no throughput; a free-threaded
+build (3.13t+) should scale.  This script reruns itself under the first one
+found on the PATH, if it is not running on one.
+'''
+
+import os, sys, time, shutil, subprocess, threading
+from concurrent.futures import ThreadPoolExecutor
+
+from harness import ROOT, load_encap, report
+
+encap = load_encap()
+
+N = 48
+THREADS = [ 1, 2, 4, 8 ]
+SOURCE = '''
+import hello2
+words = []
+for i in range(50):
+    words.append('{0}-{1:>4}'.format(n, i))
+d = Dict({ 'n': n })
+try:
+    1 / 0
+except:
+    err = n
+square = sum(i * i for i in range(20000))
+result = (len(words), words[-1], d['n'], err,
+          json.loads(json.dumps({ 'n': n }))['n'], square)
+'''
+SQUARE = sum(i * i for i in range(20000))
+COLD = 16
+COLD_SOURCE = '''
+for ns in [ random, types, json, math, re ]:
+    for name in dir(ns):
+        getattr(ns, name)
+r = random.choice([ n ])
+t = types.SimpleNamespace(n=n).n
+j = json.loads(json.dumps([ n ]))[0]
+result = (r, t, j)
+'''
+
+def job(n: int):
+    "Wrong answers and errors of one sandbox, as text (None if it is right)"
+    sandbox = encap.Sandbox.create(n=n)
+    res = sandbox.run(SOURCE)
+    if res.error == None:
+        res = sandbox.run('result')
+    if res.error != None:
+        return f'job {n}: {type(res.error).__name__}: {res.error}'
+    expected = (50, f'{n}-  49', n, n, n, SQUARE)
+    if res.value != expected:
+        return f'job {n}: {res.value!r} != {expected!r}'
+    return None
+
+def cold_start():
+    "Wrong answers of COLD sandboxes first using the namespaces, all at once"
+    barrier = threading.Barrier(COLD)
+    def first(n: int):
+        sandbox = encap.Sandbox.create(n=n)
+        barrier.wait()
+        res = sandbox.run(COLD_SOURCE)
+        if res.error == None:
+            res = sandbox.run('result')
+        if res.error != None:
+            return f'cold job {n}: {type(res.error).__name__}: {res.error}'
+        if res.value != (n, n, n):
+            return f'cold job {n}: {res.value!r} != {(n, n, n)!r}'
+        return None
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)         # a GIL changes hands at every chance
+    try:
+        with ThreadPoolExecutor(COLD) as pool:
+            start = time.perf_counter()
+            errors = [ e for e in pool.map(first, range(COLD)) if e != None ]
+            report(f"{COLD} threads, cold start", time.perf_counter() - start,
+                   COLD, 'job')
+    finally:
+        sys.setswitchinterval(interval)
+    return errors
+
+gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}")
+cwd = os.getcwd()
+os.chdir(os.path.join(ROOT, 'run'))     # 'file:' modules are local
+try:
+    failures = cold_start()             # before anything warms them up
+    base = None
+    for threads in THREADS:
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(job, range(threads)))  # threads are started
+            start = time.perf_counter()
+            errors = [ e for e in pool.map(job, range(N)) if e != None ]
+            elapsed = time.perf_counter() - start
+        failures += errors
+        base = base or elapsed
+        report(f"{threads} threads, {N} sandboxes", elapsed, N, 'job')
+        print(f"{'  speedup over 1 thread':44} {base / elapsed:10.2f} x")
+finally:
+    os.chdir(cwd)
+
+print(f"{'wrong results / errors':44} {len(failures):10}")
+for failure in failures[:10]:
+    print('  ' + failure)
+
+if gil and not os.environ.get('SANDPY_BENCH_RERUN'):
+    for exe in [ 'python3.14t', 'python3.13t' ]:
+        path = shutil.which(exe)
+        if path:
+            print(f"\nrerunning under {exe}:")
+            subprocess.run([ path, __file__ ], env=dict(os.environ,
+                           PYTHON_GIL='0', SANDPY_BENCH_RERUN='1'))
+            break
+sys.exit(1 if failures else 0)
@@ -0,0 +1,69 @@
+'''
+Requests to the sandbox daemon ('sandboxd.py') over its Unix socket: one
+client's round trips, then many clients pipelining requests - throughput,
+and the daemon's own latency percentiles - against starting a process per
+request (the batch CLI running one script).
+'''
+
+import os, sys, json, time, signal, asyncio, tempfile, subprocess
+
+from harness import ROOT, load_encap, best_of, report
+
+load_encap()
+from sandboxd import Client, gDecoder
+
+N = 2000
+CLIENTS = 8
+SOURCE = "sum(i * i for i in range(2000))"
+
+async def pipelined(path: str, count: int):
+    "One connection sending 'count' requests at once, reading every reply"
+    reader, writer = await asyncio.open_unix_connection(path)
+    for i in range(count):
+        writer.write(json.dumps({ 'op': 'run', 'id': i, 'tenant': 'bench',
+                                  'source': SOURCE }).encode() + b'\n')
+    await writer.drain()
+    for _ in range(count):
+        reply = gDecoder.decode((await reader.readline()).decode())
+        assert reply['error'] == None, reply
+    writer.close()
+
+async def clients(path: str):
+    await asyncio.gather(*(pipelined(path, N // CLIENTS)
+                           for _ in range(CLIENTS)))
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, 'sandboxd.sock')
+    daemon = subprocess.Popen([ sys.executable,
+                                os.path.join(ROOT, 'sandboxd.py'), path ],
+                              cwd=os.path.join(ROOT, 'run'))
+    try:
+        while not os.path.exists(path):
+            time.sleep(0.05)
+        with Client(path) as client:
+            for _ in range(20):         # every worker is ready
+                client.run(SOURCE)
+            t = best_of(lambda: client.run(SOURCE), repeat=5, number=100)
+            report('daemon, one client, round trip', t, 100, 'request')
+
+            start = time.perf_counter()
+            asyncio.run(clients(path))
+            elapsed = time.perf_counter() - start
+            report(f"daemon, {CLIENTS} clients pipelining", elapsed, N,
+                   'request')
+            print(f"{'throughput':44} {N / elapsed:10.1f} jobs/s")
+            stats = client.stats()
+        for key in [ 'p50', 'p95', 'p99', 'max' ]:
+            report(f"queue latency, {key}", stats['latency'][key], unit='job')
+            report(f"turnaround, {key}", stats['turnaround'][key], unit='job')
+    finally:
+        daemon.send_signal(signal.SIGTERM)
+        daemon.wait()
+
+    script = os.path.join(tmp, 'job.py')
+    with open(script, 'w') as f:
+        f.write(SOURCE)
+    cli = [ sys.executable, os.path.join(ROOT, 'encap.py'), script ]
+    t = best_of(lambda: subprocess.run(cli, check=True,
+                                       stdout=subprocess.DEVNULL), repeat=3)
+    report('process per request (batch CLI)', t, unit='request')
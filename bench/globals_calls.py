@@ -0,0 +1,25 @@
+'''
+Sandboxed code reading its namespace through 'globals()' in a loop (as
+'run/hello.py' does), against plain global name lookups in the same loop.
+'''
+
+from harness import load_encap, best_of, report
+
+encap = load_encap()
+
+N = 50000
+CASES = [ "globals()['x']", "'x' in globals()", 'x' ]
+
+g = encap.Globals({ '__builtins__': encap.gBuiltIns.copy(),
+                    '__name__': 'bench', 'x': 1 })
+encap.cauterize(g)
+cache = encap.LRUCache()
+for expr in CASES:
+    src = f'''
+def run():
+    for i in range({N}):
+        {expr}
+run()
+'''
+    t = best_of(lambda: encap.Rexec(src, 'exec', g, cache=cache))
+    report(f"sandbox, {expr}", t, N, 'call')
@@ -0,0 +1,39 @@
+'''
+Shared setup for the benchmarks in this directory.  Run them from anywhere,
+e.g. "python3 bench/builtins_lookup.py"; they need the same environment as
+"run/__start__" (pyjwt, the Rwasmtime submodule).
+'''
+
+import os, sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_encap():
+    "Imports the sandbox host ('encap.py') - the challenge shell is not started"
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import encap
+    return encap
+
+
+def best_of(fn, repeat=5, number=1):
+    "Best wall time of 'number' calls to fn(), over 'repeat' rounds"
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if best == None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def report(label, seconds, per=1, unit='op'):
+    value, scale = seconds / per, 'ns'
+    for scale, factor in [ ('ns', 1e9), ('us', 1e6), ('ms', 1e3) ]:
+        if value * factor < 10000:
+            break
+    print(f"{label:<44} {value * factor:10.1f} {scale}/{unit}")
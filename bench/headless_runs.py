@@ -0,0 +1,48 @@
+'''
+The headless API as a job runner drives it: creating a 'Sandbox', 'run()'
+of small scripts in an existing one, a fresh sandbox importing a module -
+and the batch CLI as a fresh process.
+'''
+
+import os, subprocess, sys, tempfile
+
+from harness import ROOT, load_encap, best_of, report
+
+encap = load_encap()
+
+N = 200
+SCRIPTS = [ ('statements', 'x = [ i * i for i in range(10) ]\ny = sum(x)\n'),
+            ('expression', "json.dumps({ 'a': math.sqrt(2) })") ]
+
+report('Sandbox.create()', best_of(encap.Sandbox.create, repeat=5),
+       unit='sandbox')
+cwd = os.getcwd()
+os.chdir(os.path.join(ROOT, 'run'))     # 'file:' modules are local
+try:
+    for label, source in SCRIPTS:
+        def runs():
+            sandbox = encap.Sandbox.create()
+            for _ in range(N):
+                res = sandbox.run(source)
+                assert res.error == None, res.error
+        report(f"run(), {label}", best_of(runs, repeat=3), N, 'run')
+    def imports():
+        for _ in range(N // 10):
+            res = encap.Sandbox.create().run('import hello2')
+            assert res.error == None, res.error
+    report('create(), run() of an import', best_of(imports, repeat=3),
+           N // 10, 'sandbox')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for label, source in SCRIPTS + [ ('import', 'import hello2') ]:
+            paths.append(os.path.join(tmp, label + '.py'))
+            with open(paths[-1], 'w') as f:
+                f.write(source)
+        cli = [ sys.executable, os.path.join(ROOT, 'encap.py'), *paths ]
+        t = best_of(lambda: subprocess.run(cli, check=True,
+                                           stdout=subprocess.DEVNULL),
+                    repeat=3)
+        report(f"CLI batch of {len(paths)} scripts", t, unit='process')
+finally:
+    os.chdir(cwd)
@@ -0,0 +1,41 @@
+'''
+Cost of freezing a large nested configuration tree ('Dict's of 'Dict's)
+with 'lockdown()', eagerly and lazily, when the sandbox then reads only a
+few branches: time for lockdown plus reads, and memory the lockdown adds.
+'''
+
+import tracemalloc
+
+from harness import load_encap, best_of, report
+
+encap = load_encap()
+
+DEPTH, FANOUT = 4, 8                    # 4096 leaves, 4681 'Dict's
+READS = 10
+
+def tree(depth):
+    if depth == 0:
+        return encap.Dict({ 'value': 1 })
+    return encap.Dict({ f'k{i}': tree(depth - 1) for i in range(FANOUT) })
+
+def freeze_and_read(t, lazy):
+    t.lockdown(encap.makeapi, lazy)
+    for i in range(READS):
+        node = t
+        for _ in range(DEPTH):
+            node = node[f'k{i % FANOUT}']
+        node['value']
+    return t
+
+for lazy in (False, True):
+    label = 'lazy' if lazy else 'eager'
+    trees = [ tree(DEPTH) for _ in range(3) ]
+    report(f"lockdown() + {READS} reads, {label}",
+           best_of(lambda: freeze_and_read(trees.pop(), lazy), repeat=3))
+    t = tree(DEPTH)
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    freeze_and_read(t, lazy)
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    print(f"{'memory added by lockdown, ' + label:40} {used / 1024:10.1f} kB")
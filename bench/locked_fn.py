@@ -0,0 +1,39 @@
+'''
+Cost of 'LockedFn' wrappers: wrapping every plain function of the standard
+modules the sandbox exposes, memory retained per wrapper, and call overhead
+compared with calling the function directly.
+'''
+
+import types, math, random, datetime, re, json
+import tracemalloc
+
+from harness import load_encap, best_of, report
+
+encap = load_encap()
+
+fns = [ f for m in (types, math, random, datetime, re, json)
+          for f in vars(m).values() if isinstance(f, types.FunctionType) ]
+
+def wrap_all():
+    return [ encap.LockedFn(f) for f in fns ]
+
+wrap_all()                              # warm up
+report(f"LockedFn() x {len(fns)}", best_of(wrap_all), len(fns), 'fn')
+
+tracemalloc.start()
+base = tracemalloc.get_traced_memory()[0]
+wrapped = wrap_all()
+used = tracemalloc.get_traced_memory()[0] - base
+tracemalloc.stop()
+print(f"{'memory retained':40} {used / len(fns):10.1f} B/fn")
+
+N = 100000
+def plain():
+    f = re.escape
+    for _ in range(N):
+        f('a')
+def locked(f=encap.LockedFn(re.escape)):
+    for _ in range(N):
+        f('a')
+report("direct call", best_of(plain), N, 'call')
+report("LockedFn call", best_of(locked), N, 'call')
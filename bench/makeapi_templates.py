@@ -0,0 +1,28 @@
+'''
+Cost of generating 'makeapi' wrappers: locking down one 'Dict' view
+('Dict.as_dict()') and sealing a fresh sandbox namespace ('cauterize()'),
+with the compiled-template cache of 'API_FnBind' disabled and enabled.
+'''
+
+from harness import load_encap, best_of, report
+
+encap = load_encap()
+
+def as_dict():
+    encap.Dict({ 'a': 1, 'b': 2 }).as_dict(encap.makeapi)
+
+def session():
+    g = encap.Globals({ '__builtins__': encap.gBuiltIns.copy(),
+                        '__name__': 'bench' })
+    encap.cauterize(g)
+
+cache = encap.gFnBindCache
+for label, size in [ ('template cache off', 0),
+                     ('template cache on', 1024) ]:
+    cache.clear()
+    cache.maxsize = size
+    as_dict()                           # warm up
+    report(f"Dict.as_dict(), {label}", best_of(as_dict, number=100), 100)
+    session()
+    report(f"cauterize(), {label}", best_of(session, number=10), 10)
+print(cache)
@@ -0,0 +1,28 @@
+'''
+Cost of read-only 'dict' views ('Dict.as_dict()'): creation time and memory
+retained per view, for views over many small locked dicts (module
+namespaces, '__Rsupermap__' tables, library wrappers).
+'''
+
+import tracemalloc
+
+from harness import load_encap, best_of, report
+
+encap = load_encap()
+
+N = 1000
+dicts = [ encap.Dict({ 'a': i, 'b': str(i) }).lock() for i in range(N) ]
+
+def make_views():
+    return [ d.as_dict(encap.makeapi) for d in dicts ]
+
+make_views()                            # warm up (builds the shared type)
+report(f"Dict.as_dict() x {N}", best_of(make_views, number=1), N, 'view')
+
+tracemalloc.start()
+base = tracemalloc.get_traced_memory()[0]
+views = make_views()
+used = tracemalloc.get_traced_memory()[0] - base
+tracemalloc.stop()
+print(f"{'memory retained':40} {used / N:10.1f} B/view")
+print(f"{'distinct view types':40} {len({ type(v) for v in views }):10}")
@@ -0,0 +1,51 @@
+'''
+A session importing 200 small modules through the sandbox importer: time
+per 'load_module()', and the memory the loaded modules keep (each module
+keeps its namespace alive through a function it exports).
+'''
+
+import os, tempfile, tracemalloc
+
+from harness import load_encap, best_of, report
+
+encap = load_encap()
+
+N = 200
+SOURCE = '''
+def f(x):
+  return len(x)
+__mod.f = f
+'''
+
+def session():
+    "A sealed sandbox namespace and its importer, as 'Interact' builds them"
+    g = encap.Globals({ '__builtins__': encap.gBuiltIns.copy(),
+                        '__name__': '__?none?__',
+                        'fn': encap.LockedFn(encap.LockedFn),
+                        'math': encap.Rmath,
+                        'json': encap.Rjson,
+                        'Exception': encap.RException })
+    return encap.cauterize(g).importer
+
+with tempfile.TemporaryDirectory() as tmp:
+    names = [ f'm{i}' for i in range(N) ]
+    for name in names:
+        with open(os.path.join(tmp, name + '.py'), 'w') as f:
+            f.write(SOURCE)
+
+    def load_all():
+        with session().remote_repo(names, 'file://' + tmp + '/') as imp:
+            loader = imp.searchstack[0]
+            return [ loader.load_module(name) for name in names ]
+
+    report(f"load_module(), {N} modules", best_of(load_all, repeat=3),
+           per=N, unit='module')
+    load_all()                          # warm the code and format caches
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    mods = load_all()
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    assert mods[-1].f('abc') == 3
+    print(f"{'memory kept, ' + str(N) + ' modules':40} {used / 1024:10.1f} kB")
+    print(f"{'memory kept per module':40} {used / 1024 / N:10.1f} kB")
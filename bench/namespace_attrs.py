@@ -0,0 +1,34 @@
+'''
+Sandboxed inner loops calling into the exported standard library
+namespaces ('math.sqrt', 'random.random', 'json.dumps'), against the same
+loop over the plain modules outside the sandbox.
+'''
+
+import math, random, json
+
+from harness import load_encap, best_of, report
+
+encap = load_encap()
+
+N = 50000
+CASES = [ ('math.sqrt(i)', 'math'), ('math.pi', 'math'),
+          ('random.random()', 'random'), ('json.dumps(i)', 'json') ]
+
+g = encap.Globals({ '__builtins__': encap.gBuiltIns.copy(),
+                    '__name__': 'bench', 'math': encap.Rmath,
+                    'random': encap.Rrandom, 'json': encap.Rjson })
+encap.cauterize(g)
+cache = encap.LRUCache()
+plain = { 'math': math, 'random': random, 'json': json }
+for expr, module in CASES:
+    src = f'''
+def run():
+    for i in range({N}):
+        {expr}
+run()
+'''
+    t = best_of(lambda: encap.Rexec(src, 'exec', g.copy(), cache=cache))
+    report(f"sandbox, {expr}", t, N, 'call')
+    code = compile(src, 'bench', 'exec')
+    t = best_of(lambda: exec(code, dict(plain)))
+    report(f"plain module, {expr}", t, N, 'call')
@@ -0,0 +1,46 @@
+'''
+Attribute reads and writes on 'bases.Object' instances, whose data lives
+in the proxy dict: unlocked, after 'lock()' and after 'lockdown()'.  Class
+attributes (methods) are read for comparison.
+'''
+
+from harness import load_encap, best_of, report
+
+encap = load_encap()
+
+N = 100000
+
+def make():
+    o = encap.Object()
+    o.x = 1
+    o.y = 'abc'
+    return o
+
+def reads(o):
+    def run():
+        for _ in range(N):
+            o.x
+    return run
+def method_reads(o):
+    def run():
+        for _ in range(N):
+            o.lock
+    return run
+def writes(o):
+    def run():
+        for i in range(N):
+            o.x = i
+    return run
+
+plain, locked, lockeddown = make(), make().lock(), make().lockdown(encap.makeapi)
+report("read, unlocked", best_of(reads(plain)), N, 'read')
+report("read, lock()ed", best_of(reads(locked)), N, 'read')
+report("read, lockdown()ed", best_of(reads(lockeddown)), N, 'read')
+report("read class attribute", best_of(method_reads(plain)), N, 'read')
+report("write existing attribute", best_of(writes(plain)), N, 'write')
+
+def new_attrs():
+    o = encap.Object()
+    for i in range(100):
+        o.__setattr__(f'a{i}', i)
+report("write new attribute", best_of(new_attrs, number=100), 10000, 'write')
@@ -0,0 +1,48 @@
+'''
+A sandbox importing a package of 50 modules: 'pkg/__init__.py' imports its 49
+submodules, so every module's namespace is sealed ('cauterize()') on the way.
+'''
+
+import os, tempfile
+
+from harness import load_encap, best_of, report
+
+encap = load_encap()
+
+N = 50
+SUBMODULE = '''
+def f(x):
+  return len(x) + {i}
+__mod.f = f
+'''
+
+def session():
+    "A sealed sandbox namespace and its cauterizer, as 'Interact' builds them"
+    g = encap.Globals({ '__builtins__': encap.gBuiltIns.copy(),
+                        '__name__': '__?none?__',
+                        'fn': encap.LockedFn(encap.LockedFn),
+                        'math': encap.Rmath,
+                        'json': encap.Rjson,
+                        'Exception': encap.RException })
+    return encap.cauterize(g)
+
+with tempfile.TemporaryDirectory() as tmp:
+    os.mkdir(os.path.join(tmp, 'pkg'))
+    names = [ f'm{i}' for i in range(N - 1) ]
+    for i, name in enumerate(names):
+        with open(os.path.join(tmp, 'pkg', name + '.py'), 'w') as f:
+            f.write(SUBMODULE.format(i=i))
+    with open(os.path.join(tmp, 'pkg', '__init__.py'), 'w') as f:
+        f.write(''.join(f'import pkg.{name} as {name}\n' for name in names))
+
+    def load_package():
+        with session().importer.remote_repo(['pkg'],
+                                            'file://' + tmp + '/') as imp:
+            return imp.searchstack[0].load_module('pkg')
+
+    pkg = load_package()
+    assert getattr(pkg, names[-1]).f('abc') == N + 1
+    report(f"import package, {N} modules", best_of(load_package, repeat=5),
+           per=N, unit='module')
+    report(f"import package, {N} modules", best_of(load_package, repeat=5),
+           unit='package')
@@ -0,0 +1,45 @@
+'''
+Deriving many slightly different namespaces from a common base, as the
+importer does per module: copy the base and set a few names.  'Dict'
+copies the whole mapping each time; 'PDict' shares it.  Lookups in the
+result are shown too.
+'''
+
+import builtins, tracemalloc
+
+from harness import load_encap, best_of, report
+
+encap = load_encap()
+from bases import Dict, PDict
+
+N = 2000
+BASES = [ ('builtins', dict(vars(builtins))),
+          ('5000 names', { f'name{i}': i for i in range(5000) }) ]
+
+def derive(cls, base):
+    out = []
+    for i in range(N):
+        d = base.copy()
+        d['__name__'] = f'mod{i}'
+        d['__file__'] = f'/srv/mod{i}.py'
+        d['__mod'] = i
+        out.append(d)
+    return out
+
+for name, content in BASES:
+    for cls in (Dict, PDict):
+        base = cls(content)
+        label = f"{cls.__name__}, {name}"
+        report(f"{label}: derive", best_of(lambda: derive(cls, base), repeat=3),
+               N, 'namespace')
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        kept = derive(cls, base)
+        used = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        print(f"{label + ': memory':40} {used / N:10.1f} B/namespace")
+        d = kept[-1]
+        report(f"{label}: lookup",
+               best_of(lambda: [ d['__name__'] for _ in range(10000) ]),
+               10000, 'lookup')
+        del kept
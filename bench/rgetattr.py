@@ -0,0 +1,34 @@
+'''
+Cost of the audited attribute access sandboxed code goes through: the
+'getattr()' builtin and '__getattribute__' calls, which the parser rewrites
+into 'Rgetattr', for a few typical result types.
+'''
+
+from harness import load_encap, best_of, report
+
+encap = load_encap()
+
+N = 50000
+CASES = [ ('getattr(), int attribute', "getattr(i, 'real')"),
+          ('getattr(), method', "getattr(s, 'upper')"),
+          ('getattr(), instance attribute', "getattr(o, 'x')"),
+          ('__getattribute__(), instance attribute',
+           "o.__getattribute__('x')"),
+          ('getattr(), tuple attribute', "getattr(o, 't')") ]
+
+g = encap.Globals({ '__builtins__': encap.gBuiltIns.copy(),
+                    '__name__': 'bench' })
+encap.cauterize(g)
+cache = encap.LRUCache()
+SETUP = '''
+class C:
+    def __init__(self):
+        self.x = 1
+        self.t = (1, 2)
+o = C()
+s = 'abc'
+'''
+for label, expr in CASES:
+    src = SETUP + f'result = [ {expr} for i in range({N}) ]'
+    t = best_of(lambda: encap.Rexec(src, 'exec', g.copy(), cache=cache))
+    report(label, t, N, 'access')
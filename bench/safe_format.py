@@ -0,0 +1,31 @@
+'''
+Cost of 'str.format()'/'format_map()' in sandboxed code, which the parser
+routes through 'safe_format'/'safe_format_map', for templates with and
+without attribute lookups in their fields.  Native 'str.format' is shown
+for reference.
+'''
+
+from harness import load_encap, best_of, report
+
+encap = load_encap()
+
+N = 20000
+TEMPLATES = [ ('positional/keyword fields', "'{} {:>8.3f} {name!r}'",
+               "(i, 1.5, name='n')"),
+              ('nested format spec', "'{0:{1}}'", "(i, 8)"),
+              ('attribute field', "'{0.real} {0.imag}'", "(i,)") ]
+
+g = encap.Globals({ '__builtins__': encap.gBuiltIns.copy(),
+                    '__name__': 'bench' })
+encap.cauterize(g)
+cache = encap.LRUCache()
+for label, fmt, args in TEMPLATES:
+    native = eval(f'lambda: [ {fmt}.format{args} for i in range({N}) ]')
+    report(f"native, {label}", best_of(native), N, 'call')
+    src = f'result = [ {fmt}.format{args} for i in range({N}) ]'
+    t = best_of(lambda: encap.Rexec(src, 'exec', g.copy(), {}, cache=cache))
+    report(f"sandbox, {label}", t, N, 'call')
+src = f"m = {{ 'a': 1, 'b': 2 }}\n" +\
+      f"result = [ '{{a}}-{{b}}'.format_map(m) for i in range({N}) ]"
+t = best_of(lambda: encap.Rexec(src, 'exec', g.copy(), cache=cache))
+report("sandbox, format_map()", t, N, 'call')
@@ -0,0 +1,63 @@
+'''
+Process start-up, for tracking across releases: a fresh interpreter
+importing the sandbox host ('import encap', which loads no IPython) against
+a bare interpreter - wall time, peak RSS, and the time to the first result
+of sandboxed code ('Sandbox.create()' and a first 'run()').  Then, in this
+process, the cost of a sandbox first touching an exported namespace - what
+start-up no longer pays for.
+'''
+
+import json, subprocess, sys, time
+
+from harness import ROOT, load_encap, best_of, report
+
+PROBE = f'''
+import json, resource, sys, time
+start = time.perf_counter()
+if 'import' in sys.argv:
+    sys.path.insert(0, {ROOT!r})
+    import encap
+imported = time.perf_counter()
+if 'run' in sys.argv:
+    assert encap.Sandbox.create().run('math.sqrt(4)').value == 2.0
+ran = time.perf_counter()
+print(json.dumps({{ 'import': imported - start, 'run': ran - imported,
+                   'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   'ipython': 'IPython' in sys.modules }}))
+'''
+
+def probe(*steps, repeat=5):
+    "Best wall time of the process, with the in-process figures of that run"
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = subprocess.run([ sys.executable, '-c', PROBE, *steps ],
+                             check=True, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if best == None or elapsed < best[0]:
+            best = (elapsed, json.loads(out.stdout))
+    return best
+
+bare, bare_stats = probe()
+imported, import_stats = probe('import')
+ran, run_stats = probe('import', 'run')
+report('interpreter start, bare', bare, unit='process')
+report('interpreter start + import encap', imported, unit='process')
+report('import encap alone', import_stats['import'], unit='import')
+report('first exec (Sandbox.create() + run())', run_stats['run'], unit='exec')
+report('interpreter start to first exec', ran, unit='process')
+for label, stats in [ ('bare', bare_stats), ('import encap', import_stats),
+                      ('first exec', run_stats) ]:
+    print(f"{'peak RSS, ' + label:44} {stats['rss'] / 1024:10.1f} MB")
+print(f"{'IPython loaded by import encap':44} {import_stats['ipython']!s:>10}")
+
+encap = load_encap()
+for name, attr in [ ('Rmath', 'sqrt'), ('Rjson', 'dumps'), ('Rre', 'compile'),
+                    ('Rjwt_exp', 'encode'), ('Rwasmtime_exp', 'Store') ]:
+    ns = getattr(encap, name)
+    start = time.perf_counter()
+    getattr(ns, attr)
+    first = time.perf_counter() - start
+    again = best_of(lambda: getattr(ns, attr), repeat=5, number=1000) / 1000
+    report(f"{name}.{attr}, first read", first, unit='read')
+    report(f"{name}.{attr}, later reads", again, unit='read')
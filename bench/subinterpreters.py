@@ -0,0 +1,49 @@
+'''
+CPU-bound sandboxed jobs from one thread per CPU: against in-process
+sandboxes, which share the interpreter's GIL, and a
+'subinterp.SubinterpreterPool', whose subinterpreters have a GIL each
+(Python 3.12+ only).
+'''
+
+import os, sys, time, threading
+
+from harness import load_encap, report
+
+encap = load_encap()
+import subinterp
+
+N = 64
+SOURCE = "sum(i * i for i in range(200000))"
+
+workers = os.cpu_count()
+
+def threaded(run):
+    "Wall time of 'workers' threads running N jobs between them with run()"
+    threads = [ threading.Thread(target=lambda: [ run() for _ in
+                                                  range(N // workers) ])
+                for _ in range(workers) ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+start = time.perf_counter()
+for _ in range(N):
+    assert encap.Sandbox.create().run(SOURCE).error == None
+report('in process, one thread', time.perf_counter() - start, N, 'job')
+t = threaded(lambda: encap.Sandbox.create().run(SOURCE))
+report(f"in process, {workers} threads (one GIL)", t, N // workers * workers,
+       'job')
+
+if not subinterp.gSupported:
+    sys.exit("no subinterpreters with their own GIL on Python" +
+             f" {sys.version.split()[0]}")
+with subinterp.SubinterpreterPool(workers=workers) as pool:
+    list(pool.map([ SOURCE ] * workers))
+    start = time.perf_counter()
+    results = list(pool.map([ SOURCE ] * N))
+    elapsed = time.perf_counter() - start
+    assert all(res.error == None for res in results)
+report(f"SubinterpreterPool, {workers} interpreters", elapsed, N, 'job')
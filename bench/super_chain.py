@@ -0,0 +1,35 @@
+'''
+Cost of cooperative 'super().__init__()' chains in sandboxed class
+hierarchies: instantiating the leaf of a DEPTH-level chain, for plain
+classes and for classes derived from 'Object'.
+'''
+
+from harness import load_encap, best_of, report
+
+encap = load_encap()
+
+DEPTH = 16
+N = 200
+
+def chain(base):
+    src = f'class C0({base}):\n    def __init__(self):\n' +\
+          f'        super().__init__()\n        self.n = 0\n'
+    for i in range(1, DEPTH):
+        src += f'class C{i}(C{i - 1}):\n    def __init__(self):\n' +\
+               f'        super().__init__()\n        self.n = {i}\n'
+    return src + f'''
+def run(n):
+    for _ in range(n):
+        C{DEPTH - 1}()
+run({N})
+'''
+
+g = encap.Globals({ '__builtins__': encap.gBuiltIns.copy(),
+                    '__name__': 'bench', 'Object': encap.Object })
+encap.cauterize(g)
+cache = encap.LRUCache()
+for label, base in [ ('plain classes', 'object'),
+                     ("'Object' subclasses", 'Object') ]:
+    src = chain(base)
+    t = best_of(lambda: encap.Rexec(src, 'exec', g.copy(), cache=cache))
+    report(f"{label}, depth {DEPTH}", t, N * DEPTH, 'super() call')
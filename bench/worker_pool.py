@@ -0,0 +1,35 @@
+'''
+Throughput of many small jobs, each in a fresh sandbox: one process
+creating a 'Sandbox' per job, against a 'workerpool.WorkerPool' of one
+worker per CPU (with recycling) - and the pool's queue latency.
+'''
+
+import os, time
+
+from harness import load_encap, report
+
+encap = load_encap()
+import workerpool
+
+N = 2000
+SOURCE = "sum(i * i for i in range(2000))"
+
+start = time.perf_counter()
+for _ in range(N // 10):
+    assert encap.Sandbox.create().run(SOURCE).error == None
+report('in process, Sandbox per job', time.perf_counter() - start, N // 10,
+       'job')
+
+workers = os.cpu_count()
+with workerpool.WorkerPool(workers=workers, max_jobs=500) as pool:
+    list(pool.map([ SOURCE ] * workers * 4))     # every worker is ready
+    start = time.perf_counter()
+    results = list(pool.map([ SOURCE ] * N))
+    elapsed = time.perf_counter() - start
+    assert all(res.error == None for res in results)
+    stats = pool.stats()
+report(f"WorkerPool, {workers} workers", elapsed, N, 'job')
+print(f"{'throughput':44} {N / elapsed:10.1f} jobs/s")
+for key in [ 'p50', 'p95', 'max' ]:
+    report(f"queue latency, {key}", stats['latency'][key], unit='job')
+print(f"{'workers recycled':44} {stats['recycled']:10}")
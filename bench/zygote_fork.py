@@ -0,0 +1,42 @@
+'''
+A fresh, isolated sandbox per request: a child forked from a 'Zygote'
+(with a module preloaded), against a new interpreter per request - and,
+without process isolation, a new 'Sandbox' in this process.
+'''
+
+import os, subprocess, sys, tempfile
+
+from harness import ROOT, load_encap, best_of, report
+
+encap = load_encap()
+import zygote
+
+N = 100
+SOURCE = "__mod.hello2, json.dumps([ math.sqrt(i) for i in range(100) ])"
+
+os.chdir(os.path.join(ROOT, 'run'))     # 'file:' modules are local
+z = zygote.Zygote(preload=('math', 'json', 'hello2'))
+def forked():
+    for _ in range(N):
+        res = z.run(SOURCE)
+        assert res.error == None, res.error
+report('Zygote, fork per request', best_of(forked, repeat=3), N, 'request')
+latency = sorted(z.run(SOURCE).latency for _ in range(N))
+report('Zygote, fork to start of job, p50', latency[N // 2], unit='request')
+
+def created():
+    for _ in range(N):
+        sandbox = encap.Sandbox.create()
+        assert sandbox.run('import hello2').error == None
+        assert sandbox.run(SOURCE).error == None
+report('in process, Sandbox per request', best_of(created, repeat=3), N,
+       'request')
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, 'job.py')
+    with open(path, 'w') as f:
+        f.write('import hello2\n' + SOURCE + '\n')
+    cli = [ sys.executable, os.path.join(ROOT, 'encap.py'), path ]
+    t = best_of(lambda: subprocess.run(cli, check=True,
+                                       stdout=subprocess.DEVNULL), repeat=3)
+    report('new interpreter per request', t, unit='request')
@@ -0,0 +1,137 @@
+'''
+Bounded caches used by the sandbox host to avoid redoing expensive,
+deterministic work (parsing, AST filtering, compiling) on repeated input.
+
+None of these objects may ever be handed to sandboxed code - they hold
+host-side code objects.
+'''
+
+import os, sys
+import marshal, tempfile, types
+from importlib.util import MAGIC_NUMBER
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Bounded least-recently-used mapping with hit/miss/eviction counters.
+
+    Safe to share between threads without a lock: each 'OrderedDict'
+    operation is atomic, and an entry another thread evicts between two of
+    them is simply gone.  The counters may miss concurrent updates.
+    """
+
+    def __init__(self, maxsize: int=256):
+        if type(maxsize) != int or maxsize < 0:
+            raise TypeError("'maxsize' must be a non-negative integer")
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self.data)
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        try:
+            val = self.data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        try:
+            self.data.move_to_end(key)
+        except KeyError:                # evicted meanwhile
+            pass
+        self.hits += 1
+        return val
+
+    def put(self, key, val):
+        "Inserts/refreshes an entry.  A zero 'maxsize' disables the cache."
+        if self.maxsize == 0:
+            return val
+        self.data[key] = val
+        try:
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+                self.evictions += 1
+        except KeyError:                # emptied meanwhile
+            pass
+        return val
+
+    def clear(self):
+        self.data.clear()
+
+    def stats(self):
+        return { 'size': len(self.data), 'maxsize': self.maxsize,
+                 'hits': self.hits, 'misses': self.misses,
+                 'evictions': self.evictions }
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.stats()})"
+
+
+class CodeStore:
+    """
+    Persistent directory of marshalled code objects, in the manner of
+    '__pycache__'.  Keys are the tuples used with 'LRUCache' for code, i.e.
+    (source digest, mode, transformer version); the Python version is part of
+    the file name and the interpreter's magic number heads every file.
+
+    The directory must only be writable by the host - its content is loaded
+    as trusted, already-filtered code.
+    """
+
+    suffix = '.rpyc'
+
+    def __init__(self, directory: str):
+        if type(directory) != str or not directory:
+            raise TypeError("'directory' must be a path")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.hits = self.misses = self.writes = 0
+
+    def path(self, key):
+        digest, mode, version = key
+        return os.path.join(self.directory,
+                            f"{digest.hex()}-{mode}-v{version}." +
+                            sys.implementation.cache_tag + __class__.suffix)
+
+    def get(self, key, default=None):
+        try:
+            with open(self.path(key), 'rb') as f:
+                data = f.read()
+            if data[:len(MAGIC_NUMBER)] == MAGIC_NUMBER:
+                code = marshal.loads(data[len(MAGIC_NUMBER):])
+                if isinstance(code, types.CodeType):
+                    self.hits += 1
+                    return code
+        except (OSError, EOFError, ValueError, TypeError):
+            pass                        # missing or corrupt - recompile
+        self.misses += 1
+        return default
+
+    def put(self, key, code: types.CodeType):
+        "Writes atomically; failures only cost a recompile next time"
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.directory,
+                                       suffix=__class__.suffix + '.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(MAGIC_NUMBER + marshal.dumps(code))
+                os.replace(tmp, self.path(key))
+                self.writes += 1
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError:
+            pass
+        return code
+
+    def stats(self):
+        return { 'directory': self.directory, 'hits': self.hits,
+                 'misses': self.misses, 'writes': self.writes }
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.stats()})"
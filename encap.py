@@ -1,11 +1,8 @@
 #! /usr/bin/env python3
 
-from IPython.terminal.embed import InteractiveShellEmbed
-import IPython.core.error as IPython_error
-import IPython.core.display
 import ast
 import string, _string
-import functools, inspect
+import functools, inspect, weakref
 
 import types, math, random, datetime, re, json
 
@@ -13,10 +10,16 @@ from urllib.parse import urlparse
 
 import textwrap
 
-import os
+import os, sys, time, threading
+import hashlib
+import argparse, collections, contextlib
+
+# 'bases' and 'Rjwt' reach this module as 'encap', also when it is run
+sys.modules.setdefault('encap', sys.modules[__name__])
 
 from bases import ReadOnly_meta, ReadOnly2_meta, Freeze_meta, Object, Dict
-from bases import HideBases, RException
+from bases import HideBases, RException, mapping_view, _lock
+from caches import LRUCache, CodeStore
 
 
 try:
@@ -46,18 +49,41 @@ del name
 # loophole - use of "types.CodeType" bypasses parser filtering
 del gBuiltIns['compile']
 
-def LockedFn(orig: types.FunctionType):
-    "Returns a wrapped function that can only be '__call__'ed"
+def LockedFnType():
+    """
+    Builds the single type shared by all 'LockedFn' wrappers.  A wrapper
+    holds its function in a slot whose descriptor leaves the class, so only
+    the type's methods can read it; metadata is looked up on access and the
+    signature is computed once, on first use.
+    """
+    def forward(attr):
+        return property(lambda self: getattr(F(self)[0], attr))
+    def signature(self):
+        state = F(self)
+        if state[1] == None:
+            state[1] = inspect.signature(state[0])
+        return state[1]
+
+    # wrapped function usage of which is limited to just calling it
     class fnwrapper(metaclass=Freeze_meta):
-        "wrapped function usage of which is limited to just calling it"
-        __signature__ = inspect.signature(orig)
-        def __init__(self):
-            super().__init__()
+        __slots__ = ('__weakref__', '__wrapped_fn__')
+        __module__ = forward('__module__')
+        __name__ = forward('__name__')
+        __doc__ = forward('__doc__')
+        __annotations__ = forward('__annotations__')
+        __kwdefaults__ = forward('__kwdefaults__')
+        __signature__ = property(signature)
         def __call__(self, *argv, **kwargs):
-            return orig.__call__(*argv, **kwargs)
+            return F(self)[0](*argv, **kwargs)
         def __repr__(self):
             return self.__signature__.__repr__().replace('Signature',
                                                          'function', 1)
+        def __getattr__(self, attr):
+            # a class body cannot make '__qualname__' a property
+            if attr == '__qualname__':
+                return F(self)[0].__qualname__
+            raise AttributeError(f"'function' object has no attribute " +
+                                 f"'{attr}'")
         @property
         def __dict__(self):
             return None
@@ -66,18 +92,24 @@ def LockedFn(orig: types.FunctionType):
         def __delattr__(self, key):
             raise RuntimeError('Cannot modify - function is locked.')
 
-    functools.update_wrapper(fnwrapper, orig,
-                             assigned=functools.WRAPPER_ASSIGNMENTS +
-                                      ('__kwdefaults__',),
-                             updated=())
-    del fnwrapper.__wrapped__
+    slot = fnwrapper.__dict__['__wrapped_fn__']
+    del fnwrapper.__wrapped_fn__
+    F = slot.__get__
+
     fnwrapper.lock()
-    return fnwrapper()
+    return fnwrapper, slot.__set__
+gLockedFnType, gBindLockedFn = LockedFnType()
+
+def LockedFn(orig: types.FunctionType):
+    "Returns a wrapped function that can only be '__call__'ed"
+    fn = object.__new__(gLockedFnType)
+    gBindLockedFn(fn, [ orig, None ])
+    return fn
 
 try:                                    # wrap IPython utility functions as well
-    if gBuiltIns['display'] == IPython.core.display.display:
+    if gBuiltIns['display'] == sys.modules['IPython.core.display'].display:
         gBuiltIns['display'] = LockedFn(gBuiltIns['display'])
-except KeyError:
+except KeyError:                        # not loaded into IPython
     pass
 if 'get_ipython' in gBuiltIns:
     del gBuiltIns['get_ipython']
@@ -86,6 +118,7 @@ class Globals(dict):
     def __init__(self, *argv, **kwargs):
         super().__init__(*argv, **kwargs)
         self.__locked__ = False
+        self.__published__ = None
         if '__name__' in self:
             self.__name__ = self['__name__']
         if '__builtins__' in self and self['__builtins__'] != None:
@@ -148,7 +181,15 @@ class Globals(dict):
             super().__setitem__('__name__', self.__name__)
 
     def publish(self, mkapi):
-        return Globals_pub(self).as_dict(mkapi)
+        """
+        The view returned by the sandboxed 'globals()' - built on first use,
+        then reused.  It refers to this object weakly, so caching it here does
+        not keep the namespace alive.
+        """
+        if self.__published__ == None:
+            super().__setattr__('__published__',
+                                Globals_pub(weakref.proxy(self)).as_dict(mkapi))
+        return self.__published__
 
 class Globals_pub(metaclass = ReadOnly_meta):
     __repr__ = object.__repr__
@@ -235,16 +276,13 @@ def fn(self, key, *argv, **kwargs):
         intf.lock()
         return intf
 
+    view_methods = ('__contains__', '__getitem__', '__setitem__',
+                    '__delitem__', 'iter', 'clear', 'len', 'get', 'items',
+                    'keys', 'pop', 'popitem', 'setdefault', 'update', 'values')
+
     def as_dict(self, mkapi):
-        def blocked(a):
-            raise AttributeError("'dict' object has no attribute '" + a + "'")
-        w = self.make_interface(mkapi).wrap()
-        w.__class__.__setattr__ = mkapi("fn = lambda self, attr, v: b(attr)",
-                                        b=blocked)
-        w.__class__.__delattr__ = mkapi("fn = lambda self, attr: b(attr)",
-                                        b=blocked)
-        w.__class__.lock()
-        return w
+        "Shares one view type among all published globals - see 'mapping_view'"
+        return mapping_view(self, __class__.view_methods, blockget=False)
 
 
 random.seed()
@@ -253,18 +291,32 @@ random.seed()
 def restring(s):
     return re.subn('\\\\', '\\\\\\\\', s)[0]
 
-def IPythonShellInteract(**kwargs):
-    from IPython.terminal.interactiveshell import InteractiveShell
-
-    prog = Interact.prog = InteractiveShellEmbed
-    kwargs['__return__'] = { 'prog': prog,
-                             'exec': exec }
-                             
-    level = 0
-    if '_NESTLVL' in kwargs and type(kwargs['_NESTLVL']) == int and\
-       kwargs['_NESTLVL'] > 0:
-        level = kwargs['_NESTLVL']
-
+def SandboxCaches(kwargs: dict):
+    """
+    Takes the code caches of a new sandbox out of its parameters, which
+    become the sandbox's locals.  Returns '(codecache, codestore)'.
+    """
+    # per-sandbox cache of filtered/compiled code - a size (0 disables) or a
+    # host-supplied 'LRUCache'
+    codecache = kwargs.pop('_CODECACHE', 256)
+    if type(codecache) == int:
+        codecache = LRUCache(codecache) if codecache > 0 else None
+    elif type(codecache) != LRUCache:
+        raise TypeError("'_CODECACHE' must be a size or an 'LRUCache'")
+    # persistent cache of imported modules' code - a directory or 'CodeStore'
+    codestore = kwargs.pop('_CODESTORE', None)
+    if type(codestore) == str:
+        codestore = CodeStore(codestore)
+    elif codestore != None and type(codestore) != CodeStore:
+        raise TypeError("'_CODESTORE' must be a directory or a 'CodeStore'")
+    return codecache, codestore
+
+def SandboxGlobals(codecache: LRUCache=None, codestore: CodeStore=None):
+    """
+    Builds the cauterized namespace of a sandbox, with the 'file:' loader of
+    its local modules and its module object ('__mod').  It is left unlocked
+    for the caller's additions.
+    """
     def Final_body(ns):
         ns['__doc__'] = "Base class for when the class itself is immutable"
         ns['__repr__'] = object.__repr__
@@ -302,6 +354,54 @@ def fn(v=None):
  """,                                                 e=StopAsyncIteration) })
     del Final_body
 
+    g['__builtins__']['type'] = makeapi('''def fn(obj, *argv, **kwargs):
+  return real(obj, *argv, **kwargs)''', real=Rtype)._c
+    g['__builtins__']['setattr'] = makeapi('''def fn(obj, attr, val):
+  return real(obj, attr, val)''',          real=Rsetattr)._c
+
+    # Test case for the DMZ shim code
+#    g['test_dmz'] = makeapi("""
+#def fn():
+#  nonlocal __builtins__
+#  del __builtins__
+#  global open
+#  return open
+#""",                        )
+
+    localmod = types.SimpleNamespace()
+    cauterizer = cauterize(g, codecache, codestore)
+    with cauterizer.importer.remote_repo(["__init__"], "file:") as importer:
+        def file_prot_filter(imp, fullname):
+            if fullname.startswith(os.sep):
+                raise ValueError("'" + fullname + "' is not a valid path")
+            return imp(fullname)
+        ldr = makeapi("fn = lambda _=None: ldr",
+                      ldr=file_prot_filter.__get__(importer.get_loader("__init__"))
+                     )._c
+    localmod.__loader__ = g['__loader__'] = ldr
+    localmod.__file__ = g['__file__'] = 'file:__init__.py'
+    localmod.__path__ = g['__path__'] = 'file:'
+    del ldr, importer, cauterizer
+
+    g['__mod'] = localmod
+    return g
+
+def IPythonShellInteract(**kwargs):
+    # IPython is only loaded once an interactive shell is requested
+    from IPython.terminal.embed import InteractiveShellEmbed
+    from IPython.terminal.interactiveshell import InteractiveShell
+    import IPython.core.error as IPython_error
+
+    prog = Interact.prog = InteractiveShellEmbed
+    kwargs['__return__'] = { 'prog': prog,
+                             'exec': exec }
+                             
+    level = 0
+    if '_NESTLVL' in kwargs and type(kwargs['_NESTLVL']) == int and\
+       kwargs['_NESTLVL'] > 0:
+        level = kwargs['_NESTLVL']
+    codecache, codestore = SandboxCaches(kwargs)
+
     ipython_capture = Globals({ 'ipython': None, '__builtins__': {} })
     ipython_proxy = Object()
     def run_line_magic(magic_name, line, stack_depth=1):
@@ -339,35 +439,8 @@ def fn(s, replace=False):
     ipython = instance
   return proxy""",             globals=ipython_capture, proxy=ipython_proxy)
 
-    g['__builtins__']['type'] = makeapi('''def fn(obj, *argv, **kwargs):
-  return real(obj, *argv, **kwargs)''', real=Rtype)._c
-    g['__builtins__']['setattr'] = makeapi('''def fn(obj, attr, val):
-  return real(obj, attr, val)''',          real=Rsetattr)._c
-
-    # Test case for the DMZ shim code
-#    g['test_dmz'] = makeapi("""
-#def fn():
-#  nonlocal __builtins__
-#  del __builtins__
-#  global open
-#  return open
-#""",                        )
-
-    localmod = types.SimpleNamespace()
-    cauterize(g)
-    with Importer(g.copy(), cauterize).remote_repo(["__init__"],
-                                                    "file:") as importer:
-        def file_prot_filter(imp, fullname):
-            if fullname.startswith(os.sep):
-                raise ValueError("'" + fullname + "' is not a valid path")
-            return imp(fullname)
-        ldr = makeapi("fn = lambda _=None: ldr",
-                      ldr=file_prot_filter.__get__(importer.get_loader("__init__"))
-                     )._c
-    localmod.__loader__ = g['__loader__'] = ldr
-    localmod.__file__ = g['__file__'] = 'file:__init__.py'
-    localmod.__path__ = g['__path__'] = 'file:'
-    del ldr, importer
+    g = SandboxGlobals(codecache, codestore)
+    localmod = g['__mod']
 
     # "hackme" is married to the shell instance.  It is an example of things
     # that are not available to an imported module.  If needed by a module
@@ -384,7 +457,6 @@ def fn(**kwargs) -> object:
         g['hackme'] = g['makeapi']('def fn(**kwargs): return real(**kwargs)',
                                    real=hackme)._c
 
-    g['__mod'] = localmod
     g.lock()                            # done changing contents of "globals()"
 
 
@@ -413,18 +485,30 @@ def fn(**kwargs) -> object:
         pass
     return None
 
-def cauterize(g: Globals):
+def cauterize(g: Globals, codecache: LRUCache=None,
+              codestore: CodeStore=None, base: Globals=None):
     """
-    Adjusts and seals __builtins__ in a Globals object
+    Adjusts and seals __builtins__ in a Globals object.  'codecache' (if any)
+    is used by the sandboxed exec()/eval() and by modules imported from it;
+    'codestore' (if any) persists the code of imported modules only.
+
+    Modules imported from 'g' start from copies of 'base' - which must no
+    longer change - or of 'g' as sealed here if none is given.  Returns the
+    'Cauterizer' that seals their namespaces.
     """
+    if not isinstance(g['__builtins__'], Dict):
+        # e.g. an already sealed mapping, by the module importer - copied
+        g['__builtins__'] = Dict(g['__builtins__'])
+    formatter = SafeFormatter(g['__builtins__'])
     g['__builtins__']['safe_format'] = makeapi('''def fn(self, *argv, **kwargs):
   "Fix Python's unsafe formatspec.format(...)"
   return real(self, *argv, **kwargs)''',       real=Rsafe_format.__get__(
-                                                      g['__builtins__']))._c
+                                                      formatter))._c
     g['__builtins__']['safe_format_map'] = makeapi('''def fn(self, map):
   "Fix Python's unsafe formatspec.format_map(...)"
   return real(self, map)''',                   real=Rsafe_format_map.__get__(
-                                                      g['__builtins__']))._c
+                                                      formatter))._c
+    del formatter
     g['__builtins__']['super'] = makeapi('''def fn(T, *argv):
   return real(T, *argv)''',              real=Rsuper.__get__(g['__builtins__']))._c
     g['__builtins__']['getattr'] = makeapi('''
@@ -433,36 +517,6 @@ def fn(obj, attr, *argv, binder=None):
 ''',                                       real=Rgetattr.__get__(
                                                   g['__builtins__']))._c
 
-    g['__builtins__']['globals'] = (lambda : g.publish(makeapi)).__call__
-    g['__builtins__']['exec'] = makeapi("""
-def fn(code, globals=None, locals=None):
-  '''
-  Replacement for a restricted scope.  The only difference is when locals
-  is given but not globals, in which case this version will default to only
-  the __builtins__.  For the original behavior, pass in globals=globals().
-  '''
-  if globals == None:
-    if locals == None:
-      return real(code, 'exec', g)
-    else:
-      return real(code, 'exec', { '__builtins__': g['__builtins__'] }, locals)
-  return real(code, 'exec', globals, locals)
-""",                                    real=Rexec, g=g)._c
-    g['__builtins__']['eval'] = makeapi("""
-def fn(code, globals=None, locals=None):
-  '''
-  Replacement for a restricted scope.  The only difference is when locals
-  is given but not globals, in which case this version will default to only
-  the __builtins__.  For the original behavior, pass in globals=globals().
-  '''
-  if globals == None:
-    if locals == None:
-      return real(code, 'eval', g)
-    else:
-      return real(code, 'eval', { '__builtins__': g['__builtins__'] }, locals)
-  return real(code, 'eval', globals, locals)
-""",                                    real=Rexec, g=g)._c
-
     importer = None                     # (forward) declaration
     def generic_repo_context(ctxtmgr):
         def pt():
@@ -532,14 +586,61 @@ def fn(username=None, repo=None, module=None, branch=None, commit=None):
     del builtins
     g['__builtins__']['importer'] = importer_proxy.lockdown(makeapi)
     del importer_proxy
+    bind_globals(g, codecache)
+
+    # a module's snapshot would only differ from the base in names that each
+    # import overwrites anyway (module attributes, sealed builtins, 'makeapi')
+    if base == None:
+        base = g.copy()
+    cauterizer = Cauterizer(base, codecache, codestore)
+    importer = cauterizer.importer
+    return cauterizer
+
+def bind_globals(g: Globals, codecache: LRUCache=None):
+    """
+    The part of 'cauterize()' that is bound to 'g' itself: adds the builtins
+    referring to it, then seals '__builtins__' and generates 'makeapi'.
+    """
+    g['__builtins__']['globals'] = (lambda : g.publish(makeapi)).__call__
+    g['__builtins__']['exec'] = makeapi("""
+def fn(code, globals=None, locals=None):
+  '''
+  Replacement for a restricted scope.  The only difference is when locals
+  is given but not globals, in which case this version will default to only
+  the __builtins__.  For the original behavior, pass in globals=globals().
+  '''
+  if globals == None:
+    if locals == None:
+      return real(code, 'exec', g, cache=c)
+    else:
+      return real(code, 'exec', { '__builtins__': g['__builtins__'] }, locals,
+                  cache=c)
+  return real(code, 'exec', globals, locals, cache=c)
+""",                                    real=Rexec, g=g, c=codecache)._c
+    g['__builtins__']['eval'] = makeapi("""
+def fn(code, globals=None, locals=None):
+  '''
+  Replacement for a restricted scope.  The only difference is when locals
+  is given but not globals, in which case this version will default to only
+  the __builtins__.  For the original behavior, pass in globals=globals().
+  '''
+  if globals == None:
+    if locals == None:
+      return real(code, 'eval', g, cache=c)
+    else:
+      return real(code, 'eval', { '__builtins__': g['__builtins__'] }, locals,
+                  cache=c)
+  return real(code, 'eval', globals, locals, cache=c)
+""",                                    real=Rexec, g=g, c=codecache)._c
+
     g['__builtins__']['__import__'] = makeapi("""
 def fn(names, __loader__, module=None, level=0):
   return imp(names, __loader__, glbs, module, level)
 """,                                          imp=Rimport, glbs=g)._c
 
     # new '__builtins__' is now final - regenerate 'makeapi'
-    g['__builtins__'].lock()
-    g['__builtins__'] = g['__builtins__'].as_dict(makeapi)
+    # (a view reading the store directly - see 'Dict.as_mapping()')
+    g['__builtins__'] = g['__builtins__'].as_mapping()
     g['makeapi'] = makeapi("""
 def def_invoke(fn: str, globals=glbs, __fname__='fn', **kwargs):
   '''
@@ -584,9 +685,30 @@ def fn(input, optim=2):
   return h(to_hide, *bases)''',   h=HideBases)._c
     # also published "class Freeze_meta" - returned by "hidebases(()).__base__"
 
-    importer = Importer(g.copy(), cauterize)
+class Cauterizer:
+    """
+    What the module namespaces of a sandbox share: the sealed 'base' they are
+    copied from, whose '__builtins__' already hold every wrapper that does not
+    refer to a particular namespace ('safe_format', 'super', 'getattr',
+    'importer', ...), and the one 'Importer' behind 'importer'.  Calling it
+    seals a module's namespace with 'bind_globals()' only.
+    """
+    def __init__(self, base: Globals, codecache: LRUCache=None,
+                 codestore: CodeStore=None):
+        self.base = base
+        self.codecache = codecache
+        self.importer = Importer(base, self,
+                                 ModuleExecutor(codecache, codestore))
+
+    def __call__(self, g: Globals):
+        # copies the base's sealed mapping
+        g['__builtins__'] = Dict(g['__builtins__'])
+        bind_globals(g, self.codecache)
 
 class RNodeTransformer(ast.NodeTransformer):
+    # bump whenever the rewriting rules change - part of the code cache key
+    version = 1
+
     def __init__(self, eclass1: BaseException, eclass2: BaseException,
                  *argv, **kwargs):
         super().__init__(*argv, **kwargs)
@@ -766,6 +888,9 @@ class RNodeTransformer(ast.NodeTransformer):
     def visit_Global(self, node):
         raise self.sexc_class("forbidden keyword: 'global'")
 
+# compiled wrapper factories of 'API_FnBind', by (source, name, closure names)
+gFnBindCache = LRUCache(1024)
+
 def API_FnBind(fn: str, globals={ '__builtins__':{} }, __fname__='fn',
                **kwargs):
     """
@@ -773,8 +898,18 @@ def API_FnBind(fn: str, globals={ '__builtins__':{} }, __fname__='fn',
     closure is secured by denying access to '__closure__'.  This design permits,
     in limited cases, access to '__globals__'.
     """
-    code = f"""def _({','.join(kwargs.keys())}):
-""" +      textwrap.indent(fn, '  ') + f'\n  return {__fname__}'
+    # The factory's code does not depend on 'globals' or the closure values,
+    # so only the first use of a template pays for compiling it.
+    key = None
+    if type(fn) == str and type(__fname__) == str:
+        key = (fn, __fname__, tuple(kwargs.keys()))
+        code = gFnBindCache.get(key)
+    if key == None or code == None:
+        code = compile(f"""def _({','.join(kwargs.keys())}):
+""" +                  textwrap.indent(fn, '  ') + f'\n  return {__fname__}',
+                       '<string>', 'exec')
+        if key != None:
+            gFnBindCache.put(key, code)
     output = {}
     exec(code, Globals.check(globals), output)
     rtn = output['_'](*tuple(kwargs.values()))
@@ -791,7 +926,6 @@ def def_invoke(fn: str, globals={ '__builtins__':{} }, __fname__='fn',
                      real=API_FnBind)
 
 
-import Rwasmtime_git.wasmtime as Rwasmtime
 from ISPy_importer import Importer
 
 RException.lock()
@@ -811,110 +945,112 @@ class RModuleNotFoundError(RImportError):
         super().__init__()
 RModuleNotFoundError.lock()
 
-# standard libraries
-# filter out some "types" packages
-Rtypes = Object()
-for name in types.__all__:
-    try:
-        if issubclass(vars(types)[name], Exception):
-            continue
-    except TypeError:
-        pass
-    if not name in [ 'CodeType', 'prepare_class' ]:
-        orig = vars(types)[name]
-        if isinstance(orig, types.FunctionType):
-            Rtypes.__setattr__(name, LockedFn(orig))
-        else:
-            Rtypes.__setattr__(name, orig)
-        del orig
+# standard libraries and other modules exported to sandboxes - as namespaces
+# whose content (and module import) is only built when first needed
+def Exported(orig):
+    "The value exported for a module attribute"
+    if isinstance(orig, types.FunctionType):
+        return LockedFn(orig)
+    return orig
+
+def ExportedNames(module, names, excluded=()):
+    "'names' of 'module' without 'excluded' ones, exceptions or private names"
+    ret = []
+    for name in names:
+        try:
+            if issubclass(vars(module)[name], Exception):
+                continue
+        except TypeError:
+            pass
+        if not name.startswith('_') and not name in excluded:
+            ret.append(name)
+    return ret
+
+def Namespace(doc: str, load, names, wrap=Exported, extras={}):
+    """
+    Returns the only instance of a locked, slot-less class that keeps the
+    'names(module)' attributes of 'module = load()' as 'wrap(attribute)', and
+    'extras' (name -> builder), in its class dict - reading them costs what
+    it does on a module.  'load()' runs when the namespace is first used, and
+    each attribute is only built when first read.
+    """
+    builders = None                     # name -> builder, of the unbuilt ones
+    def loaded():
+        # (under '_lock' - loads once, however many threads get here first)
+        nonlocal builders
+        if builders == None:
+            module = load()
+            found = { name: functools.partial(wrap, vars(module)[name])
+                      for name in names(module) }
+            found.update(extras)
+            type.__setattr__(cls, '__all__', tuple(found))
+            builders = found
+        return builders
+
+    def __getattr__(self, attr):
+        # only reached for names not in the class (yet) - another thread may
+        # have built it since, while this one waited for the lock
+        with _lock:
+            if attr in vars(cls):
+                return object.__getattribute__(self, attr)
+            if attr in loaded():
+                val = builders[attr]()
+                del builders[attr]
+                type.__setattr__(cls, attr, staticmethod(val)
+                                            if hasattr(type(val), '__get__')
+                                            else val)
+                if not builders:        # all built - drop this hook
+                    type.__delattr__(cls, '__getattr__')
+                return val
+        if attr == '__all__':
+            return cls.__all__
+        raise AttributeError(attr)
+    def __dir__(self):
+        with _lock:
+            loaded()
+        return [ *cls.__all__ ]
+    def __repr__(self):
+        jsonstr = json.dumps({ name: getattr(self, name)
+                               for name in self.__dir__() },
+                             indent=2, default=Object.jsondefault)
+        # remove the first and last newlines to mimic Python REPL
+        return '{' + re.subn('\n[ \t]+}', ' }', jsonstr[3:-2])[0] + ' }'
+    def __setattr__(self, attr, val):
+        raise RuntimeError('Cannot modify - object is locked.')
+    def __delattr__(self, attr):
+        raise RuntimeError('Cannot modify - object is locked.')
+
+    cls = Freeze_meta('namespace', (),
+                      { '__slots__': (), '__doc__': doc,
+                        '__getattr__': __getattr__, '__dir__': __dir__,
+                        '__repr__': __repr__, '__setattr__': __setattr__,
+                        '__delattr__': __delattr__ })
+    cls.lock()
+    return cls()
+
 def Rprepare_class(name, bases=(), kwds=None):
     meta, ns, kwds = types.prepare_class(name, bases, kwds)
     return meta.__name__, ns, kwds
-Rtypes.prepare_class = makeapi("""
+Rtypes = Namespace("Access to Python's built-in 'types' module",
+                   lambda: types,
+                   lambda m: ExportedNames(m, m.__all__,
+                                           ('CodeType', 'prepare_class')),
+                   extras={ 'prepare_class': lambda: makeapi("""
 def fn(name, bases=(), kwds=None):
   return real(name, bases, kwds)
-""",                           real=Rprepare_class)._c
-del Rprepare_class
-Rtypes.__doc__ = "Access to Python's built-in 'types' module"
-Rtypes = Rtypes.lockdown(makeapi)
-Rmath = Object()
-for name in vars(math):
-    try:
-        if issubclass(vars(math)[name], Exception):
-            continue
-    except TypeError:
-        pass
-    if not name.startswith('_'):
-        orig = vars(math)[name]
-        if isinstance(orig, types.FunctionType):
-            Rmath.__setattr__(name, LockedFn(orig))
-        else:
-            Rmath.__setattr__(name, orig)
-        del orig
-Rmath.__doc__ = "Access to Python's built-in 'math' module"
-Rmath.lockdown(makeapi)
-Rrandom = Object()
-for name in random.__all__:
-    try:
-        if issubclass(vars(random)[name], Exception):
-            continue
-    except TypeError:
-        pass
-    if not name in [ 'seed' ]:
-        orig = vars(random)[name]
-        if isinstance(orig, types.FunctionType):
-            Rrandom.__setattr__(name, LockedFn(orig))
-        else:
-            Rrandom.__setattr__(name, orig)
-        del orig
-Rrandom.__doc__ = "Access to Python's built-in 'random' module"
-Rrandom.lockdown(makeapi)
-Rdatetime = Object()
-for name in vars(datetime):
-    try:
-        if issubclass(vars(datetime)[name], Exception):
-            continue
-    except TypeError:
-        pass
-    if not name.startswith('_') and not name in [ 'sys', 'datetime_CAPI' ]:
-        orig = vars(datetime)[name]
-        if isinstance(orig, types.FunctionType):
-            Rdatetime.__setattr__(name, LockedFn(orig))
-        else:
-            Rdatetime.__setattr__(name, orig)
-        del orig
-Rdatetime.__doc__ = "Access to Python's built-in 'datetime' module"
-Rdatetime.lockdown(makeapi)
-Rre = Object()
-for name in re.__all__:
-    try:
-        if issubclass(vars(re)[name], Exception):
-            continue
-    except TypeError:
-        pass
-    orig = vars(re)[name]
-    if isinstance(orig, types.FunctionType):
-        Rre.__setattr__(name, LockedFn(orig))
-    else:
-        Rre.__setattr__(name, orig)
-    del orig
-Rre.__doc__ = "Access to Python's built-in 're' module"
-Rre.lockdown(makeapi)
-Rjson = Object()
-for name in json.__all__:
-    try:
-        if issubclass(vars(json)[name], Exception):
-            continue
-    except TypeError:
-        pass
-    if not name in [ 'JSONEncoder', 'JSONDecoder' ]:
-        orig = vars(json)[name]
-        if isinstance(orig, types.FunctionType):
-            Rjson.__setattr__(name, LockedFn(orig))
-        else:
-            Rjson.__setattr__(name, orig)
-        del orig
-Rjson.__doc__ = "Access to Python's built-in 'json' module"
+""",                                                  real=Rprepare_class)._c })
+Rmath = Namespace("Access to Python's built-in 'math' module",
+                  lambda: math, lambda m: ExportedNames(m, vars(m)))
+Rrandom = Namespace("Access to Python's built-in 'random' module",
+                    lambda: random,
+                    lambda m: ExportedNames(m, m.__all__, ('seed',)))
+Rdatetime = Namespace("Access to Python's built-in 'datetime' module",
+                      lambda: datetime,
+                      lambda m: ExportedNames(m, vars(m),
+                                              ('sys', 'datetime_CAPI')))
+Rre = Namespace("Access to Python's built-in 're' module",
+                lambda: re, lambda m: ExportedNames(m, m.__all__))
+
 class RJSONDecodeError(RValueError):
     def __init__(self, orig: json.JSONDecodeError):
         super().__init__()
@@ -939,11 +1075,10 @@ class RJSONDecoder_impl(json.JSONDecoder):
         except json.JSONDecodeError as exc:
             raise RJSONDecodeError.create(exc)
 
-
-Rjson.JSONDecodeError = RJSONDecodeError
-doc = textwrap.dedent('    ' + json.JSONDecoder.__doc__) +\
-      textwrap.dedent('        ' + json.JSONDecoder.__init__.__doc__)
-Rjson.JSONDecoder = makeapi("""
+def RJSONDecoder():
+    doc = textwrap.dedent('    ' + json.JSONDecoder.__doc__) +\
+          textwrap.dedent('        ' + json.JSONDecoder.__init__.__doc__)
+    return makeapi("""
 def fn(*argv, object_hook=None, parse_float=None, parse_int=None,
        parse_constant=None, strict=True, object_pairs_hook=None):
   '''
@@ -956,8 +1091,7 @@ encapsulation boundaries.
   return ctr(*argv, object_hook=object_hook, parse_float=parse_float,
              parse_int=parse_int, parse_constant=parse_constant,
              strict=strict, object_pairs_hook=object_pairs_hook)
-""",                        ctr=RJSONDecoder_impl)._c
-del doc
+""",                  ctr=RJSONDecoder_impl)._c
 
 class RJSONEncoder(json.JSONEncoder,
                    metaclass=HideBases((json.JSONEncoder,)).metalock()):
@@ -972,35 +1106,38 @@ class RJSONEncoder(json.JSONEncoder,
 
 RJSONEncoder.__doc__ = json.JSONEncoder.__doc__
 RJSONEncoder.lock()
-Rjson.JSONEncoder = RJSONEncoder
-Rjson.lockdown(makeapi)
+Rjson = Namespace("Access to Python's built-in 'json' module",
+                  lambda: json,
+                  lambda m: ExportedNames(m, m.__all__,
+                                          ('JSONEncoder', 'JSONDecoder')),
+                  extras={ 'JSONDecodeError': lambda: RJSONDecodeError,
+                           'JSONDecoder': RJSONDecoder,
+                           'JSONEncoder': lambda: RJSONEncoder })
 json._default_decoder = RJSONDecoder_impl()
 
-import Rjwt
-Rjwt.patch(RException, makeapi)
-Rjwt_exp = Object()
-for name in Rjwt.__all__:
-    orig = vars(Rjwt)[name]
-    if isinstance(orig, types.FunctionType):
-        Rjwt_exp.__setattr__(name, LockedFn(orig))
-    elif isinstance(orig, type):
+def Rjwt_load():
+    import Rjwt
+    Rjwt.patch(RException, makeapi)
+    return Rjwt
+def Rjwt_wrap(orig):
+    if isinstance(orig, type):
         orig.lock()
-        Rjwt_exp.__setattr__(name, orig)
-    del orig
-Rjwt_exp.exceptions = Object()
-Rjwt_exp.exceptions.__proxydict__.update(Rjwt.exceptions.__dict__)
-Rjwt_exp.lockdown(makeapi)
-
-Rwasmtime_exp = Object()
-for name in Rwasmtime.__all__:
-    orig = vars(Rwasmtime)[name]
-    if isinstance(orig, types.FunctionType):
-        Rwasmtime_exp.__setattr__(name, LockedFn(orig))
-    else:
-        Rwasmtime_exp.__setattr__(name, orig)
-    del orig
-Rwasmtime_exp.lockdown(makeapi)
-del name
+    return Exported(orig)
+def Rjwt_exceptions():
+    import Rjwt
+    ret = Object()
+    ret.__proxydict__.update(Rjwt.exceptions.__dict__)
+    return ret.lockdown(makeapi)
+Rjwt_exp = Namespace(None, Rjwt_load,
+                     lambda m: [ name for name in m.__all__
+                                 if isinstance(vars(m)[name],
+                                               (types.FunctionType, type)) ],
+                     wrap=Rjwt_wrap, extras={ 'exceptions': Rjwt_exceptions })
+
+def Rwasmtime_load():
+    import Rwasmtime_git.wasmtime as Rwasmtime
+    return Rwasmtime
+Rwasmtime_exp = Namespace(None, Rwasmtime_load, lambda m: m.__all__)
 
 def Rtype(obj_or_name, *argv, **kwargs):
     if isinstance(obj_or_name, type) and\
@@ -1012,38 +1149,40 @@ def Rtype(obj_or_name, *argv, **kwargs):
     return result
 
 # loophole - some attributes/properties leak higher scopes
-def Rgetattr(builtins, obj, attr, *argv, binder=None):
-    if binder == None:
-        result = getattr(obj, attr, *argv)
-    elif isinstance(binder.__getattribute__, types.MethodType) or\
-         isinstance(binder.__getattribute__, types.MethodWrapperType):
-        result = binder.__getattribute__(attr)
-    else:
-        result = binder.__getattribute__(obj, attr)
-
-    def bind(func):
-        if binder == None or\
-           not isinstance(binder.__getattribute__, types.MethodType):
-            return func
-        # bind to obj
-        return types.MethodType(func, obj)
-    if attr == '__subclasses__':
-        return makeapi("fn = lambda : []")
-    if attr == '__getattribute__':
-        return bind(builtins['getattr'])
-    if attr == '__setattr__':
-        return bind(builtins['setattr'])
-    if attr == '__delattr__':
-        return bind(builtins['delattr'])
-
-    if attr == 'format' and\
-       (str.format == obj.format or str.format.__get__(obj) == obj.format):
+def Rgetattr_format(builtins, obj, bind):
+    if str.format == obj.format or str.format.__get__(obj) == obj.format:
         return bind(builtins['safe_format'])
-    if attr == 'format_map' and\
-       (str.format_map == obj.format_map or\
-        str.format_map.__get__(obj) == obj.format_map):
+def Rgetattr_format_map(builtins, obj, bind):
+    if str.format_map == obj.format_map or\
+       str.format_map.__get__(obj) == obj.format_map:
         return bind(builtins['safe_format_map'])
 
+# attributes whose value is replaced - in the order they used to be tested
+gRgetattrSpecial = {
+    '__subclasses__': lambda builtins, obj, bind: makeapi("fn = lambda : []"),
+    '__getattribute__': lambda builtins, obj, bind: bind(builtins['getattr']),
+    '__setattr__': lambda builtins, obj, bind: bind(builtins['setattr']),
+    '__delattr__': lambda builtins, obj, bind: bind(builtins['delattr']),
+    'format': Rgetattr_format,
+    'format_map': Rgetattr_format_map,
+}
+
+# Whether these results are blocked depends on their value (or on a
+# forwarded '__class__'), not on their type alone
+gAuditedTypes = (type, dict, list, tuple, types.CodeType, types.CellType,
+                 types.FrameType)
+gForwardingTypes = (types.MappingProxyType, weakref.ProxyType,
+                    weakref.CallableProxyType, types.GenericAlias)
+# 'id()'s of static types whose instances always pass 'Raudit'
+gSafeResultTypes = set()
+Py_TPFLAGS_HEAPTYPE = 1 << 9
+
+def Raudit(result):
+    "Blocks values that lead out of the sandbox (see 'Rgetattr')"
+    T = type(result)
+    if id(T) in gSafeResultTypes:
+        return result
+
     if result == type:
         raise RuntimeError(f"access to {type} blocked!")
     if result == globals():
@@ -1059,41 +1198,98 @@ def Rgetattr(builtins, obj, attr, *argv, binder=None):
         if isinstance(result[0], types.CellType):
             raise RuntimeError("access to 'cell' type blocked!")
 
+    # Static (non-heap) types never go away, so their 'id()'s stay valid
+    if not T.__flags__ & Py_TPFLAGS_HEAPTYPE and\
+       not issubclass(T, gAuditedTypes) and not T in gForwardingTypes:
+        gSafeResultTypes.add(id(T))
     return result
 
+def Rgetattr(builtins, obj, attr, *argv, binder=None):
+    if binder == None:
+        result = getattr(obj, attr, *argv)
+    elif isinstance(binder.__getattribute__, types.MethodType) or\
+         isinstance(binder.__getattribute__, types.MethodWrapperType):
+        result = binder.__getattribute__(attr)
+    else:
+        result = binder.__getattribute__(obj, attr)
+
+    if type(attr) == str:
+        special = gRgetattrSpecial.get(attr)
+    else:                               # comparisons may be overridden
+        special = next((v for k, v in gRgetattrSpecial.items() if attr == k),
+                       None)
+    if special != None:
+        def bind(func):
+            if binder == None or\
+               not isinstance(binder.__getattribute__, types.MethodType):
+                return func
+            # bind to obj
+            return types.MethodType(func, obj)
+        ret = special(builtins, obj, bind)
+        if ret != None:
+            return ret
+
+    return Raudit(result)
+
 # forbid changing '__code__'
 def Rsetattr(obj, attr, val):
     if type(val) == types.CodeType:
         raise RuntimeError(f"access to {types.CodeType} blocked!")
     return setattr(obj, attr, val)
 
-def Rexec(code: str, m='exec', gl={ '__builtins__': {} }, loc=None):
+def Rcompile(code: str, m='exec', cache: LRUCache=None,
+             store: CodeStore=None):
+    """
+    Filters and compiles sandboxed source, reusing 'cache' (in memory) and
+    'store' (on disk) entries if given
+    """
+    key = None
+    if (cache != None and cache.maxsize > 0) or store != None:
+        key = (hashlib.sha256(code.encode('utf-8', 'surrogatepass')).digest(),
+               m, RNodeTransformer.version)
+        result = cache.get(key) if cache != None else None
+        if result != None:
+            return result
+        result = store.get(key) if store != None else None
+        if result != None:
+            return cache.put(key, result) if cache != None else result
+    tree = RNodeTransformer(AttributeError,
+                            SyntaxError).visit(ast.parse(code, mode=m))
+    result = compile(tree, filename='<unknown>', mode=m)
+    if key != None:
+        if cache != None:
+            cache.put(key, result)
+        if store != None:
+            store.put(key, result)
+    return result
+
+def Rexec(code: str, m='exec', gl={ '__builtins__': {} }, loc=None,
+          cache: LRUCache=None, store: CodeStore=None):
     if type(code) != str:
         raise TypeError(m + "(): 'code' must be of type 'str'")
     gl = Globals.check(gl).lock()
-    tree = RNodeTransformer(AttributeError,
-                            SyntaxError).visit(ast.parse(code, mode=m))
     if m == 'exec':
-        return exec(compile(tree, filename='<unknown>', mode=m), gl, loc)
+        return exec(Rcompile(code, m, cache, store), gl, loc)
     elif m == 'eval':
-        return eval(compile(tree, filename='<unknown>', mode=m), gl, loc)
+        return eval(Rcompile(code, m, cache, store), gl, loc)
     raise RuntimeError(m + "(): mode must be 'exec' or 'eval'")
 
-def Rsuper(builtins, T, *obj_or_type):
-    if len(obj_or_type) == 0:
-        raise RuntimeError("super(): single argument form not supported")
-    
-    oclass = term = obj_or_type[0]
-    if not isinstance(oclass, type):
-        oclass = oclass.__class__
-    if isinstance(type(oclass), ReadOnly2_meta) and\
-       hasattr(oclass, '__Rsupermap__') and T in oclass.__Rsupermap__:
-        res = oclass.__Rsupermap__[T](term)
-    else:
-        res = super(T, *obj_or_type)
+def ModuleExecutor(cache: LRUCache=None, store: CodeStore=None):
+    "Host-side runner of imported modules' sources (see 'HttpImporter')"
+    def executor(code: str, gl, loc=None):
+        return Rexec(code, 'exec', gl, loc, cache=cache, store=store)
+    return executor
 
+def RsuperType():
+    """
+    Builds the single proxy type returned by every sandboxed 'super(...)'.
+    What each proxy stands for is held in a slot whose descriptor leaves the
+    class, so only the type's methods can read it.
+    """
     class proxy(metaclass=Freeze_meta):
+        __slots__ = ('__weakref__', '__super_state__')
         def __getattribute__(self, attr):
+            builtins, oclass, term, res, guarded = S(self)
             # our AST parser add-in made sure this will just be a call
             if attr == '__getattribute__':
                 # "super(...).__getattribute__(...)"
@@ -1108,15 +1304,16 @@ def Rsuper(builtins, T, *obj_or_type):
                 return binder_getattr
 
             ret = getattr(res, attr)
-            if issubclass(oclass, Object) or issubclass(oclass, Dict):
-                m= { '__setattr__': (builtins['setattr'], term.__setattr__),
-                     '__delattr__': (builtins['delattr'], term.__delattr__), }
+            if attr != '__setattr__' and attr != '__delattr__':
+                return ret
+            if guarded:
                 # our AST parser add-in made sure these will just be calls
-                if attr in m:
-                    if term.__locked__:
-                        return m[attr][0 if isinstance(term, type) else 1]
+                if term.__locked__:
                     if isinstance(term, type):
-                        return makeapi("""def fn(t, *argv):
+                        return builtins[attr[2:-2]]
+                    return getattr(term, attr)
+                if isinstance(term, type):
+                    return makeapi("""def fn(t, *argv):
   if not isinstance(t, oc):
       raise TypeError(f"term/object must be an instance of {oc.__name__}")
   if t.__locked__:
@@ -1124,57 +1321,138 @@ def Rsuper(builtins, T, *obj_or_type):
   return r(t, *argv)""",               globals={ '__builtins__': builtins },
                                        oc=oclass, r=ret)
             else:                       # translate as "RNodeTransformer" does
-                m= { '__setattr__': builtins['setattr'],
-                     '__delattr__': builtins['delattr'], }
-                if attr in m:
-                    if isinstance(term, type):
-                        return m[attr]
-                    return types.MethodType(m[attr], term)
-
+                if isinstance(term, type):
+                    return builtins[attr[2:-2]]
+                return types.MethodType(builtins[attr[2:-2]], term)
             return ret
         def __setattr__(self, attr, val):
             raise AttributeError(f"'super' object has no attribute '{attr}'")
+
+    slot = proxy.__dict__['__super_state__']
+    del proxy.__super_state__
+    S = slot.__get__
+
     proxy.lock()
+    return proxy, slot.__set__
+gRsuperType, gBindRsuper = RsuperType()
+
+def Rsuper(builtins, T, *obj_or_type):
+    if len(obj_or_type) == 0:
+        raise RuntimeError("super(): single argument form not supported")
+    
+    oclass = term = obj_or_type[0]
+    if not isinstance(oclass, type):
+        oclass = oclass.__class__
+    res = None
+    if isinstance(type(oclass), ReadOnly2_meta):
+        supermap = getattr(oclass, '__Rsupermap__', None)
+        if supermap != None:
+            res = supermap.get(T)
+            if res != None:
+                res = res(term)
+    if res == None:
+        res = super(T, *obj_or_type)
 
-    return proxy()
+    guarded = issubclass(oclass, Object) or issubclass(oclass, Dict)
+    proxy = gRsuperType()
+    gBindRsuper(proxy, (builtins, oclass, term, res, guarded))
+    return proxy
 
 
-def SafeFormatter(builtins):
-    class formatter(string.Formatter):
-        """
-        credits to Armin Ronacher
-        (https://lucumr.pocoo.org/2016/12/29/careful-with-str-format/)
-        """
-        def __init__(self):
-            super().__init__()
-
-        def get_field(self, field_name, args, kwargs):
-            first, rest = _string.formatter_field_name_split(field_name)
-            obj = self.get_value(first, args, kwargs)
-            for is_attr, i in rest:
-                if is_attr:
-                    obj = Rgetattr(builtins, obj, i)
-                else:
-                    obj = obj[i]
-            return obj, first
-
-    return formatter()
-
-def Rsafe_format(builtins, invoker, *argv, **kwargs):
+gFormatCache = LRUCache(1024)           # format string -> (parsed, native)
+gFieldCache = LRUCache(1024)            # field name -> (first, rest)
+
+def FieldSplit(field_name: str):
+    "'_string.formatter_field_name_split()', with 'rest' as a cached tuple"
+    if type(field_name) == str:
+        ret = gFieldCache.get(field_name)
+        if ret != None:
+            return ret
+    first, rest = _string.formatter_field_name_split(field_name)
+    ret = (first, tuple(rest))
+    if type(field_name) == str:
+        gFieldCache.put(field_name, ret)
+    return ret
+
+def FormatTemplate(fmt: str):
+    """
+    Returns the parsed form of a format string together with whether it is
+    'native', i.e. none of its fields (nested ones included) looks up an
+    attribute, so that 'str.format' itself can be used.  Only exact 'str's
+    are cached - the keys are compared across sandboxes.  None if 'fmt' is
+    not cacheable or malformed.
+    """
+    if type(fmt) != str:
+        return None
+    ret = gFormatCache.get(fmt)
+    if ret != None:
+        return ret
+    try:
+        parsed = tuple(_string.formatter_parser(fmt))
+        native = True
+        for _, field_name, spec, _ in parsed:
+            if field_name == None:
+                continue
+            if any(is_attr for is_attr, _ in FieldSplit(field_name)[1]):
+                native = False
+            if spec and '{' in spec:
+                nested = FormatTemplate(spec)
+                if nested == None:
+                    return None
+                native = native and nested[1]
+    except ValueError:
+        return None
+    return gFormatCache.put(fmt, (parsed, native))
+
+class SafeFormatter(string.Formatter):
+    """
+    credits to Armin Ronacher
+    (https://lucumr.pocoo.org/2016/12/29/careful-with-str-format/)
+
+    One instance serves a sandbox; parsed templates are shared among all of
+    them through 'gFormatCache'.
+    """
+    def __init__(self, builtins):
+        super().__init__()
+        self.builtins = builtins
+
+    def parse(self, format_string):
+        tmpl = FormatTemplate(format_string)
+        if tmpl == None:
+            return super().parse(format_string)
+        return tmpl[0]
+
+    def get_field(self, field_name, args, kwargs):
+        first, rest = FieldSplit(field_name)
+        obj = self.get_value(first, args, kwargs)
+        for is_attr, i in rest:
+            if is_attr:
+                obj = Rgetattr(self.builtins, obj, i)
+            else:
+                obj = obj[i]
+        return obj, first
+
+def Rsafe_format(formatter, invoker, *argv, **kwargs):
     if str.format == invoker.format:
         invoker = argv[0]
         argv = argv[1:]
     elif str.format.__get__(invoker) != invoker.format:
         return invoker.format(*argv, **kwargs)
-    return SafeFormatter(builtins).vformat(invoker, argv, kwargs)
+    tmpl = FormatTemplate(invoker)
+    if tmpl != None and tmpl[1]:
+        return str.format(invoker, *argv, **kwargs)
+    return formatter.vformat(invoker, argv, kwargs)
 
-def Rsafe_format_map(builtins, invoker, map, *extra):
+def Rsafe_format_map(formatter, invoker, map, *extra):
     if str.format_map == invoker.format_map:
         invoker = map
         map = extra[0]
     elif str.format_map.__get__(invoker) != invoker.format_map:
         return invoker.format_map(map)
-    return SafeFormatter(builtins).vformat(invoker, (), map)
+    tmpl = FormatTemplate(invoker)
+    if tmpl != None and tmpl[1]:
+        return str.format_map(invoker, map)
+    return formatter.vformat(invoker, (), map)
 
 def Rimport(aliases, __loader, __glbs, fr=None, level: int=0):
     lcls = __glbs['__mod']
@@ -1268,12 +1546,180 @@ def Rimport(aliases, __loader, __glbs, fr=None, level: int=0):
             setattr(lcls, i['asname'], mod)
     return None
 
-Interact = None
+# the interactive shell - its 'prog' lets the host read 'RException'
+# tracebacks (see 'bases.RException').  Set once: sandboxes on other threads
+# read it.
+Interact = IPythonShellInteract
 def hackme(**kwargs):
-    global Interact
-    Interact = IPythonShellInteract
     return Interact(**kwargs.copy())
 
+class SandboxInterrupt(BaseException):
+    "Raised in a thread running sandboxed code, to stop it"
+
+class SandboxRun:
+    """
+    A 'run()' of sandboxed code, on a host thread that another one can stop
+    ('stop()') by raising 'SandboxInterrupt' in it.  That only happens
+    between bytecodes - not during a long operation in C - and code catching
+    everything is interrupted again until it lets go.
+    """
+    def __init__(self, sandbox, source: str):
+        import ctypes
+        self.sandbox = sandbox
+        self.source = source
+        self.async_exc = ctypes.pythonapi.PyThreadState_SetAsyncExc
+        self.interrupt = ctypes.py_object(SandboxInterrupt)
+        self.thread = None              # id of the thread, while it runs code
+        self.lock = threading.Lock()    # over 'thread' and posting to it
+
+    def __call__(self):
+        import ctypes
+        thread = ctypes.c_ulong(threading.get_ident())
+        with self.lock:
+            self.thread = thread
+        try:
+            try:
+                return self.sandbox.run(self.source)
+            except SandboxInterrupt:
+                return None
+        finally:
+            # Once 'thread' is cleared under the lock, 'stop()' posts nothing
+            # more, and the call drops an interruption still pending: none
+            # can go off later, in the code running this or in the next run.
+            # One going off before the lock is taken is caught here.
+            while self.thread != None:
+                try:
+                    with self.lock:
+                        self.thread = None
+                        self.async_exc(thread, None)
+                except SandboxInterrupt:
+                    pass
+
+    def stop(self, job, loop, every: float=0.01):
+        "Interrupts the run (the 'job' future of this) until it is done"
+        with self.lock:
+            if self.thread != None:
+                self.async_exc(self.thread, self.interrupt)
+        if not job.done():
+            loop.call_later(every, self.stop, job, loop, every)
+
+gStatementSources = LRUCache(1024)      # sources that only compile as 'exec'
+
+class Sandbox:
+    """
+    A sandbox run from the host, without the interactive shell.  It has the
+    namespace 'IPythonShellInteract' builds, and its creation parameters
+    become its locals (as the shell's are).
+
+    'run()' and 'run_file()' return a 'Sandbox.Result': the value of the
+    code if it is an expression (None for statements), the exception it
+    raised (None if none) and the time it took, in seconds.
+    """
+    Result = collections.namedtuple('Result', ('value', 'error', 'elapsed'))
+
+    def __init__(self, g: Globals, locals: dict, codecache: LRUCache=None):
+        self.globals = g
+        self.locals = locals
+        self.codecache = codecache
+        self.executor = None            # the thread of 'run_async()'
+
+    @classmethod
+    def create(cls, **params):
+        """
+        Builds a sandbox.  '_CODECACHE' and '_CODESTORE' are taken as by
+        'hackme()'; the other parameters become the sandbox's locals.
+        """
+        codecache, codestore = SandboxCaches(params)
+        return cls(SandboxGlobals(codecache, codestore).lock(), params,
+                   codecache)
+
+    def run(self, source: str):
+        "Runs 'source' in the sandbox"
+        start = time.perf_counter()
+        value = error = None
+        try:
+            code = None
+            if gStatementSources.get(source) == None:
+                try:
+                    code = Rcompile(source, 'eval', self.codecache)
+                except SyntaxError:     # statements (or rejected code)
+                    gStatementSources.put(source, True)
+            if code != None:
+                value = eval(code, self.globals, self.locals)
+            else:
+                exec(Rcompile(source, 'exec', self.codecache), self.globals,
+                     self.locals)
+        except (Exception, RException) as exc:
+            error = exc
+        return __class__.Result(value, error, time.perf_counter() - start)
+
+    async def run_async(self, source: str, timeout: float=None):
+        """
+        Runs 'source' on a thread of the sandbox's own, leaving the event
+        loop free: runs of different sandboxes go on concurrently (e.g. under
+        'asyncio.gather()'), runs of one sandbox take turns.  A run still
+        going after 'timeout' seconds is stopped (see 'SandboxRun'), and its
+        result has a 'TimeoutError'.  Cancelling the awaiting task stops the
+        run too.
+        """
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        if self.executor == None:
+            self.executor = ThreadPoolExecutor(1, thread_name_prefix='sandbox')
+        start = time.perf_counter()
+        run = SandboxRun(self, source)
+        job = self.executor.submit(run)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(job), timeout)
+        except asyncio.TimeoutError:
+            run.stop(job, asyncio.get_running_loop())
+            return __class__.Result(None, TimeoutError('run stopped after' +
+                                                       f' {timeout} s'),
+                                    time.perf_counter() - start)
+        except asyncio.CancelledError:
+            run.stop(job, asyncio.get_running_loop())
+            raise
+
+    def run_file(self, path: str):
+        "Runs the script at 'path' (on the host) in the sandbox"
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        return self.run(source)
+
+gPlainTypes = (type(None), bool, int, float, complex, str, bytes)
+
+def portable(res: Sandbox.Result):
+    "'(value, error)' of a sandbox run, as host-only plain data"
+    value = res.value
+    if type(value) not in gPlainTypes:
+        value = repr(value)
+    error = None
+    if res.error != None:
+        error = f'{type(res.error).__name__}: {res.error}'
+    return value, error
+
+def run_batch(paths: list, **params):
+    """
+    Runs the scripts in 'paths' in turn in one 'Sandbox', created with
+    'params'.  Writes a JSON line per script to the standard output - the
+    scripts' own output goes to the standard error.  Returns the number of
+    scripts that failed.
+    """
+    sandbox = Sandbox.create(**params)
+    failed = 0
+    for path in paths:
+        with contextlib.redirect_stdout(sys.stderr):
+            res = sandbox.run_file(path)
+        if res.error != None:
+            failed += 1
+        print(json.dumps({
+            'script': path,
+            'value': None if res.value == None else repr(res.value),
+            'error': None if res.error == None else
+                     f'{type(res.error).__name__}: {res.error}',
+            'elapsed': res.elapsed }), flush=True)
+    return failed
+
 gBuiltIns['Object'] = Object
 gBuiltIns['Dict'] = Dict
 
@@ -1295,8 +1741,19 @@ class getset:
         #obj.lockdown(makeapi)
         return obj
 
-obj = getset()
-print(
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=
+        'Without scripts, launches the challenge shell.  Otherwise runs them ' +
+        'in turn in one headless sandbox - see "run_batch()".')
+    parser.add_argument('scripts', nargs='*', help='paths of scripts to run')
+    parser.add_argument('--codestore', metavar='DIR',
+                        help='persistent cache of imported modules\' code')
+    args = parser.parse_args()
+    if args.scripts:
+        sys.exit(1 if run_batch(args.scripts, _CODESTORE=args.codestore) else 0)
+
+    obj = getset()
+    print(
 """You are launched into an IPython (sub-)shell, executed in a 'jailed'
 scope/environment.  Your challenge is to find any loophole that
 lets you""", '"break out".', """
@@ -1307,7 +1764,7 @@ and decrement the integer.  One way to demonstrate a loophole is by
 showing that you can change obj's private variable into a Python 'str'
 (string).
 """)
-hackme(_NESTLVL=1, obj = obj.interface_factory())
-print("In the end, 'obj' has the value:")
-print(f'{obj.priv}: {type(obj.priv)}')
+    hackme(_NESTLVL=1, obj = obj.interface_factory())
+    print("In the end, 'obj' has the value:")
+    print(f'{obj.priv}: {type(obj.priv)}')
 
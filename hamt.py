@@ -0,0 +1,243 @@
+'''
+Persistent (immutable, structurally shared) map, as a hash array mapped
+trie.  Updates return a new map sharing all untouched nodes with the old
+one, so copying is O(1) and each update is O(log n) in time and memory.
+
+'HamtMap' is a mutable 'dict'-like facade over it whose 'copy()' is O(1);
+it backs 'bases.PDict'.
+'''
+
+from collections.abc import MutableMapping
+
+BITS = 5
+MASK = (1 << BITS) - 1
+HASHBITS = 64
+HASHMASK = (1 << HASHBITS) - 1
+
+
+def hash64(key):
+    return hash(key) & HASHMASK
+
+
+class Node:
+    "Bitmap-indexed trie node; entries are (hash, key, value) or 'Node's"
+    __slots__ = ('bitmap', 'array')
+
+    def __init__(self, bitmap: int=0, array: tuple=()):
+        self.bitmap = bitmap
+        self.array = array
+
+    def find(self, shift, h, key, default):
+        bit = 1 << ((h >> shift) & MASK)
+        if not self.bitmap & bit:
+            return default
+        entry = self.array[(self.bitmap & (bit - 1)).bit_count()]
+        if type(entry) == tuple:
+            if entry[1] is key or (entry[0] == h and entry[1] == key):
+                return entry[2]
+            return default
+        return entry.find(shift + BITS, h, key, default)
+
+    def assoc(self, shift, h, key, val):
+        "Returns (new node, whether 'key' was added)"
+        bit = 1 << ((h >> shift) & MASK)
+        idx = (self.bitmap & (bit - 1)).bit_count()
+        array = self.array
+        if not self.bitmap & bit:
+            return (__class__(self.bitmap | bit,
+                              array[:idx] + ((h, key, val),) + array[idx:]),
+                    True)
+        entry = array[idx]
+        if type(entry) == tuple:
+            if entry[1] is key or (entry[0] == h and entry[1] == key):
+                if entry[2] is val:
+                    return self, False
+                child, added = (h, key, val), False
+            else:
+                child, added = split(shift + BITS, entry, (h, key, val)), True
+        else:
+            child, added = entry.assoc(shift + BITS, h, key, val)
+            if child is entry:
+                return self, False
+        array = array[:idx] + (child,) + array[idx + 1:]
+        return __class__(self.bitmap, array), added
+
+    def without(self, shift, h, key):
+        "Returns the node without 'key' (None if empty, self if not found)"
+        bit = 1 << ((h >> shift) & MASK)
+        if not self.bitmap & bit:
+            return self
+        idx = (self.bitmap & (bit - 1)).bit_count()
+        array = self.array
+        entry = array[idx]
+        if type(entry) == tuple:
+            if not (entry[1] is key or (entry[0] == h and entry[1] == key)):
+                return self
+            child = None
+        else:
+            child = entry.without(shift + BITS, h, key)
+            if child is entry:
+                return self
+            if child != None and len(child.array) == 1 and\
+               type(child.array[0]) == tuple:
+                child = child.array[0]  # pull a lone entry up
+        if child == None:
+            if len(array) == 1:
+                return None
+            return __class__(self.bitmap & ~bit, array[:idx] + array[idx + 1:])
+        return __class__(self.bitmap, array[:idx] + (child,) + array[idx + 1:])
+
+    def __iter__(self):
+        "Yields the (hash, key, value) entries"
+        for entry in self.array:
+            if type(entry) == tuple:
+                yield entry
+            else:
+                yield from entry
+
+
+class Collisions:
+    "Entries whose hashes are equal in all 'HASHBITS' bits"
+    __slots__ = ('hash', 'array')
+
+    def __init__(self, h: int, array: tuple):
+        self.hash = h
+        self.array = array
+
+    def index(self, key):
+        for i, entry in enumerate(self.array):
+            if entry[1] is key or entry[1] == key:
+                return i
+        return -1
+
+    def find(self, shift, h, key, default):
+        i = self.index(key)
+        return default if i < 0 else self.array[i][2]
+
+    def assoc(self, shift, h, key, val):
+        i = self.index(key)
+        if i < 0:
+            return __class__(h, self.array + ((h, key, val),)), True
+        if self.array[i][2] is val:
+            return self, False
+        return (__class__(h, self.array[:i] + ((h, key, val),) +
+                             self.array[i + 1:]),
+                False)
+
+    def without(self, shift, h, key):
+        i = self.index(key)
+        if i < 0:
+            return self
+        if len(self.array) == 1:
+            return None
+        return __class__(h, self.array[:i] + self.array[i + 1:])
+
+    def __iter__(self):
+        return iter(self.array)
+
+
+def lookup(node, key, default):
+    "Iterative 'find()' from the root 'node' - the hot path of reads"
+    h = hash(key) & HASHMASK
+    shift = 0
+    while type(node) == Node:
+        bit = 1 << ((h >> shift) & MASK)
+        if not node.bitmap & bit:
+            return default
+        node = node.array[(node.bitmap & (bit - 1)).bit_count()]
+        if type(node) == tuple:
+            if node[1] is key or (node[0] == h and node[1] == key):
+                return node[2]
+            return default
+        shift += BITS
+    return node.find(shift, h, key, default)
+
+def split(shift, e1, e2):
+    "A node holding two entries that shared a slot at the previous level"
+    if shift >= HASHBITS:
+        return Collisions(e1[0], (e1, e2))
+    b1 = (e1[0] >> shift) & MASK
+    b2 = (e2[0] >> shift) & MASK
+    if b1 == b2:
+        return Node(1 << b1, (split(shift + BITS, e1, e2),))
+    return Node((1 << b1) | (1 << b2), (e1, e2) if b1 < b2 else (e2, e1))
+
+
+class Hamt:
+    "Immutable map; 'set()' and 'delete()' return new maps"
+    __slots__ = ('root', 'size')
+
+    def __init__(self, root: Node=None, size: int=0):
+        self.root = root if root != None else Node()
+        self.size = size
+
+    def get(self, key, default=None):
+        return lookup(self.root, key, default)
+
+    def set(self, key, val):
+        root, added = self.root.assoc(0, hash64(key), key, val)
+        if root is self.root:
+            return self
+        return __class__(root, self.size + 1 if added else self.size)
+
+    def delete(self, key):
+        "Raises 'KeyError' if 'key' is not present"
+        root = self.root.without(0, hash64(key), key)
+        if root is self.root:
+            raise KeyError(key)
+        return __class__(root, self.size - 1)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for entry in self.root:
+            yield entry[1]
+
+    def items(self):
+        for entry in self.root:
+            yield entry[1], entry[2]
+
+
+_missing = object()
+
+class HamtMap(MutableMapping):
+    """
+    Mutable mapping over a 'Hamt': every update swaps in a new version, so
+    'copy()' just shares the current one
+    """
+    __slots__ = ('hamt',)
+
+    def __init__(self, *argv, **kwargs):
+        self.hamt = Hamt()
+        if len(argv) == 1 and type(argv[0]) == __class__ and not kwargs:
+            self.hamt = argv[0].hamt
+        elif argv or kwargs:
+            self.update(*argv, **kwargs)
+
+    def __getitem__(self, key):
+        val = lookup(self.hamt.root, key, _missing)
+        if val is _missing:
+            raise KeyError(key)
+        return val
+    def get(self, key, default=None):
+        return lookup(self.hamt.root, key, default)
+    def __contains__(self, key):
+        return lookup(self.hamt.root, key, _missing) is not _missing
+
+    def __setitem__(self, key, val):
+        self.hamt = self.hamt.set(key, val)
+    def __delitem__(self, key):
+        self.hamt = self.hamt.delete(key)
+
+    def __len__(self):
+        return len(self.hamt)
+    def __iter__(self):
+        return iter(self.hamt)
+
+    def copy(self):
+        return __class__(self)
+
+    def __repr__(self):
+        return '{' + ', '.join(f'{k!r}: {v!r}'
+                               for k, v in self.hamt.items()) + '}'
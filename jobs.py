@@ -0,0 +1,18 @@
+'''
+What the job runners ('workerpool', 'zygote', 'subinterp') hand back.  It
+lives apart from them so a runner loads only what it uses - 'subinterp'
+does not import 'multiprocessing', nor the host's 'encap'.
+'''
+
+import collections
+
+
+JobResult = collections.namedtuple('JobResult', ('value', 'error', 'elapsed',
+                                                 'latency', 'worker',
+                                                 'stdout', 'stderr'),
+                                   defaults=(None, None))
+JobResult.__doc__ = '''
+The outcome of a job: 'value' and 'error' (see 'encap.portable()'),
+'elapsed' in the sandbox and 'latency' in the queue (seconds), the worker
+(a pid, or a subinterpreter's id), and what the job printed (None unless
+output is captured)'''
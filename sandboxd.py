@@ -0,0 +1,316 @@
+'''
+A local daemon running sandboxed code for clients on a Unix domain socket.
+
+Jobs run in a 'workerpool.WorkerPool' - processes that always hold a ready
+sandbox, so no request pays for starting one.  Queued jobs are handed to
+the pool only as workers free up: the highest-priority tenant that is below
+its concurrency limit goes first (lower 'priority' first, as with 'nice';
+in order of arrival within a tenant).
+
+The protocol is one JSON object per line, both ways.  A request:
+
+    { "op": "run", "id": ..., "tenant": "name", "source": "code",
+      "params": { "name": value, ... } }
+
+'params' become the sandbox's locals.  The reply carries the request's
+'id', with 'value', 'error', 'stdout', 'stderr' (bounded), 'elapsed' (in
+the sandbox) and 'latency' (from arrival to a worker), in seconds.
+Replies to pipelined requests come as jobs finish, not in order.
+'{ "op": "stats" }' returns queue depths, counts and latency percentiles.
+A request that fails - malformed, too long, or anything else - gets a reply
+with just 'error' (and 'id', if it could be read); the connection stays.
+'''
+
+import os, time, json, signal, socket
+import asyncio, argparse, collections, contextlib
+
+from workerpool import WorkerPool
+
+# 'json.loads()' uses the decoder 'encap' installs, whose errors are
+# 'RException's for sandboxed code - requests are host business
+gDecoder = json.JSONDecoder()
+
+class Tenant:
+    "The queue of a tenant's jobs, and how many of them are running"
+    def __init__(self, name: str, priority: int, limit: int):
+        self.name = name
+        self.priority = priority
+        self.limit = limit              # None: as many as there are workers
+        self.queue = collections.deque()    # (seq, arrived, source, params,
+        self.running = 0                    #  future)
+
+    def ready(self):
+        return self.queue and (self.limit == None or self.running < self.limit)
+
+
+def percentiles(values):
+    "Mean, median, 95th and 99th percentiles and maximum of 'values'"
+    values = sorted(values)
+    return { 'mean': sum(values) / len(values),
+             'p50': values[len(values) // 2],
+             'p95': values[int(len(values) * 0.95)],
+             'p99': values[int(len(values) * 0.99)],
+             'max': values[-1] }
+
+
+class Daemon:
+    """
+    Serves jobs on the socket at 'path' (readable and writable by its owner
+    only).  'tenants' maps names to '(priority, limit)'; all others share
+    one queue, '*', with 'default'.  At most 'max_queue' jobs wait - more
+    are refused - and requests are at most 'max_request' bytes long.  The
+    other parameters are those of 'WorkerPool' ('max_output' defaults to
+    64 kB).
+    """
+    def __init__(self, path: str, tenants: dict=None, default: tuple=(10, None),
+                 max_queue: int=10000, max_request: int=1 << 20,
+                 max_output: int=65536, **params):
+        self.path = path
+        self.max_queue = max_queue
+        self.max_request = max_request
+        self.params = dict(params, max_output=max_output)
+        self.tenants = { name: Tenant(name, *config)
+                         for name, config in (tenants or {}).items() }
+        self.tenants[None] = Tenant('*', *default)  # every other name
+        self.queued = self.running = self.seq = 0
+        self.completed = self.failed = self.refused = 0
+        self.latencies = collections.deque(maxlen=10000)   # arrival to worker
+        self.turnarounds = collections.deque(maxlen=10000) # arrival to result
+        self.pool = None
+
+    async def serve(self):
+        "Runs the pool and the server until cancelled (or SIGTERM)"
+        loop = asyncio.get_running_loop()
+        self.pool = WorkerPool(**self.params)
+        self.capacity = len(self.pool.workers)
+        self.started = time.monotonic()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.path)
+        server = await asyncio.start_unix_server(self.handle, path=self.path,
+                                                 limit=self.max_request)
+        os.chmod(self.path, 0o600)
+        loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            loop.remove_signal_handler(signal.SIGTERM)
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.path)
+            await loop.run_in_executor(None, self.pool.shutdown)
+
+    def tenant(self, name: str):
+        return self.tenants.get(name) or self.tenants[None]
+
+    async def handle(self, reader, writer):
+        "Reads a client's requests, answering each as it completes"
+        tasks = set()
+        try:
+            while True:
+                line = await self.read_request(reader)
+                if line == b'':
+                    break
+                task = asyncio.create_task(self.respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        """
+        The next line from 'reader' (b'' at the end), or None for one longer
+        than 'max_request' - read to its end, so the next one can follow
+        """
+        too_long = False
+        while True:
+            try:
+                line = await reader.readuntil(b'\n')
+            except asyncio.IncompleteReadError as exc:  # the last, unended
+                line = exc.partial
+            except asyncio.LimitOverrunError as exc:
+                too_long = True
+                await reader.readexactly(exc.consumed)  # dropped
+                continue
+            return None if too_long else line
+
+    async def respond(self, line: bytes, writer):
+        request_id = None
+        try:
+            if line == None:
+                raise ValueError('request longer than' +
+                                 f' {self.max_request} bytes')
+            request = gDecoder.decode(line.decode('utf-8'))
+            if type(request) != dict:
+                raise ValueError('a request must be a JSON object')
+            request_id = request.get('id')
+            op = request.get('op', 'run')
+            if op == 'run':
+                reply = await self.run(request)
+            elif op == 'stats':
+                reply = self.stats()
+            else:
+                raise ValueError(f"unknown op '{op}'")
+        except Exception as exc:        # the client gets an answer anyway
+            reply = { 'error': f'{type(exc).__name__}: {exc}' }
+        reply['id'] = request_id
+        try:
+            writer.write(json.dumps(reply, default=repr).encode() + b'\n')
+            await writer.drain()
+        except ConnectionError:         # the client is gone
+            pass
+
+    async def run(self, request: dict):
+        source, params = request.get('source'), request.get('params') or {}
+        if type(source) != str or type(params) != dict:
+            raise TypeError("'source' must be a string, 'params' an object")
+        if '_CODECACHE' in params or '_CODESTORE' in params:
+            raise ValueError('code caches are set for the whole daemon')
+        if self.queued >= self.max_queue:
+            self.refused += 1
+            return { 'error': 'RuntimeError: queue is full' }
+        tenant = self.tenant(str(request.get('tenant', '')))
+        arrived = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self.seq += 1
+        tenant.queue.append((self.seq, arrived, source, params, future))
+        self.queued += 1
+        self.dispatch()
+        try:
+            res = await future
+        except RuntimeError as exc:     # the worker died
+            return { 'error': f'RuntimeError: {exc}' }
+        self.turnarounds.append(time.monotonic() - arrived)
+        return { 'value': res.value, 'error': res.error, 'stdout': res.stdout,
+                 'stderr': res.stderr, 'elapsed': res.elapsed,
+                 'latency': res.latency }
+
+    def dispatch(self):
+        "Hands queued jobs to the pool while it has idle workers"
+        loop = asyncio.get_running_loop()
+        while self.running < self.capacity:
+            ready = [ t for t in self.tenants.values() if t.ready() ]
+            if not ready:
+                return
+            tenant = min(ready, key=lambda t: (t.priority, t.queue[0][0]))
+            _, arrived, source, params, future = tenant.queue.popleft()
+            self.queued -= 1
+            try:
+                job = self.pool.submit(source, params)
+            except Exception as exc:    # e.g. the pool is shut down
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(exc)
+                continue
+            tenant.running += 1
+            self.running += 1
+            latency = time.monotonic() - arrived
+            self.latencies.append(latency)
+            job.add_done_callback(lambda job, tenant=tenant, future=future,
+                                         latency=latency:
+                loop.call_soon_threadsafe(self.finish, tenant, job, future,
+                                          latency))
+
+    def finish(self, tenant: Tenant, job, future, latency: float):
+        "A job is done (in the loop): its worker can take another"
+        tenant.running -= 1
+        self.running -= 1
+        if job.exception() != None:
+            self.failed += 1
+            if not future.done():
+                future.set_exception(job.exception())
+        else:
+            self.completed += 1
+            if not future.done():
+                future.set_result(job.result()._replace(latency=latency))
+        self.dispatch()
+
+    def stats(self):
+        "Queue depths, counts, throughput (jobs/s) and latencies (s)"
+        stats = { 'workers': self.capacity, 'queued': self.queued,
+                  'running': self.running, 'completed': self.completed,
+                  'failed': self.failed, 'refused': self.refused,
+                  'throughput': self.completed /
+                                (time.monotonic() - self.started),
+                  'tenants': { t.name: { 'priority': t.priority,
+                                         'limit': t.limit,
+                                         'queued': len(t.queue),
+                                         'running': t.running }
+                               for t in self.tenants.values() } }
+        if self.latencies:
+            stats['latency'] = percentiles(self.latencies)
+        if self.turnarounds:
+            stats['turnaround'] = percentiles(self.turnarounds)
+        return stats
+
+
+class Client:
+    "A blocking client of a 'Daemon', one request at a time"
+    def __init__(self, path: str):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(path)
+        self.file = self.socket.makefile('rwb')
+        self.next_id = 0
+
+    def __enter__(self):
+        return self
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
+
+    def request(self, **request):
+        self.next_id += 1
+        request['id'] = self.next_id
+        self.file.write(json.dumps(request).encode() + b'\n')
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError('the daemon closed the connection')
+        return gDecoder.decode(line.decode('utf-8'))
+
+    def run(self, source: str, tenant: str='', **params):
+        "The reply to running 'source' with 'params' as its locals"
+        return self.request(op='run', tenant=tenant, source=source,
+                            params=params)
+
+    def stats(self):
+        return self.request(op='stats')
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Serves sandboxed code on a Unix domain socket')
+    parser.add_argument('socket', help='path of the socket to listen on')
+    parser.add_argument('--workers', type=int,
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('--tenant', action='append', default=[],
+                        metavar='NAME:PRIORITY[:LIMIT]',
+                        help="a tenant's priority (lower first) and limit" +
+                             ' of running jobs')
+    parser.add_argument('--max-queue', type=int, default=10000,
+                        help='jobs allowed to wait')
+    parser.add_argument('--max-request', type=int, default=1 << 20,
+                        help='bytes allowed in a request')
+    parser.add_argument('--max-output', type=int, default=65536,
+                        help='characters kept of a job\'s stdout and stderr')
+    parser.add_argument('--codestore',
+                        help='directory caching the compiled code of modules')
+    args = parser.parse_args()
+
+    tenants = {}
+    for spec in args.tenant:
+        name, priority, *limit = spec.split(':')
+        tenants[name] = (int(priority), int(limit[0]) if limit else None)
+    params = { '_CODESTORE': args.codestore } if args.codestore else {}
+    daemon = Daemon(args.socket, tenants, workers=args.workers,
+                    max_queue=args.max_queue, max_request=args.max_request,
+                    max_output=args.max_output,
+                    **params)
+    try:
+        asyncio.run(daemon.serve())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
@@ -0,0 +1,250 @@
+'''
+Sandboxed code run in subinterpreters, each with its own GIL (Python 3.12+).
+
+The host keeps state at module level - 'makeapi' and 'Interact' in
+'encap', the decoder 'json' is patched with - so every sandbox of one
+interpreter shares it, and its GIL.  A 'Subinterpreter' imports its own
+'encap' (and 'bases', 'json', ...) in an interpreter of its own: nothing
+mutable is shared with the sandboxes of other subinterpreters, and
+CPU-bound code in them runs on as many cores as there are threads driving
+them.  What the process holds for all of them - the working directory
+('file:' modules), the environment, file descriptors - still is shared.
+
+Results cross back as in 'workerpool': plain data, or 'repr()', and errors
+as text.  On older Pythons, creating a 'Subinterpreter' raises
+RuntimeError - and tests/test_subinterp.py skips all but that check, so
+changes here need a run of it under 3.12 or 3.13.
+'''
+
+import os, sys, ast, time, threading, tempfile, pickle, queue
+from concurrent.futures import Future
+
+from jobs import JobResult
+
+try:
+    import _interpreters as interpreters        # 3.13+
+except ImportError:
+    try:
+        import _xxsubinterpreters as interpreters
+    except ImportError:
+        interpreters = None
+
+gSupported = interpreters != None and sys.version_info >= (3, 12)
+
+# Extension modules whose process-wide state is set up by the first
+# interpreter to import them, and freed wrongly at exit (aborting the
+# process) if that was an isolated one: '_datetime' once two were, and on
+# 3.12 OpenSSL ('hashlib', 'ssl' - 'encap' imports 'urllib.request').  The
+# host imports them first.
+if gSupported:
+    import datetime
+    if sys.version_info < (3, 13):
+        import hashlib, ssl
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# run in a new interpreter, with 'params' shared; results are pickled to
+# the file the host passes as 'fd'
+BOOTSTRAP = f'''
+import ast, os, sys, pickle
+sys.path.insert(0, {ROOT!r})
+import encap
+
+def _report(res, fd):
+    data = pickle.dumps((encap.portable(res), res.elapsed),
+                        pickle.HIGHEST_PROTOCOL)
+    os.lseek(fd, 0, os.SEEK_SET)
+    os.ftruncate(fd, 0)
+    while data:
+        data = data[os.write(fd, data):]
+
+_params = ast.literal_eval(params)
+_sandbox = encap.Sandbox.create(**_params)
+'''
+RUN = '_report(_sandbox.run(source), fd)'
+RESET = '_sandbox = encap.Sandbox.create(**_params)'
+
+
+class Subinterpreter:
+    """
+    A sandbox - 'encap.Sandbox.create(**params)' - in an interpreter of its
+    own.  'params' must be literals ('_CODESTORE' a path, not a 'CodeStore').
+    Runs one job at a time: to use several cores, drive several of them
+    from as many threads (see 'SubinterpreterPool').
+    """
+    def __init__(self, **params):
+        if not gSupported:
+            raise RuntimeError('subinterpreters with their own GIL need' +
+                               f' Python 3.12+ (this is {sys.version.split()[0]})')
+        if ast_literal(params) != params:
+            raise TypeError('sandbox parameters must be literals')
+        if hasattr(interpreters, 'new_config'):
+            self.id = interpreters.create(interpreters.new_config('isolated'))
+        else:
+            self.id = interpreters.create(isolated=True)
+        self.lock = threading.Lock()
+        self.results = tempfile.TemporaryFile()
+        try:
+            self.execute(BOOTSTRAP, params=repr(params))
+        except:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.close()
+
+    def execute(self, script: str, **shared):
+        "Runs the host 'script' in the subinterpreter"
+        err = interpreters.run_string(self.id, script, shared)
+        if err != None:                 # 3.13 returns, rather than raises, it
+            raise RuntimeError(f'subinterpreter {self.id} failed:\n' +
+                               str(getattr(err, 'formatted', err)))
+
+    def run(self, source: str, submitted: float=None):
+        """
+        Runs 'source' in the sandbox.  Returns a 'JobResult' ('latency' from
+        'submitted', a 'time.monotonic()', if given) whose 'worker' is the
+        interpreter's id.
+        """
+        with self.lock:
+            started = time.monotonic()
+            self.execute(RUN, source=source, fd=self.results.fileno())
+            self.results.seek(0)
+            (value, error), elapsed = pickle.load(self.results)
+        return JobResult(value, error, elapsed,
+                         None if submitted == None else started - submitted,
+                         int(self.id))
+
+    def reset(self):
+        "Replaces the sandbox with a fresh one"
+        with self.lock:
+            self.execute(RESET)
+
+    def close(self):
+        "Destroys the subinterpreter - from the thread that created it"
+        with self.lock:
+            if self.results != None:
+                self.results.close()
+                self.results = None
+                interpreters.destroy(self.id)
+
+def ast_literal(params: dict):
+    "'params' as read back from its 'repr()', or None if that fails"
+    try:
+        return ast.literal_eval(repr(params))
+    except (ValueError, SyntaxError):
+        return None
+
+
+class SubinterpreterPool:
+    """
+    Runs jobs on 'workers' threads (default: one per CPU), each driving a
+    'Subinterpreter' of its own - created, and closed, by that thread.
+    Every job gets a fresh sandbox, built with 'params'.  'submit()' returns
+    a 'Future' of a 'JobResult'.  A worker whose sandbox cannot be rebuilt
+    starts over in a new interpreter; if it cannot build that either, it
+    stops - and the last one to stop fails the jobs still waiting.
+    """
+    def __init__(self, workers: int=None, **params):
+        if not gSupported:
+            Subinterpreter(**params)    # raises
+        self.params = params
+        self.lock = threading.Lock()
+        self.jobs = queue.SimpleQueue()     # (future, source, submitted)
+        self.closing = False
+        self.threads = []
+        self.live = 0                   # worker threads still taking jobs
+        ready = []
+        for _ in range(workers or os.cpu_count() or 1):
+            ready.append(Future())
+            self.threads.append(threading.Thread(target=self.work,
+                                                 args=(ready[-1],), daemon=True))
+            self.threads[-1].start()
+        try:
+            for started in ready:
+                started.result()
+        except:
+            self.shutdown()
+            raise
+
+    def __enter__(self):
+        return self
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.shutdown()
+
+    def work(self, ready: Future):
+        "Worker thread: runs jobs until it is handed None"
+        try:
+            interp = Subinterpreter(**self.params)
+        except BaseException as exc:
+            ready.set_exception(exc)
+            return
+        with self.lock:
+            self.live += 1
+        ready.set_result(None)
+        try:
+            while True:
+                job = self.jobs.get()
+                if job == None:
+                    return
+                future, source, submitted = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    res = interp.run(source, submitted)
+                except BaseException as exc:
+                    future.set_exception(exc)
+                else:
+                    future.set_result(res)
+                try:
+                    interp.reset()
+                except Exception:       # start over in a new interpreter
+                    interp.close()
+                    interp = Subinterpreter(**self.params)
+        except BaseException as exc:
+            self.stop(exc)
+        finally:
+            interp.close()
+
+    def stop(self, exc: BaseException):
+        "A worker can go on no more: the last one fails the waiting jobs"
+        with self.lock:
+            self.live -= 1
+            if self.live > 0:
+                return
+            self.closing = True
+        error = RuntimeError(f'no subinterpreter left to run jobs: {exc!r}')
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                return
+            if job != None and job[0].set_running_or_notify_cancel():
+                job[0].set_exception(error)
+
+    def submit(self, source: str):
+        "Runs 'source' in a fresh sandbox"
+        future = Future()
+        with self.lock:
+            if self.closing:
+                raise RuntimeError('cannot submit - pool is shut down')
+            self.jobs.put((future, source, time.monotonic()))
+        return future
+
+    def map(self, sources):
+        "'JobResult's of running each of 'sources', in order"
+        futures = [ self.submit(source) for source in sources ]
+        return (future.result() for future in futures)
+
+    def shutdown(self, wait: bool=True):
+        "Stops taking jobs; workers exit once the pending ones are done"
+        with self.lock:
+            if not self.closing:
+                self.closing = True
+                for _ in self.threads:
+                    self.jobs.put(None)
+        if wait:
+            for thread in self.threads:
+                thread.join()
@@ -0,0 +1,17 @@
+'''
+Shared setup for the tests in this directory.  Run them from the top of the
+tree, e.g. "python3 -m pytest -q tests" (or "python3 -m unittest discover
+tests"); they need the same environment as "run/__start__".
+'''
+
+import os, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_encap():
+    "Imports the sandbox host ('encap.py') - the challenge shell is not started"
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import encap
+    return encap
@@ -0,0 +1,134 @@
+'''
+The persistent map ('hamt') behind 'bases.PDict': it reads as a 'dict'
+given the same updates would, keeps keys whose hashes collide apart, and
+leaves every earlier version as it was.  A 'PDict' locks as a 'Dict' does.
+'''
+
+import random, unittest
+
+from support import load_encap
+
+encap = load_encap()
+import hamt
+from bases import Dict, PDict
+
+class Key:
+    "A key hashing as told - to make hashes collide"
+    def __init__(self, name, h: int):
+        self.name, self.h = name, h
+    def __hash__(self):
+        return self.h
+    def __eq__(self, other):
+        return type(other) == Key and other.name == self.name
+    def __repr__(self):
+        return f'Key({self.name!r})'
+
+class HamtTest(unittest.TestCase):
+    def assertSame(self, m, d: dict):
+        self.assertEqual(len(m), len(d))
+        self.assertEqual(dict(m.items()), d)
+        for k, v in d.items():
+            self.assertEqual(m[k], v)
+
+    def test_random(self):
+        rand = random.Random(12)
+        keys = [ *range(-300, 300), *(f'k{i}' for i in range(300)),
+                 -1, -2, 2 ** 61 - 1, 2 ** 64, None, (1, 2) ]
+        m, d = hamt.HamtMap(), {}
+        for step in range(20000):
+            k = rand.choice(keys)
+            if rand.random() < 0.6:
+                m[k] = d[k] = step
+            elif k in d:
+                del m[k], d[k]
+            else:
+                with self.assertRaises(KeyError):
+                    del m[k]
+            self.assertEqual(k in m, k in d)
+            self.assertEqual(m.get(k, 'none'), d.get(k, 'none'))
+            if step % 1000 == 0:
+                self.assertSame(m, d)
+        self.assertSame(m, d)
+
+    def test_collisions(self):
+        for h in [ 7, -1, 2 ** 63 + 7, 7 + (1 << 62) ]:
+            # the same hash, and ones equal in all but the top bits
+            keys = [ Key(i, h) for i in range(10) ] +\
+                   [ Key(f'top{i}', h ^ (1 << (63 - i))) for i in range(3) ]
+            m, d = hamt.HamtMap(), {}
+            for i, k in enumerate(keys):
+                m[k] = d[k] = i
+            self.assertSame(m, d)
+            for k in keys[::2]:         # overwritten
+                m[k] = d[k] = 'new'
+            self.assertSame(m, d)
+            self.assertNotIn(Key('other', h), m)
+            with self.assertRaises(KeyError):
+                del m[Key('other', h)]
+            for k in reversed(keys):    # down to empty
+                del m[k], d[k]
+                self.assertSame(m, d)
+            self.assertEqual((len(m), list(m)), (0, []))
+            m[keys[0]] = 1
+            self.assertEqual(m[Key(0, h)], 1)
+
+    def test_versions(self):
+        rand = random.Random(5)
+        versions = [ (hamt.Hamt(), {}) ]
+        for step in range(2000):
+            h, d = versions[rand.randrange(len(versions))]
+            k = rand.randrange(200)
+            if k in d and rand.random() < 0.4:
+                h, d = h.delete(k), { i: v for i, v in d.items() if i != k }
+            else:
+                h, d = h.set(k, step), { **d, k: step }
+            versions.append((h, d))
+        for h, d in versions:
+            self.assertEqual(dict(h.items()), d)
+            self.assertEqual(len(h), len(d))
+        h = hamt.Hamt().set('a', 1)
+        self.assertIs(h.set('a', h.get('a')), h)
+        self.assertEqual(h.get('b', 'none'), 'none')
+
+    def test_copy(self):
+        m = hamt.HamtMap({ i: i for i in range(100) })
+        c = m.copy()
+        c[0] = 'c'
+        del c[1]
+        m[2] = 'm'
+        self.assertEqual((m[0], m[1], c[2]), (0, 1, 2))
+        self.assertEqual((c[0], 1 in c, m[2]), ('c', False, 'm'))
+
+class PDictTest(unittest.TestCase):
+    def test_lock(self):
+        p = PDict({ 'a': 1, 'child': Dict({ 'n': 1 }) }).lock(True)
+        for change in [ lambda: p.__setitem__('x', 1),
+                        lambda: p.__delitem__('a'), lambda: p.pop('a'),
+                        lambda: p.popitem(), lambda: p.clear(),
+                        lambda: p.update(x=1),
+                        lambda: p['child'].__setitem__('m', 2) ]:
+            with self.assertRaises(RuntimeError):
+                change()
+        self.assertEqual(p.pop('none', 5), 5)
+        self.assertTrue(p['child'].__locked__)
+
+    def test_copy(self):
+        p = PDict({ 'a': 1 }).lock()
+        c = p.copy()
+        self.assertIs(type(c), PDict)
+        c['b'] = 2                      # a copy is not locked
+        self.assertEqual(('b' in p, c['a'], c['b']), (False, 1, 2))
+
+    def test_lockdown(self):
+        p = PDict({ 'a': 1, 'child': Dict({ 'n': 1 }) })
+        p.lockdown(encap.makeapi, True)
+        child = p['child']
+        self.assertNotIsInstance(child, Dict)
+        self.assertEqual(child['n'], 1)
+        self.assertIs(p['child'], child)
+        sandbox = encap.Sandbox.create(p=p.as_dict(encap.makeapi))
+        self.assertEqual(sandbox.run('p["child"]["n"] + p["a"]').value, 2)
+        self.assertIsInstance(sandbox.run('p["b"] = 1').error, RuntimeError)
+
+if __name__ == '__main__':
+    unittest.main()
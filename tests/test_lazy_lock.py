@@ -0,0 +1,125 @@
+'''
+Lazy 'lock()' and 'lockdown()' of 'bases.Dict' and 'bases.Object': a
+child first read before 'settle()' - by key, 'get()', 'items()',
+'values()', 'copy()', an attribute or 'as_mapping()' - or after it, is
+what the eager call would have made of it: the locked 'Dict' after
+'lock()', its 'as_dict()' view (or a locked down 'Object') after
+'lockdown()'.  Never the raw unlocked 'Dict'.
+'''
+
+import unittest
+
+from support import load_encap
+
+encap = load_encap()
+from bases import Dict, Object
+
+def tree():
+    "A 'Dict' with a nested 'Dict', a nested 'Object' and a plain value"
+    inner = Object()
+    inner.leaf = Dict({ 'n': 3 })
+    return Dict({ 'child': Dict({ 'grandchild': Dict({ 'n': 1 }), 'n': 2 }),
+                  'inner': inner, 'n': 0 })
+
+READS = {
+    'item': lambda d: d['child'],
+    'get': lambda d: d.get('child'),
+    'items': lambda d: dict(d.items())['child'],
+    'values': lambda d: list(d.values())[0],
+    'copy': lambda d: d.copy()['child'],
+}
+
+class LazyLockTest(unittest.TestCase):
+    def assertLocked(self, d):
+        self.assertIs(type(d), Dict)
+        self.assertTrue(d.__locked__)
+        with self.assertRaises(RuntimeError):
+            d['new'] = 1
+
+    def assertView(self, d):
+        self.assertNotIsInstance(d, Dict)
+        with self.assertRaises(RuntimeError):
+            d['new'] = 1
+
+    def assertLockedDown(self, obj):
+        self.assertIsInstance(obj, Object)
+        self.assertNotIsInstance(obj.__proxydict__, Dict)
+        self.assertView(obj.leaf)
+        with self.assertRaises(RuntimeError):
+            obj.new = 1
+
+    def test_lock(self):
+        for settled in [ False, True ]:
+            for name, read in READS.items():
+                d = tree().lock(True)
+                self.assertNotEqual(d.__pending__, None)
+                if settled:
+                    d.settle()
+                    self.assertEqual(d.__pending__, None)
+                child = read(d)
+                self.assertLocked(child)
+                self.assertLocked(child['grandchild'])
+                self.assertIs(read(d), child, name)
+
+    def test_lockdown(self):
+        for settled in [ False, True ]:
+            for name, read in READS.items():
+                d = tree().lockdown(encap.makeapi, True)
+                if settled:
+                    d.settle()
+                    self.assertEqual(d.__pending__, None)
+                child = read(d)
+                self.assertView(child)
+                self.assertView(child['grandchild'])
+                self.assertEqual(child['grandchild']['n'], 1)
+                self.assertIs(read(d), child, name)
+                self.assertLockedDown(d['inner'])
+
+    def test_settle_keys(self):
+        d = tree().lockdown(encap.makeapi, True)
+        d.settle('child', 'missing')
+        self.assertEqual(d.__pending__, { 'inner' })
+        self.assertView(d.store['child'])
+        self.assertIsInstance(d.store['inner'].__proxydict__, Dict)
+        self.assertLockedDown(d['inner'])
+        self.assertEqual(d.__pending__, None)
+
+    def test_repr(self):
+        d = tree().lockdown(encap.makeapi, True)
+        repr(d)
+        self.assertEqual(d.__pending__, None)
+        self.assertView(d.store['child'])
+
+    def test_as_mapping(self):
+        mapping = tree().lock(True).as_mapping()
+        self.assertLocked(mapping['child'])
+        self.assertLocked(mapping['child']['grandchild'])
+        d = tree().lockdown(encap.makeapi, True)
+        mapping = d.as_mapping()
+        self.assertView(mapping['child'])
+        self.assertView(mapping['child']['grandchild'])
+        self.assertLockedDown(mapping['inner'])
+
+    def test_object(self):
+        for settled in [ False, True ]:
+            obj = Object()
+            obj.child, obj.inner = Dict({ 'n': 1 }), Object()
+            obj.inner.leaf = Dict()
+            obj.lock(True)
+            if settled:
+                obj.__proxydict__.settle()
+            self.assertLocked(obj.child)
+            self.assertIs(obj.__proxydict__['child'], obj.child)
+
+            obj = Object()
+            obj.child, obj.inner = Dict({ 'n': 1 }), Object()
+            obj.inner.leaf = Dict()
+            obj.lockdown(encap.makeapi, True)
+            if settled:
+                dict(obj.__proxydict__.items())
+            self.assertView(obj.child)
+            self.assertIs(obj.__proxydict__['child'], obj.child)
+            self.assertLockedDown(obj.inner)
+
+if __name__ == '__main__':
+    unittest.main()
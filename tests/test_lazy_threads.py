@@ -0,0 +1,156 @@
+'''
+Lazily built host state first used by many threads at once: a module
+namespace ('encap.Namespace') and the children of a lazily locked-down
+'Dict'.  Every thread must see each value, built once - not a KeyError, an
+AttributeError or a child not locked down yet.  Sandboxes run side by side
+get their own answers, imports included (the importer's recursion guard is
+per thread), and a thread granting itself an 'RException' traceback does
+not grant it to the host reading it at the same time.
+'''
+
+import os, sys, time, random, threading, unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from support import ROOT, load_encap
+
+encap = load_encap()
+from bases import Dict
+from ISPy_importer import HttpImporter
+
+THREADS = 16
+TRIALS = 20
+JOBS = 48
+SOURCE = '''
+import hello2
+words = []
+for i in range(50):
+    words.append('{0}-{1:>4}'.format(n, i))
+d = Dict({ 'n': n })
+try:
+    1 / 0
+except:
+    err = n
+result = (len(words), words[-1], d['n'], err,
+          json.loads(json.dumps({ 'n': n }))['n'])
+'''
+
+def slow(value):
+    "A builder that gives other threads time to get in"
+    def build():
+        time.sleep(0.0005)
+        return value
+    return build
+
+class LazyThreadsTest(unittest.TestCase):
+    def setUp(self):
+        self.interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.interval)
+
+    def race(self, read):
+        "Errors of THREADS threads calling 'read()' at once"
+        barrier = threading.Barrier(THREADS)
+        errors = []
+        def work():
+            barrier.wait()
+            try:
+                read()
+            except BaseException as exc:
+                errors.append(f'{type(exc).__name__}: {exc}')
+        threads = [ threading.Thread(target=work) for _ in range(THREADS) ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_namespace(self):
+        for _ in range(TRIALS):
+            built = []
+            ns = encap.Namespace(None, lambda: random,
+                                 lambda m: encap.ExportedNames(m, m.__all__),
+                                 extras={ 'extra': lambda: built.append(1) or
+                                                           slow('extra')() })
+            names = [ *encap.ExportedNames(random, random.__all__), 'extra' ]
+            def read():
+                for name in names:
+                    getattr(ns, name)
+            self.assertEqual(self.race(read), [])
+            self.assertEqual(built, [ 1 ])
+            self.assertEqual(ns.extra, 'extra')
+
+    def test_lockdown(self):
+        for _ in range(TRIALS):
+            children = [ Dict({ 'n': i }) for i in range(20) ]
+            d = Dict({ f'k{i}': c for i, c in enumerate(children) })
+            d.lockdown(encap.makeapi, True)
+            views = [ [] for _ in children ]
+            def read():
+                for i, seen in enumerate(views):
+                    seen.append(d[f'k{i}'])
+            self.assertEqual(self.race(read), [])
+            for child, seen in zip(children, views):
+                self.assertEqual({ id(view) for view in seen },
+                                 { id(seen[0]) })
+                self.assertNotIsInstance(seen[0], Dict)
+                self.assertEqual(seen[0]['n'], child['n'])
+
+    def test_sandboxes(self):
+        def job(n):
+            sandbox = encap.Sandbox.create(n=n)
+            res = sandbox.run(SOURCE)
+            if res.error == None:
+                res = sandbox.run('result')
+            return res.error or res.value
+        cwd = os.getcwd()
+        os.chdir(os.path.join(ROOT, 'run'))     # 'file:' modules are local
+        try:
+            with ThreadPoolExecutor(8) as pool:
+                results = list(pool.map(job, range(JOBS)))
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(results, [ (50, f'{n}-  49', n, n, n)
+                                    for n in range(JOBS) ])
+
+    def test_import_guard(self):
+        importer = HttpImporter(None, None, [ 'hello2' ], 'file:')
+        held, release = threading.Event(), threading.Event()
+        def nested():                   # mid-import of 'hello2' on its own
+            importer.in_progress['hello2'] = True
+            held.set()
+            release.wait(30)
+        thread = threading.Thread(target=nested)
+        thread.start()
+        try:
+            held.wait(30)
+            self.assertIs(importer.find_module('hello2'), importer)
+            self.assertEqual(importer.in_progress, {})
+        finally:
+            release.set()
+            thread.join()
+
+    def test_tracebacks(self):
+        try:
+            raise encap.RException('crosstalk')
+        except encap.RException as exc:
+            err = exc
+        tb = super(encap.RException, err).__traceback__
+        done = threading.Event()
+        def grant():
+            while not done.is_set():
+                err.with_traceback(tb)
+        thread = threading.Thread(target=grant)
+        thread.start()
+        try:
+            leaked = sum(type(err.__traceback__) != list for _ in range(20000))
+        finally:
+            done.set()
+            thread.join()
+        self.assertEqual(leaked, 0)
+        self.assertIs(err.with_traceback(tb), err)
+        self.assertEqual(type(err.__traceback__), list)
+
+if __name__ == '__main__':
+    unittest.main()
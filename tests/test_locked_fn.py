@@ -0,0 +1,62 @@
+'''
+'LockedFn' wrappers: they share one locked type, forward a function's
+metadata, and hold the function in a slot only the type's methods can read
+- no table of every wrapped function is reachable from them.
+'''
+
+import inspect, unittest
+
+from support import load_encap
+
+encap = load_encap()
+import bases
+
+def sample(a, b: int=2, *, c=3):
+    "A function to wrap"
+    return a + b + c
+
+class LockedFnTest(unittest.TestCase):
+    def setUp(self):
+        self.fn = encap.LockedFn(sample)
+
+    def test_forwarding(self):
+        fn = self.fn
+        self.assertEqual(fn(1), 6)
+        self.assertEqual((fn.__name__, fn.__qualname__, fn.__module__,
+                          fn.__doc__), ('sample', 'sample', __name__,
+                                        'A function to wrap'))
+        self.assertEqual(fn.__annotations__, { 'b': int })
+        self.assertEqual(fn.__kwdefaults__, { 'c': 3 })
+        self.assertEqual(inspect.signature(fn), inspect.signature(sample))
+        self.assertIs(type(fn), type(encap.LockedFn(len)))
+
+    def test_locked(self):
+        fn = self.fn
+        for attr in [ '__wrapped_fn__', '__dict__', '__code__' ]:
+            self.assertEqual(getattr(fn, attr, None), None)
+        self.assertNotIn('__wrapped_fn__', vars(type(fn)))
+        with self.assertRaises(RuntimeError):
+            fn.__name__ = 'other'
+        with self.assertRaises(RuntimeError):
+            type(fn).__call__ = None
+
+    def test_closures(self):
+        "Methods close over a getter of a wrapper's function, not a table"
+        cls = type(self.fn)
+        fns = [ cls.__call__, cls.__getattr__ ] + [
+            vars(cls)[name].fget for name in [ '__name__', '__signature__' ] ]
+        for fn in fns:
+            for cell in fn.__closure__ or ():
+                self.assertNotIsInstance(cell.cell_contents,
+                                         (dict, bases.StateTable, bases.Dict))
+
+    def test_sandbox(self):
+        sandbox = encap.Sandbox.create(fn=self.fn)
+        self.assertEqual(sandbox.run('fn(1, c=0)').value, 3)
+        for source in [ 'fn.__wrapped_fn__', 'type(fn).__call__.__closure__',
+                        'fn.__qualname__ = "x"' ]:
+            with self.subTest(source):
+                self.assertNotEqual(sandbox.run(source).error, None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+'''
+Read-only 'dict' views ('bases.mapping_view()'): views of an interface share
+one type, and nothing reachable from a view or its methods leads to the
+targets of other views.
+'''
+
+import unittest
+
+from support import load_encap
+
+encap = load_encap()
+import bases
+
+class MappingViewTest(unittest.TestCase):
+    def setUp(self):
+        self.dicts = [ bases.Dict({ 'n': i }).lock() for i in range(3) ]
+        self.views = [ d.as_dict(encap.makeapi) for d in self.dicts ]
+
+    def test_forwarding(self):
+        for i, view in enumerate(self.views):
+            self.assertEqual(view['n'], i)
+            self.assertEqual(list(view.keys()), [ 'n' ])
+            self.assertIs(bases.proxy_dict(view), self.dicts[i])
+        self.assertEqual(len({ type(view) for view in self.views }), 1)
+        with self.assertRaises(RuntimeError):
+            self.views[0]['n'] = 1
+
+    def test_target_hidden(self):
+        view = self.views[0]
+        for attr in [ '__target__', '__dict__' ]:
+            self.assertEqual(getattr(view, attr, None), None)
+        self.assertNotIn('__target__', vars(type(view)))
+        self.assertEqual(view.__reduce_ex__(2)[2], None)
+
+    def test_closures(self):
+        "Methods close over a getter of a view's target, not a table of them"
+        for name in [ '__getitem__', 'keys', '__repr__' ]:
+            fn = getattr(type(self.views[0]), name)
+            for cell in fn.__closure__ or ():
+                self.assertNotIsInstance(cell.cell_contents,
+                                         (dict, bases.StateTable, bases.Dict))
+
+    def test_sandbox(self):
+        sandbox = encap.Sandbox.create()
+        for source in [ 'globals().__target__',
+                        "globals().__getitem__.__func__.__closure__" ]:
+            with self.subTest(source):
+                self.assertNotEqual(sandbox.run(source).error, None)
+
+if __name__ == '__main__':
+    unittest.main()
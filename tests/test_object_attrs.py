@@ -0,0 +1,109 @@
+'''
+Attribute reads on 'bases.Object', whose data lives in the proxy dict and
+is read from there without raising first, against the lookup it replaced:
+the class, then '__getattr__'.  Names the class resolves - class
+attributes, methods, properties - win over proxied keys of the same name,
+whether the class is locked (its names cached) or not; classes with a
+'__getattr__' of their own always get the old lookup; and children a lazy
+'lockdown()' has yet to do are settled before they are handed out.
+'''
+
+import unittest
+
+from support import load_encap
+
+encap = load_encap()
+from bases import Object, Dict
+
+def getattr_reference(obj, attr):
+    "'Object.__getattribute__' before the proxy dict was read first"
+    try:
+        return object.__getattribute__(obj, attr)
+    except AttributeError:
+        pass
+    return obj.__getattr__(attr)
+
+def outcome(get, obj, attr):
+    try:
+        return get(obj, attr)
+    except AttributeError as exc:
+        return (AttributeError, exc.args)
+
+def classes():
+    "A fresh 'Object' subclass with a class attribute, a method and a property"
+    class Shadowing(Object):
+        kind = 'class'
+        def method(self):
+            return 'method'
+        @property
+        def prop(self):
+            return 'property'
+    return Shadowing
+
+class ObjectAttrsTest(unittest.TestCase):
+    def check(self, obj, names):
+        for attr in names:
+            self.assertEqual(outcome(getattr, obj, attr),
+                             outcome(getattr_reference, obj, attr), attr)
+
+    def shadowed(self):
+        obj = classes()()
+        obj.data = 1
+        for attr in [ 'kind', 'method', 'prop', 'lock', '__repr__' ]:
+            obj.__proxydict__.store[attr] = 'proxied'
+        return obj
+
+    def test_proxied(self):
+        obj = Object()
+        obj.a, obj.b = 1, None
+        self.check(obj, [ 'a', 'b', 'missing', '__class__', 'lock' ])
+        self.assertEqual((obj.a, obj.b), (1, None))
+        with self.assertRaises(AttributeError) as caught:
+            obj.missing
+        self.assertEqual(caught.exception.args, ('missing',))
+
+    def test_class_shadows_proxied(self):
+        names = [ 'data', 'kind', 'method', 'prop', 'lock', '__repr__' ]
+        obj = self.shadowed()
+        self.check(obj, names)
+        self.assertEqual((obj.kind, obj.method(), obj.prop),
+                         ('class', 'method', 'property'))
+        type(obj).lockclass()           # names now cached for the class
+        self.check(obj, names)
+        self.assertEqual((obj.kind, obj.method(), obj.prop),
+                         ('class', 'method', 'property'))
+        obj.lockdown(encap.makeapi)
+        self.check(obj, names)
+        self.assertEqual((obj.data, obj.kind), (1, 'class'))
+
+    def test_own_getattr(self):
+        class Fallback(Object):
+            def __getattr__(self, attr):
+                if attr == '__proxydict__':
+                    raise AttributeError(attr)
+                return f'fallback {attr}'
+        obj = Fallback()
+        obj.__proxydict__.store['a'] = 1
+        self.check(obj, [ 'a', 'missing' ])
+        self.assertEqual((obj.a, obj.missing), ('fallback a',
+                                                'fallback missing'))
+
+    def test_uninitialized(self):
+        obj = object.__new__(Object)
+        self.check(obj, [ 'a', '__proxydict__' ])
+
+    def test_pending(self):
+        for lazy in [ False, True ]:
+            obj = Object()
+            obj.child, obj.inner, obj.n = Dict({ 'k': 1 }), Object(), 2
+            obj.lockdown(encap.makeapi, lazy)
+            child = obj.child
+            self.assertNotIsInstance(child, Dict)
+            self.assertIs(obj.child, child)
+            self.assertEqual((child['k'], obj.n), (1, 2))
+            self.assertNotIsInstance(obj.inner.__proxydict__, Dict)
+            with self.assertRaises(RuntimeError):
+                obj.inner.x = 1
+
+if __name__ == '__main__':
+    unittest.main()
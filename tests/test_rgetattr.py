@@ -0,0 +1,334 @@
+'''
+'Rgetattr' against the implementation it replaced - a chain of comparisons
+and value checks run on every access, with no cache of result types: over
+functions, closures and cells, code, frames, generators, globals, weakref
+proxies, objects spoofing '__class__' or '__eq__', and with the cache of
+safe result types cold, warm, and primed by harmless results of the types
+that dangerous ones have.  Nothing may be returned that used to be blocked,
+or the other way round.
+'''
+
+import sys, types, weakref, unittest
+
+from support import load_encap
+
+encap = load_encap()
+makeapi = encap.makeapi
+
+def Rgetattr_reference(builtins, obj, attr, *argv, binder=None):
+    if binder == None:
+        result = getattr(obj, attr, *argv)
+    elif isinstance(binder.__getattribute__, types.MethodType) or\
+         isinstance(binder.__getattribute__, types.MethodWrapperType):
+        result = binder.__getattribute__(attr)
+    else:
+        result = binder.__getattribute__(obj, attr)
+
+    def bind(func):
+        if binder == None or\
+           not isinstance(binder.__getattribute__, types.MethodType):
+            return func
+        # bind to obj
+        return types.MethodType(func, obj)
+    if attr == '__subclasses__':
+        return makeapi("fn = lambda : []")
+    if attr == '__getattribute__':
+        return bind(builtins['getattr'])
+    if attr == '__setattr__':
+        return bind(builtins['setattr'])
+    if attr == '__delattr__':
+        return bind(builtins['delattr'])
+
+    if attr == 'format' and\
+       (str.format == obj.format or str.format.__get__(obj) == obj.format):
+        return bind(builtins['safe_format'])
+    if attr == 'format_map' and\
+       (str.format_map == obj.format_map or\
+        str.format_map.__get__(obj) == obj.format_map):
+        return bind(builtins['safe_format_map'])
+
+    if result == type:
+        raise RuntimeError(f"access to {type} blocked!")
+    if result == vars(encap):           # the host's 'globals()'
+        raise RuntimeError("access to '__main__.globals()' blocked!")
+    if isinstance(result, types.CodeType):
+        raise RuntimeError(f"access to {types.CodeType} blocked!")
+    if isinstance(result, types.CellType):
+        raise RuntimeError("access to 'cell' type blocked!")
+    if isinstance(result, types.FrameType):
+        raise RuntimeError(f"access to {types.FrameType} blocked!")
+    if (isinstance(result, list) or isinstance(result, tuple)) and\
+       len(result) > 0:
+        if isinstance(result[0], types.CellType):
+            raise RuntimeError("access to 'cell' type blocked!")
+
+    return result
+
+
+class Plain:
+    def __init__(self):
+        self.n = 1
+        self.s = 'abc'
+        self.t = (1, 2)
+        self.l = [ 1 ]
+        self.empty = ()
+    def method(self):
+        return self.n
+
+class Always:
+    "Equal to anything - 'result == type' holds for it"
+    def __eq__(self, other):
+        return True
+    __hash__ = object.__hash__
+
+class Never:
+    "Equal to nothing, and refusing to be compared with some things"
+    def __eq__(self, other):
+        if isinstance(other, dict):
+            raise TypeError('no comparing')
+        return False
+    __hash__ = object.__hash__
+
+class Spoof:
+    "Claims to be of another class - 'isinstance()' goes by '__class__'"
+    def __init__(self, cls):
+        self.cls = cls
+    @property
+    def __class__(self):
+        return self.cls
+
+class Formats:
+    "A 'format' that is not 'str.format', and one that is"
+    def __init__(self):
+        self.format = str.format
+        self.format_map = 'not a method'
+
+class Holder:
+    "Attributes holding the dangerous values themselves"
+
+class Str(str):
+    "An attribute name comparing equal to another one"
+    def __eq__(self, other):
+        return str(self) == other or other == '__subclasses__'
+    __hash__ = str.__hash__
+
+def closure():
+    x = [ 1 ]
+    def inner():
+        return x
+    return inner
+
+def generator():
+    yield sys._getframe()
+
+async def coroutine():
+    pass
+
+async def async_generator():
+    yield 1
+
+def corpus():
+    "(object, attribute name, extra arguments, binder) to look up"
+    frame = sys._getframe()
+    fn = closure()
+    gen = generator()
+    next(gen)
+    coro = coroutine()
+    agen = async_generator()
+    try:
+        raise ValueError('tb')
+    except ValueError as exc:
+        tb = exc.__traceback__
+
+    holder = Holder()
+    holder.code = fn.__code__
+    holder.cell = fn.__closure__[0]
+    holder.cells = list(fn.__closure__)
+    holder.late_cells = (1,) + fn.__closure__
+    holder.frame = frame
+    holder.host_globals = vars(encap)
+    holder.copied_globals = dict(vars(encap))
+    holder.type = type
+    holder.always = Always()
+    holder.never = Never()
+    holder.code_spoof = Spoof(types.CodeType)
+    holder.cell_spoof = Spoof(types.CellType)
+    holder.frame_spoof = Spoof(types.FrameType)
+    holder.list_spoof = Spoof(list)
+    holder.int_spoof = Spoof(int)
+    holder.number = 5
+    holder.proxy_int = weakref.proxy(Plain())   # collected: raises on use
+    plain = Plain()
+    holder.keep = plain
+    holder.proxy = weakref.proxy(plain)
+    holder.callable_proxy = weakref.proxy(fn)
+    holder.ref = weakref.ref(plain)
+    holder.alias = list[int]
+    holder.code_alias = types.GenericAlias(types.CodeType, (int,))
+    holder.class_dict = Plain.__dict__
+    holder.metaclass = type(Plain)
+
+    pairs = []
+    def add(obj, names, *argv, binder=None):
+        pairs.extend((obj, name, argv, binder) for name in names)
+
+    function_attrs = [ '__code__', '__closure__', '__globals__',
+                       '__defaults__', '__kwdefaults__', '__name__',
+                       '__qualname__', '__dict__', '__call__', '__get__',
+                       '__module__', '__builtins__', '__class__',
+                       '__subclasses__', '__getattribute__', '__setattr__',
+                       '__delattr__', '__reduce__' ]
+    add(fn, function_attrs)
+    add(closure, function_attrs)
+    add(encap.Rgetattr, function_attrs)
+    add(fn.__closure__[0], [ 'cell_contents', '__class__' ])
+    add(fn.__code__, [ 'co_consts', 'co_code', 'co_names', 'replace',
+                       'co_filename', '__class__' ])
+    add(frame, [ 'f_globals', 'f_locals', 'f_back', 'f_code', 'f_builtins',
+                 'f_lineno', 'clear' ])
+    add(tb, [ 'tb_frame', 'tb_next', 'tb_lineno' ])
+    add(gen, [ 'gi_frame', 'gi_code', 'gi_running', 'gi_yieldfrom', 'send',
+               'throw', '__next__' ])
+    add(coro, [ 'cr_frame', 'cr_code', 'cr_await', 'send' ])
+    add(agen, [ 'ag_frame', 'ag_code', 'asend' ])
+    add(holder, [ name for name in vars(holder) ])
+    add(holder, [ 'missing' ], None)
+    add(holder, [ 'missing' ], type)
+    add(plain, [ 'n', 's', 't', 'l', 'empty', 'method', '__class__',
+                 '__dict__', '__getattribute__', '__setattr__',
+                 '__delattr__', '__subclasses__', '__init__' ])
+    add(plain.method, [ '__func__', '__self__', '__code__' ])
+    add(holder.proxy, [ 'n', 's', 't', 'method', '__class__', '__dict__',
+                        '__init__' ])
+    add(holder.callable_proxy, [ '__code__', '__closure__', '__globals__',
+                                 '__class__', '__name__' ])
+    add(holder.alias, [ '__origin__', '__args__', '__class__', 'mro' ])
+    add(holder.code_alias, [ '__origin__', '__class__', '__args__' ])
+    add(holder.class_dict, [ 'get', 'copy', '__class__', 'items' ])
+    add(Plain, [ '__class__', '__mro__', '__bases__', '__dict__',
+                 '__subclasses__', '__init__', 'method' ])
+    add(type, [ '__class__', '__subclasses__', 'mro', '__call__',
+                '__base__' ])
+    add(int, [ '__class__', '__subclasses__', 'real', 'from_bytes' ])
+    add('abc', [ 'format', 'format_map', 'upper', '__class__' ])
+    add(Formats(), [ 'format', 'format_map' ])
+    add(5, [ 'real', 'bit_length', '__class__' ])
+    add(holder.always, [ '__class__', '__eq__', '__dict__' ])
+    add(holder.code_spoof, [ '__class__', 'cls' ])
+    add(vars(encap), [ 'get', 'copy', '__class__' ])
+    add(encap, [ 'Rgetattr', 'gSafeResultTypes', '__dict__', '__loader__' ])
+    add(holder, [ Str('number'), Str('code'), Str('__getattribute__') ])
+    # '__getattribute__' calls: bound, and through the class
+    add(plain, [ 'n', 't', '__class__', '__dict__', '__getattribute__',
+                 '__setattr__' ], binder=plain)
+    add(plain, [ 'n', 't', '__class__', '__getattribute__' ], binder=Plain)
+    add(holder, [ 'code', 'cells', 'frame', 'host_globals', 'always',
+                  'code_spoof', 'proxy', 'alias' ], binder=holder)
+    add(holder, [ 'code', 'cells', 'always' ], binder=object)
+    add(fn, [ '__code__', '__closure__', '__globals__' ], binder=fn)
+    add('abc', [ 'format', 'upper' ], binder='abc')
+    add('abc', [ 'format' ], binder=str)
+    return pairs, (gen, coro, agen)
+
+def outcome(fn, builtins, obj, attr, argv, binder):
+    "What looking up 'attr' gives: ('value', result) or ('raised', exception)"
+    try:
+        return ('value', fn(builtins, obj, attr, *argv, binder=binder))
+    except BaseException as exc:
+        return ('raised', exc)
+
+def describe(outcome):
+    kind, value = outcome
+    try:
+        text = repr(value)
+    except Exception:
+        text = object.__repr__(value)
+    return f'{kind} {type(value).__name__} {text:.100}'
+
+def same(a, b):
+    "Whether two outcomes agree"
+    (kind_a, a), (kind_b, b) = a, b
+    if kind_a != kind_b or type(a) != type(b):
+        return False
+    if kind_a == 'raised':
+        return str(a) == str(b)
+    if a is b:
+        return True
+    if type(a) == types.FunctionType:   # e.g. the new '__subclasses__'
+        return a.__code__ == b.__code__
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
+
+class RgetattrTest(unittest.TestCase):
+    def setUp(self):
+        g = encap.Globals({ '__builtins__': encap.gBuiltIns.copy(),
+                            '__name__': 'test' })
+        encap.cauterize(g)
+        self.builtins = g['__builtins__']
+        self.pairs, self.pending = corpus()
+        encap.gSafeResultTypes.clear()
+
+    def tearDown(self):
+        gen, coro, agen = self.pending
+        coro.close()                    # never awaited
+
+    def compare(self, pairs):
+        for obj, attr, argv, binder in pairs:
+            new = outcome(encap.Rgetattr, self.builtins, obj, attr, argv,
+                          binder)
+            old = outcome(Rgetattr_reference, self.builtins, obj, attr, argv,
+                          binder)
+            self.assertTrue(same(new, old),
+                            f'{type(obj).__name__}.{attr} (binder ' +
+                            f'{type(binder).__name__}): {describe(new)} ' +
+                            f'!= {describe(old)}')
+
+    def test_cold_and_warm(self):
+        for _ in range(3):
+            self.compare(self.pairs)
+        self.assertTrue(encap.gSafeResultTypes)     # the cache was used
+
+    def test_reversed(self):
+        "Dangerous results first, then the harmless ones of their types"
+        self.compare(reversed(self.pairs))
+        self.compare(self.pairs)
+
+    def test_cache_poisoning(self):
+        "A harmless result of a type must not let a dangerous one through"
+        code_spoof = Spoof(types.CodeType)
+        keep = Plain()
+        for harmless, dangerous, blocked in [
+                (weakref.proxy(keep), weakref.proxy(code_spoof), True),
+                (list[int], types.GenericAlias(types.CodeType, (int,)), False),
+                (Plain.__dict__, vars(encap), True),
+                ((1, 2), closure().__closure__, True),
+                ([ 1 ], list(closure().__closure__), True),
+                (5, Always(), True),
+                (Never(), Always(), True),
+                (Spoof(int), code_spoof, True) ]:
+            holder = Holder()
+            holder.value = harmless
+            pairs = [ (holder, 'value', (), None) ]
+            self.compare(pairs * 2)
+            holder.value = dangerous
+            self.compare(pairs)
+            kind, _ = outcome(encap.Rgetattr, self.builtins, holder, 'value',
+                              (), None)
+            self.assertEqual(kind, 'raised' if blocked else 'value',
+                             describe(('value', dangerous)))
+
+    def test_proxy_to_code(self):
+        "A weakref proxy forwards '__class__' - its type must not be cached"
+        plain = Plain()
+        holder = Holder()
+        holder.value = weakref.proxy(plain)
+        pairs = [ (holder, 'value', (), None) ]
+        self.compare(pairs * 2)
+        self.assertNotIn(id(weakref.ProxyType), encap.gSafeResultTypes)
+        for cls in (types.CodeType, types.CellType, types.FrameType):
+            self.assertNotIn(id(cls), encap.gSafeResultTypes)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+'''
+Sandboxed 'super()' ('encap.Rsuper'): hidden bases are skipped, writes
+through the proxy to 'Object' instances are guarded by their lock, and
+'super().__getattribute__' reads as before.  What a proxy stands for is
+held in a slot only its type's methods can read.
+'''
+
+import unittest
+
+from support import load_encap
+
+encap = load_encap()
+import bases
+
+HIDDEN = '''
+class Base:
+    def who(self):
+        return 'base'
+class Hidden(Base):
+    def who(self):
+        return 'hidden'
+class C(Hidden, metaclass=hidebases((Hidden,))):
+    def who(self):
+        return super().who()
+r = (C().who(), C.__bases__, [ k.__name__ for k in C.__mro__ ])
+'''
+
+GUARDED = '''
+class P(Object):
+    def __init__(self):
+        super().__init__()
+        super().__setattr__('x', 1)
+    def set(self, k, v):
+        super().__setattr__(k, v)
+    def drop(self, k):
+        super().__delattr__(k)
+p = P()
+p.set('y', 2)
+p.drop('x')
+r = [ p.y, hasattr(p, 'x') ]
+p.lock()
+for step in [ lambda: p.set('z', 3), lambda: p.drop('y') ]:
+    try:
+        step()
+        r.append('changed')
+    except:
+        r.append('locked')
+'''
+
+UNBOUND = '''
+class Q(Object):
+    pass
+q = Q()
+super(Q, Q).__setattr__(q, 'a', 1)
+r = [ q.a ]
+for t in [ 1, q.lock() ]:
+    try:
+        super(Q, Q).__setattr__(t, 'b', 2)
+        r.append('changed')
+    except:
+        r.append('refused')
+'''
+
+GETATTRIBUTE = '''
+class A:
+    def __init__(self):
+        self.v = 1
+    def which(self):
+        return 'A'
+class B(A):
+    def which(self):
+        return 'B'
+    def get(self, k):
+        return super().__getattribute__(k)
+b = B()
+r = (b.get('v'), b.get('which')(), super(B, B).__getattribute__(b, 'which')())
+'''
+
+class RsuperTest(unittest.TestCase):
+    def run_sandbox(self, source):
+        sandbox = encap.Sandbox.create()
+        res = sandbox.run(source)
+        self.assertEqual(res.error, None)
+        return sandbox.locals['r']
+
+    def test_hidden_bases(self):
+        self.assertEqual(self.run_sandbox(HIDDEN),
+                         ('base', (object,), [ 'C', 'Base', 'object' ]))
+
+    def test_guarded(self):
+        self.assertEqual(self.run_sandbox(GUARDED),
+                         [ 2, False, 'locked', 'locked' ])
+        self.assertEqual(self.run_sandbox(UNBOUND), [ 1, 'refused', 'refused' ])
+
+    def test_getattribute(self):
+        # it reads as the sandbox's 'getattr()' of the instance does
+        self.assertEqual(self.run_sandbox(GETATTRIBUTE), (1, 'B', 'B'))
+
+    def test_state_hidden(self):
+        proxy = encap.Rsuper({}, int, 1)
+        self.assertNotIn('__super_state__', vars(type(proxy)))
+        self.assertIs(type(proxy), type(encap.Rsuper({}, str, 'x')))
+        for cell in type(proxy).__getattribute__.__closure__:
+            self.assertNotIsInstance(cell.cell_contents,
+                                     (dict, bases.StateTable, bases.Dict))
+        sandbox = encap.Sandbox.create()
+        self.assertNotEqual(sandbox.run('super(int, 1).__super_state__').error,
+                            None)
+
+if __name__ == '__main__':
+    unittest.main()
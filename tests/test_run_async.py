@@ -0,0 +1,74 @@
+'''
+'Sandbox.run_async()': a run past its deadline is stopped and reported with
+a 'TimeoutError', as is one whose task is cancelled, and the sandbox goes on
+running the next ones; runs of several sandboxes share the event loop.  The
+interruption never outlives its run - to hit the next one, or the thread
+that runs them.
+'''
+
+import asyncio, unittest
+
+from support import load_encap
+
+encap = load_encap()
+
+SPIN = 'while True:\n    pass\n'
+STUBBORN = '''
+try:
+    while True:
+        pass
+except:
+    while True:
+        pass
+'''
+
+class RunAsyncTest(unittest.TestCase):
+    def run_loop(self, main):
+        return asyncio.run(asyncio.wait_for(main(), 60))
+
+    def test_deadline(self):
+        sandbox = encap.Sandbox.create(n=6)
+        async def main():
+            for source in [ SPIN, STUBBORN ]:
+                res = await sandbox.run_async(source, timeout=0.2)
+                self.assertIsInstance(res.error, TimeoutError)
+                self.assertEqual((await sandbox.run_async('n * 7')).value, 42)
+        self.run_loop(main)
+
+    def test_cancel(self):
+        sandbox = encap.Sandbox.create()
+        async def main():
+            task = asyncio.create_task(sandbox.run_async(SPIN))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            res = await sandbox.run_async('x = 1\nx += 1')
+            self.assertEqual(res.error, None)
+            self.assertEqual((await sandbox.run_async('x')).value, 2)
+        self.run_loop(main)
+
+    def test_gather(self):
+        sandboxes = [ encap.Sandbox.create(n=n) for n in range(4) ]
+        async def main():
+            return await asyncio.gather(
+                sandboxes[0].run_async(SPIN, timeout=0.5),
+                *[ sandbox.run_async('n * n') for sandbox in sandboxes[1:] ])
+        spun, *results = self.run_loop(main)
+        self.assertIsInstance(spun.error, TimeoutError)
+        self.assertEqual([ res.value for res in results ], [ 1, 4, 9 ])
+
+    def test_deadline_at_the_end(self):
+        # deadlines about when runs end: the interruption must go off in
+        # the run or nowhere
+        sandbox = encap.Sandbox.create()
+        async def main():
+            for i in range(200):
+                await sandbox.run_async('for i in range(2000):\n    pass\n',
+                                        timeout=0.0001 * (i % 10))
+                res = await asyncio.wait_for(sandbox.run_async('1'), 10)
+                self.assertEqual((res.value, res.error), (1, None))
+        self.run_loop(main)
+
+if __name__ == '__main__':
+    unittest.main()
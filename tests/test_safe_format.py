@@ -0,0 +1,94 @@
+'''
+'str.format' and 'str.format_map' in the sandbox ('Rsafe_format'): a
+template none of whose fields looks up an attribute is handed to
+'str.format' itself, with the same result; any attribute lookup - in a
+nested format spec too, however the method is reached - goes through
+'SafeFormatter' and so through 'Rgetattr', never the native lookup.
+'''
+
+import re, unittest
+
+from support import load_encap
+
+encap = load_encap()
+
+NATIVE = [
+    ('{} and {}', (1, 'two'), {}),
+    ('{1}{0}{1}', ('a', 'b'), {}),
+    ('{0[1]}/{x[k]}', ([ 4, 5 ],), { 'x': { 'k': 'v' } }),
+    ('{0!r:>8}|{0!s:<4}|{0!a}', ('é',), {}),
+    ('{x:{w}.{p}f}', (), { 'x': 3.14159, 'w': 8, 'p': 2 }),
+    ('{{}} {:,}', (1234567,), {}),
+]
+
+class FormatTemplateTest(unittest.TestCase):
+    def test_native(self):
+        for fmt, native in [ ('{0} {x} {0[a]}', True),
+                             ('{0:{1}}', True),
+                             ('{0.real}', False),
+                             ('{0[a].real}', False),
+                             ('{0:{1.real}}', False),
+                             ('{0:{1:{2.real}}}', False) ]:
+            self.assertEqual(encap.FormatTemplate(fmt)[1], native, fmt)
+        self.assertEqual(encap.FormatTemplate('{0'), None)
+        self.assertEqual(encap.FormatTemplate(b'{0}'), None)
+
+class SafeFormatTest(unittest.TestCase):
+    def setUp(self):
+        self.sandbox = encap.Sandbox.create()
+
+    def run_value(self, source, **params):
+        self.sandbox.locals.update(params)
+        res = self.sandbox.run(source)
+        if res.error != None:
+            raise res.error
+        return res.value
+
+    def test_native_like_str_format(self):
+        for fmt, args, kwargs in NATIVE:
+            expected = fmt.format(*args, **kwargs)
+            got = [ self.run_value('fmt.format(*args, **kwargs)', fmt=fmt,
+                                   args=args, kwargs=kwargs),
+                    self.run_value('str.format(fmt, *args, **kwargs)') ]
+            if not args:
+                got.append(self.run_value('fmt.format_map(kwargs)'))
+            self.assertEqual(got, [ expected ] * len(got), fmt)
+
+    def test_attribute_fields(self):
+        self.assertEqual(self.run_value('"{0.real}".format(5)'), '5')
+        self.assertEqual(self.run_value('"{0.__class__}".format(1)'),
+                         "<class 'int'>")
+        reaches = [ '"{0.__class__.__subclasses__}".format(1)',
+                    'str.format("{0.__class__.__subclasses__}", 1)',
+                    '"{x.__class__.__subclasses__}".format_map({ "x": 1 })',
+                    '"{0[0].__class__.__subclasses__}".format([ 1 ])' ]
+        for source in reaches:
+            # 'Rgetattr' replaces it; the native lookup gives the real method
+            self.assertIn('<lambda>', self.run_value(source), source)
+        with self.assertRaisesRegex(ValueError, '<lambda>'):
+            self.run_value('"{0:{1.__class__.__subclasses__}}".format("", 1)')
+
+    def test_denied(self):
+        for source, blocked in [
+                ('"{0.__call__.__func__.__globals__}".format(getattr)',
+                 "'__main__.globals()'"),
+                ('"{0:{1.__call__.__func__.__globals__}}".format("", getattr)',
+                 "'__main__.globals()'"),
+                ('"{f.__code__}".format_map({ "f": lambda: 0 })', 'code'),
+                ('"{0.gi_frame}".format(i for i in [])', 'frame') ]:
+            blocked = 'access to .*' + re.escape(blocked)
+            with self.assertRaisesRegex(RuntimeError, blocked, msg=source):
+                self.run_value(source)
+
+    def test_native_template_reused(self):
+        # a template cached as native by one sandbox stays native elsewhere,
+        # and one with attribute fields does not become native
+        self.run_value('"{0}".format(1)')
+        self.run_value('"{0.__class__.__subclasses__}".format(1)')
+        other = encap.Sandbox.create()
+        self.assertEqual(other.run('"{0}".format(2)').value, '2')
+        self.assertIn('<lambda>', other.run('"{0.__class__.__subclasses__}"'
+                                            '.format(2)').value)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+'''
+'Sandbox.run()': an expression gives its value, statements None (their
+names land in the sandbox's locals), and errors come back in the result.
+Statements are parsed once per run, not tried as an expression first each
+time.
+'''
+
+import unittest
+from unittest import mock
+
+from support import load_encap
+
+encap = load_encap()
+
+class SandboxRunTest(unittest.TestCase):
+    def test_results(self):
+        sandbox = encap.Sandbox.create(n=3)
+        self.assertEqual(sandbox.run('n * 2').value, 6)
+        res = sandbox.run('m = n + 1\nk = m * 2')
+        self.assertEqual((res.value, res.error), (None, None))
+        self.assertEqual(sandbox.locals['k'], 8)
+        self.assertIsInstance(sandbox.run('1 / 0').error, ZeroDivisionError)
+        self.assertIsInstance(sandbox.run('x = (').error, SyntaxError)
+
+    def test_statements_compiled_once(self):
+        source = 'total = 0\nfor i in range(4):\n    total += i\n'
+        sandbox = encap.Sandbox.create()
+        sandbox.run(source)
+        with mock.patch.object(encap, 'Rcompile',
+                               wraps=encap.Rcompile) as compiled:
+            for _ in range(3):
+                self.assertEqual(sandbox.run(source).error, None)
+        self.assertEqual([ call.args[1] for call in compiled.call_args_list ],
+                         [ 'exec' ] * 3)
+        self.assertEqual(sandbox.locals['total'], 6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+'''
+The sandbox daemon ('sandboxd.Daemon'), run in a process of its own: every
+request gets a reply - over-long, malformed or failing in an unexpected way
+- and the connection carries on; tenants that are not configured share a
+queue; signals meant for a worker stay with it; and a job the pool refuses
+fails without holding on to a worker's place.
+'''
+
+import os, sys, json, time, socket, signal, shutil, tempfile
+import asyncio, subprocess, unittest
+
+from support import ROOT
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+from sandboxd import Client, Daemon, gDecoder
+from workerpool import WorkerPool
+
+MAX_REQUEST = 4096
+DAEMON = f'''
+import sys, asyncio
+sys.path.insert(0, {ROOT!r})
+from sandboxd import Daemon
+daemon = Daemon(sys.argv[1], {{ 'gold': (0, None) }}, workers=1, max_jobs=1,
+                max_request={MAX_REQUEST})
+try:
+    asyncio.run(daemon.serve())
+except asyncio.CancelledError:
+    pass
+'''
+
+class DaemonTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.tmp, 'sandboxd.sock')
+        cls.daemon = subprocess.Popen([ sys.executable, '-c', DAEMON,
+                                        cls.path ],
+                                      cwd=os.path.join(ROOT, 'run'))
+        deadline = time.monotonic() + 30
+        while not os.path.exists(cls.path):
+            if time.monotonic() > deadline or cls.daemon.poll() != None:
+                raise RuntimeError('the daemon did not start')
+            time.sleep(0.05)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.daemon.send_signal(signal.SIGTERM)
+        cls.daemon.wait(timeout=30)
+        shutil.rmtree(cls.tmp)
+
+    def exchange(self, *lines):
+        "Replies to 'lines', sent at once on one connection, None 'id' first"
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(30)
+            sock.connect(self.path)
+            sock.sendall(b''.join(line + b'\n' for line in lines))
+            with sock.makefile('rb') as replies:
+                got = [ gDecoder.decode(replies.readline().decode())
+                        for _ in lines ]
+        return sorted(got, key=lambda reply: (reply['id'] != None,
+                                              str(reply['id'])))
+
+    def test_too_long(self):
+        source = 'x = ' + '1 + ' * MAX_REQUEST + '1'
+        long, short = [ json.dumps({ 'id': i, 'source': s }).encode()
+                        for i, s in [ (1, source), (2, '6 * 7') ] ]
+        for lines in [ (long, short), (short, long) ]:
+            first, second = self.exchange(*lines)
+            self.assertEqual(first['id'], None)
+            self.assertTrue(first['error'].startswith('ValueError: request' +
+                                                      ' longer'), first)
+            self.assertEqual((second['id'], second['value']), (2, 42))
+
+    def test_unexpected_error(self):
+        # deeper than the decoder can go, though not too long
+        nested = b'{ "n": ' + b'[' * 2000 + b']' * 2000 + b' }'
+        failed, after = self.exchange(nested, b'{ "id": 2, "source": "1" }')
+        self.assertEqual(failed['id'], None)
+        self.assertTrue(failed['error'].startswith('RecursionError'), failed)
+        self.assertEqual((after['id'], after['value']), (2, 1))
+
+    def test_tenants(self):
+        with Client(self.path) as client:
+            for i in range(5):
+                self.assertEqual(client.run('1', tenant=f'name-{i}')['value'],
+                                 1)
+            self.assertEqual(client.run('1', tenant='gold')['value'], 1)
+            tenants = client.stats()['tenants']
+        self.assertEqual(sorted(tenants), [ '*', 'gold' ])
+        self.assertEqual(tenants['gold']['priority'], 0)
+
+    @unittest.skipUnless(os.path.exists(f'/proc/{os.getpid()}/task'),
+                         'needs /proc')
+    def test_worker_signal(self):
+        with Client(self.path) as client:
+            self.assertEqual(client.run('1')['value'], 1)   # it is replaced
+            time.sleep(0.5)
+            for worker in self.workers():
+                os.kill(worker, signal.SIGTERM)
+            time.sleep(0.5)
+            self.assertEqual(self.daemon.poll(), None)
+            self.assertEqual(client.run('2')['value'], 2)
+
+    def workers(self):
+        "Pids of the daemon's workers, started by any of its threads"
+        pids = []
+        tasks = f'/proc/{self.daemon.pid}/task'
+        for task in os.listdir(tasks):
+            with open(f'{tasks}/{task}/children') as f:
+                pids += [ int(pid) for pid in f.read().split() ]
+        return [ pid for pid in pids
+                 if b'resource_tracker' not in open(f'/proc/{pid}/cmdline',
+                                                    'rb').read() ]
+
+class RefusedJobTest(unittest.TestCase):
+    def test_pool_shut_down(self):
+        daemon = Daemon('unused')
+        daemon.pool = WorkerPool(1)
+        daemon.capacity = 1
+        daemon.pool.shutdown()
+        async def main():
+            return [ await asyncio.wait_for(daemon.run({ 'source': '1' }), 10)
+                     for _ in range(2) ]
+        for reply in asyncio.run(main()):
+            self.assertTrue(reply['error'].startswith('RuntimeError: cannot'),
+                            reply)
+        self.assertEqual((daemon.running, daemon.queued, daemon.failed),
+                         (0, 0, 2))
+
+if __name__ == '__main__':
+    unittest.main()
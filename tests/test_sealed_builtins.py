@@ -0,0 +1,101 @@
+'''
+The sealed '__builtins__' of sandboxed code stays read-only: no operator it
+supports hands the 'dict' behind it to sandboxed code - as a 'mappingproxy'
+did to the other operand of a comparison, '|', or through '.mapping'.
+'''
+
+import unittest
+
+from support import load_encap
+
+encap = load_encap()
+
+# each sets 'len' and 'isinstance' in the mapping it gets hold of, if it can
+TRICKS = {
+    '__eq__': '''
+class X:
+    def __eq__(self, o):
+        o['len'] = o['isinstance'] = lambda *argv: 42
+        return False
+__builtins__ == X()
+''',
+    '__ne__': '''
+class X:
+    def __ne__(self, o):
+        o['len'] = o['isinstance'] = lambda *argv: 42
+        return False
+__builtins__ != X()
+''',
+    '__or__': '''
+class X:
+    def __or__(self, o):
+        o['len'] = o['isinstance'] = lambda *argv: 42
+        return 0
+    __ror__ = __ior__ = __or__
+try:
+    __builtins__ | X()
+except:
+    pass
+X() | __builtins__
+''',
+    'ordering': '''
+class X:
+    def __lt__(self, o):
+        o['len'] = o['isinstance'] = lambda *argv: 42
+        return False
+    __le__ = __gt__ = __ge__ = __lt__
+__builtins__ < X() or __builtins__ >= X()
+''',
+    '.mapping': '''
+class X:
+    def __eq__(self, o):
+        o['len'] = o['isinstance'] = lambda *argv: 42
+        return False
+for view in [ __builtins__.keys(), __builtins__.items(),
+              __builtins__.values() ]:
+    mapping = getattr(view, 'mapping', None)
+    if mapping != None:
+        mapping == X()
+''',
+}
+
+class SealedBuiltinsTest(unittest.TestCase):
+    def assertIntact(self, sandbox):
+        self.assertEqual(sandbox.run("len('abc')").value, 3)
+        self.assertEqual(sandbox.run("isinstance('abc', int)").value, False)
+
+    def test_operators(self):
+        for name, source in TRICKS.items():
+            with self.subTest(name):
+                sandbox = encap.Sandbox.create()
+                res = sandbox.run(source)
+                self.assertIn(type(res.error), (type(None), TypeError))
+                self.assertIntact(sandbox)
+                # nor does what modules are sealed from change
+                self.assertIntact(encap.Sandbox.create())
+
+    def test_writes(self):
+        sandbox = encap.Sandbox.create()
+        for source in [ "__builtins__['len'] = None",
+                        "del __builtins__['len']",
+                        "__builtins__.update(len=None)",
+                        "__builtins__.pop('len')",
+                        "__builtins__.clear()" ]:
+            with self.subTest(source):
+                self.assertNotEqual(sandbox.run(source).error, None)
+        self.assertIntact(sandbox)
+
+    def test_reads(self):
+        sandbox = encap.Sandbox.create()
+        for source, value in [ ("__builtins__['len']('ab')", 2),
+                               ("'len' in __builtins__", True),
+                               ("__builtins__.get('nothing', 1)", 1),
+                               ("'len' in __builtins__.keys()", True),
+                               ("len(__builtins__) > 0", True),
+                               ("'len' in list(__builtins__)", True) ]:
+            with self.subTest(source):
+                res = sandbox.run(source)
+                self.assertEqual((res.value, res.error), (value, None))
+
+if __name__ == '__main__':
+    unittest.main()
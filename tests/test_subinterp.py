@@ -0,0 +1,126 @@
+'''
+Sandboxes in subinterpreters ('subinterp'): each has a GIL of its own and
+loads the C accelerators, results come back as in 'workerpool', a pool
+outlives sandboxes it cannot rebuild, and the process still exits cleanly
+once several of them have run.  Skipped before Python 3.12, where only the
+refusal is checked.
+'''
+
+import sys, subprocess, unittest
+from unittest import mock
+
+from support import ROOT
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+import subinterp
+
+def python(script: str):
+    "Runs 'script' in a fresh interpreter process from the top of the tree"
+    return subprocess.run([ sys.executable, '-c', script ], cwd=ROOT,
+                          capture_output=True, text=True, timeout=120)
+
+@unittest.skipUnless(subinterp.gSupported, 'needs Python 3.12+')
+class SubinterpreterTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.interp = subinterp.Subinterpreter()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.interp.close()
+
+    def test_result(self):
+        res = self.interp.run('[ i * i for i in range(4) ]')
+        self.assertEqual((res.value, res.error), ('[0, 1, 4, 9]', None))
+        self.assertEqual(res.worker, int(self.interp.id))
+        res = self.interp.run('1 / 0')
+        self.assertEqual(res.error, 'ZeroDivisionError: division by zero')
+
+    def test_own_gil(self):
+        if hasattr(subinterp.interpreters, 'get_config'):       # 3.13+
+            config = subinterp.interpreters.get_config(self.interp.id)
+            self.assertEqual(config.gil, 'own')
+            return
+        try:
+            import _testinternalcapi
+        except ImportError:
+            self.skipTest('needs _testinternalcapi on 3.12')
+        self.interp.execute('import _testinternalcapi\n'
+            "assert _testinternalcapi.get_interp_settings()['own_gil']")
+
+    def test_c_modules(self):
+        self.interp.execute('import json, _json, _ast\n'
+                            'assert json.scanner.c_make_scanner != None')
+        res = self.interp.run("json.loads('{\"n\": [1, 2]}')['n'][1]")
+        self.assertEqual((res.value, res.error), (2, None))
+
+    def test_pool(self):
+        sources = [ f'{n} * {n}' for n in range(8) ] + [ '1 / 0' ]
+        with subinterp.SubinterpreterPool(3) as pool:
+            results = list(pool.map(sources))
+        self.assertEqual([ r.value for r in results[:-1] ],
+                         [ n * n for n in range(8) ])
+        self.assertTrue(results[-1].error.startswith('ZeroDivisionError'))
+
+    def test_reset_fails(self):
+        real = subinterp.Subinterpreter.reset
+        resets = []
+        def reset(interp):
+            resets.append(interp.id)
+            if len(resets) == 1:
+                raise RuntimeError('cannot rebuild the sandbox')
+            real(interp)
+        with mock.patch.object(subinterp.Subinterpreter, 'reset', reset):
+            with subinterp.SubinterpreterPool(1) as pool:
+                results = [ pool.submit(f'{n} + 1').result(timeout=60)
+                            for n in range(3) ]
+        self.assertEqual([ r.value for r in results ], [ 1, 2, 3 ])
+        self.assertNotEqual(results[0].worker, results[1].worker)
+
+    def test_rebuild_fails(self):
+        real = subinterp.Subinterpreter
+        built = []
+        def build(**params):
+            built.append(1)
+            if len(built) > 1:
+                raise RuntimeError('cannot build an interpreter')
+            return real(**params)
+        with mock.patch.object(real, 'reset', side_effect=RuntimeError),\
+             mock.patch.object(subinterp, 'Subinterpreter', build):
+            pool = subinterp.SubinterpreterPool(1)
+            jobs = [ pool.submit('1') for _ in range(3) ]
+            self.assertEqual(jobs[0].result(timeout=60).value, 1)
+            for job in jobs[1:]:
+                with self.assertRaisesRegex(RuntimeError, 'no subinterp'):
+                    job.result(timeout=60)
+            with self.assertRaises(RuntimeError):
+                pool.submit('1')
+            pool.shutdown()
+
+    def test_clean_exit(self):
+        # several interpreters alive at once used to abort the process at
+        # exit, freeing state of '_datetime' (or OpenSSL) they set up
+        proc = python('import subinterp\n'
+                      'a, b = subinterp.Subinterpreter(), '
+                      'subinterp.Subinterpreter()\n'
+                      "a.run('1'); b.run('1'); a.close(); b.close()\n"
+                      'with subinterp.SubinterpreterPool(4) as pool:\n'
+                      "    list(pool.map([ '1 / 0', '1' ] * 4))\n")
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+
+class LightImportTest(unittest.TestCase):
+    def test_imports(self):
+        # the host neither runs 'encap' nor starts 'multiprocessing'
+        proc = python('import sys, subinterp\n'
+                      "print(sorted({ 'encap', 'workerpool', 'multiprocessing'"
+                      ' } & set(sys.modules)))')
+        self.assertEqual((proc.stdout, proc.stderr), ('[]\n', ''))
+
+    @unittest.skipIf(subinterp.gSupported, 'subinterpreters are supported')
+    def test_unsupported(self):
+        with self.assertRaises(RuntimeError):
+            subinterp.Subinterpreter()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+'''
+Pre-forked worker processes ('workerpool.WorkerPool'): results, and workers
+that die - running a job, idle, or before they are ready - being replaced.
+'''
+
+import os, time, signal, unittest
+
+from support import load_encap
+
+encap = load_encap()
+import workerpool
+
+class WorkerPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = workerpool.WorkerPool(2)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_result(self):
+        res = self.pool.submit('6 * 7').result(timeout=20)
+        self.assertEqual((res.value, res.error), (42, None))
+        res = self.pool.submit('1 / 0').result(timeout=20)
+        self.assertEqual(res.error, 'ZeroDivisionError: division by zero')
+
+    def test_died_running(self):
+        job = self.pool.submit('while True:\n    pass')
+        pids = []
+        while not pids:                 # until a worker has taken it
+            time.sleep(0.01)
+            with self.pool.lock:
+                pids = [ proc.pid for proc, job_id in
+                         self.pool.workers.values() if job_id != None ]
+        os.kill(pids[0], signal.SIGKILL)
+        with self.assertRaises(RuntimeError):
+            job.result(timeout=20)
+        self.assertEqual(self.pool.submit('1').result(timeout=20).value, 1)
+
+    def test_died_idle(self):
+        list(self.pool.map([ '1', '2' ]))     # both workers are ready
+        with self.pool.lock:
+            pids = [ proc.pid for proc, _ in self.pool.workers.values() ]
+        for pid in pids:
+            os.kill(pid, signal.SIGKILL)
+        time.sleep(0.5)                 # the collector notices
+        results = self.pool.map([ f'{n} * 2' for n in range(4) ])
+        self.assertEqual([ r.value for r in results ], [ 0, 2, 4, 6 ])
+        self.assertEqual(self.pool.stats()['workers'], 2)
+
+    def test_died_idle_unnoticed(self):
+        list(self.pool.map([ '1', '2' ]))
+        with self.pool.lock:            # the collector cannot notice
+            pids = [ proc.pid for proc, _ in self.pool.workers.values() ]
+            for pid in pids:
+                os.kill(pid, signal.SIGKILL)
+            for pid in pids:            # until it is a zombie
+                while not zombie(pid):
+                    time.sleep(0.01)
+            jobs = [ self.pool.submit(f'{n} * 3') for n in range(4) ]
+        self.assertEqual([ job.result(timeout=20).value for job in jobs ],
+                         [ 0, 3, 6, 9 ])
+
+    def test_start_failures(self):
+        pool = workerpool.WorkerPool(1, _CODESTORE=0)     # cannot create
+        pool.max_start_failures = 3
+        started = time.monotonic()
+        job = pool.submit('1')
+        with self.assertRaisesRegex(RuntimeError, 'fail to start'):
+            job.result(timeout=20)
+        self.assertGreater(time.monotonic() - started, 0.3)   # backed off
+        pool.shutdown()
+
+def zombie(pid: int):
+    "Whether process 'pid' has exited, though it is not waited for"
+    with open(f'/proc/{pid}/stat') as f:
+        return f.read().rsplit(')', 1)[1].split()[0] == 'Z'
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+'''
+Fork-per-request runs ('zygote.Zygote'): results, timeouts, a child that
+cannot send its result, and children that are never left behind - also
+when the caller stops reading early.
+'''
+
+import os, gc, time, signal, unittest
+
+from support import load_encap
+
+encap = load_encap()
+import zygote
+
+SPIN = "print('started', flush=True)\nwhile True:\n    pass"
+
+class BadRepr:
+    def __repr__(self):
+        raise ValueError('no repr')
+
+class ZygoteTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.zygote = zygote.Zygote(preload=('math',), bad=BadRepr())
+
+    @classmethod
+    def tearDownClass(cls):
+        gc.unfreeze()
+
+    def setUp(self):
+        # a hang fails the test instead of the whole run
+        signal.signal(signal.SIGALRM, self.hung)
+        signal.alarm(20)
+
+    def tearDown(self):
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, signal.SIG_DFL)
+
+    def hung(self, signum, frame):
+        raise TimeoutError('zygote child not stopped')
+
+    def assertReaped(self, pid):
+        with self.assertRaises(ChildProcessError):
+            os.waitpid(pid, os.WNOHANG)
+
+    def test_result(self):
+        frames = list(self.zygote.stream("print('out')"))
+        self.assertEqual(frames[0], ('output', 'out'))
+        res = self.zygote.run('math.sqrt(16)')
+        self.assertEqual((res.value, res.error), (4.0, None))
+        self.assertReaped(res.worker)
+
+    def test_timeout(self):
+        res = self.zygote.run(SPIN, timeout=0.2)
+        self.assertTrue(res.error.startswith('TimeoutError'), res.error)
+        self.assertReaped(res.worker)
+
+    def test_closed_early(self):
+        for timeout in [ None, 60 ]:
+            with self.subTest(timeout=timeout):
+                stream = self.zygote.stream(SPIN, timeout=timeout)
+                self.assertEqual(next(stream), ('output', 'started'))
+                pid = stream.gi_frame.f_locals['pid']
+                start = time.monotonic()
+                stream.close()
+                self.assertLess(time.monotonic() - start, 5)
+                self.assertReaped(pid)  # neither running nor a zombie
+
+    def test_result_not_sent(self):
+        res = self.zygote.run('bad')
+        self.assertEqual(res.value, None)
+        self.assertTrue(res.error.startswith('RuntimeError: job process'),
+                        res.error)
+        self.assertIn('ValueError: no repr', res.error)
+        self.assertReaped(res.worker)
+        self.assertEqual(self.zygote.run('1').value, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,324 @@
+'''
+A pool of pre-forked worker processes running sandboxed code concurrently.
+
+Each worker imports the sandbox host once (inherited from the parent where
+processes are forked) and keeps a ready 'encap.Sandbox': a job runs in it,
+and the next one is built before the worker asks for more work.  Jobs never
+share a sandbox.  Workers are recycled after a number of jobs, or when their
+memory grows past a limit, and replaced if they die.
+
+Nothing of a sandbox crosses the process boundary: a job's value comes back
+as itself if it is plain data, or as its 'repr()', and its error as text -
+as does what it printed, if the pool captures output.
+'''
+
+import os, time, signal, threading, resource
+import collections, contextlib, multiprocessing
+from multiprocessing import connection
+from concurrent.futures import Future
+
+import encap
+from encap import portable
+from jobs import JobResult
+
+
+def rss_kb():
+    "Peak resident set size of this process (kB)"
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+class Capture:
+    "Text stream keeping the first 'limit' characters written to it"
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.parts = []
+        self.size = self.dropped = 0
+
+    def write(self, text: str):
+        keep = text[:max(0, self.limit - self.size)]
+        if keep:
+            self.parts.append(keep)
+            self.size += len(keep)
+        self.dropped += len(text) - len(keep)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        text = ''.join(self.parts)
+        if self.dropped:
+            text += f'\n[{self.dropped} more characters dropped]'
+        return text
+
+def worker_main(conn, max_jobs: int, max_rss_growth: int, max_output: int,
+                params: dict):
+    # a forked worker inherits its parent's signal handling: an asyncio
+    # loop's SIGTERM handler would hand the signal to that loop (through its
+    # wakeup fd), stopping the parent instead of this worker
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    sandbox = encap.Sandbox.create(**params)
+    baseline = rss_kb()
+    conn.send(('ready',))
+    done = 0
+    while True:
+        job = conn.recv()
+        if job == None:                 # shut down
+            return
+        job_id, kind, payload, locals = job
+        sandbox.locals.update(locals)
+        with contextlib.ExitStack() as captured:
+            if max_output != None:
+                stdout = captured.enter_context(
+                    contextlib.redirect_stdout(Capture(max_output)))
+                stderr = captured.enter_context(
+                    contextlib.redirect_stderr(Capture(max_output)))
+            if kind == 'file':
+                res = sandbox.run_file(payload)
+            else:
+                res = sandbox.run(payload)
+        output = None if max_output == None else\
+                 (stdout.getvalue(), stderr.getvalue())
+        done += 1
+        retiring = done >= max_jobs or\
+                   (max_rss_growth != None and
+                    rss_kb() - baseline > max_rss_growth)
+        conn.send(('done', job_id, portable(res), res.elapsed, retiring,
+                   output))
+        if retiring:
+            return
+        sandbox = encap.Sandbox.create(**params)
+
+
+class WorkerPool:
+    """
+    Runs jobs on 'workers' processes (default: one per CPU).  A worker is
+    replaced after 'max_jobs' jobs, or once its peak RSS has grown by more
+    than 'max_rss_growth' kB since its first sandbox was built.  With
+    'max_output', up to that many characters of a job's standard output and
+    error are kept in its result, instead of going to the workers' own.  The
+    other parameters are those of 'encap.Sandbox.create()', for every
+    sandbox.
+
+    'submit()' and 'submit_file()' return a 'Future' of a 'JobResult'; it
+    only fails if the worker running the job dies, or if workers keep dying
+    before they are ready ('max_start_failures' times in a row - they are
+    replaced ever more slowly, up to 'max_respawn_delay' seconds apart).
+    """
+    max_start_failures = 5
+    max_respawn_delay = 10.0
+
+    def __init__(self, workers: int=None, max_jobs: int=1000,
+                 max_rss_growth: int=None, max_output: int=None, **params):
+        if type(max_jobs) != int or max_jobs < 1:
+            raise TypeError("'max_jobs' must be a positive integer")
+        methods = multiprocessing.get_all_start_methods()
+        self.context = multiprocessing.get_context(
+                           'fork' if 'fork' in methods else None)
+        if max_output != None and (type(max_output) != int or max_output < 0):
+            raise TypeError("'max_output' must be a non-negative integer")
+        self.options = (max_jobs, max_rss_growth, max_output, params)
+        self.lock = threading.RLock()       # futures call back under it
+        self.workers = {}               # connection -> [ process, job_id ]
+        self.idle = collections.deque()
+        self.starting = set()           # connections of workers not ready yet
+        self.exited = []                # processes to join, off the lock
+        self.owed = 0                   # workers to replace, after a delay
+        self.respawn_at = 0.0
+        self.start_failures = 0         # in a row
+        self.pending = collections.deque()  # (job_id, kind, payload, locals)
+        self.futures = {}               # job_id -> [ future, submitted, latency ]
+        self.next_id = 0
+        self.closing = False
+        self.started = time.monotonic()
+        self.completed = self.failed = self.recycled = 0
+        self.latencies = collections.deque(maxlen=10000)
+        for _ in range(workers or os.cpu_count() or 1):
+            self.spawn()
+        self.collector = threading.Thread(target=self.collect, daemon=True)
+        self.collector.start()
+
+    def __enter__(self):
+        return self
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self.shutdown()
+
+    def spawn(self):
+        conn, child = self.context.Pipe()
+        proc = self.context.Process(target=worker_main,
+                                    args=(child, *self.options), daemon=True)
+        proc.start()
+        child.close()
+        self.workers[conn] = [ proc, None ]
+        self.starting.add(conn)
+
+    def submit(self, source: str, locals: dict=None):
+        "Runs 'source' in a fresh sandbox, with 'locals' added to its locals"
+        return self.enqueue('source', source, locals)
+
+    def submit_file(self, path: str, locals: dict=None):
+        "Runs the script at 'path' in a fresh sandbox (see 'submit()')"
+        return self.enqueue('file', path, locals)
+
+    def map(self, sources):
+        "'JobResult's of running each of 'sources', in order"
+        futures = [ self.submit(source) for source in sources ]
+        return (future.result() for future in futures)
+
+    def enqueue(self, kind: str, payload: str, locals: dict=None):
+        if locals and any(k in ('_CODECACHE', '_CODESTORE') for k in locals):
+            raise ValueError('code caches are set for the whole pool')
+        future = Future()
+        with self.lock:
+            if self.closing:
+                raise RuntimeError('cannot submit - pool is shut down')
+            job_id = self.next_id
+            self.next_id += 1
+            self.futures[job_id] = [ future, time.monotonic(), None ]
+            self.pending.append((job_id, kind, payload, locals or {}))
+            self.dispatch()
+        return future
+
+    def dispatch(self):
+        "Hands pending jobs to idle workers (holding 'self.lock')"
+        while self.pending and self.idle:
+            conn = self.idle.popleft()
+            job = self.pending[0]
+            try:
+                conn.send(job)
+            except OSError:             # died idle, not noticed yet
+                self.retire(conn)
+                continue
+            self.pending.popleft()
+            self.workers[conn][1] = job[0]
+            entry = self.futures[job[0]]
+            entry[2] = time.monotonic() - entry[1]
+            self.latencies.append(entry[2])
+
+    def collect(self):
+        "Collector thread: takes results in, and replaces workers"
+        while True:
+            with self.lock:
+                if self.owed and time.monotonic() >= self.respawn_at:
+                    if not self.closing or self.pending:
+                        for _ in range(self.owed):
+                            self.spawn()
+                    self.owed = 0
+                exited, self.exited = self.exited, []
+                if self.closing and not self.workers and not self.pending:
+                    break
+                conns = list(self.workers)
+                sentinels = { self.workers[c][0].sentinel: c for c in conns }
+            self.join(exited)
+            for ready in connection.wait(conns + list(sentinels), timeout=0.1):
+                with self.lock:
+                    self.receive(sentinels.get(ready, ready))
+        self.join(exited)
+
+    def join(self, procs: list, timeout: float=5.0):
+        "Waits for retired workers to exit, killing those that do not"
+        for proc in procs:
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.kill()
+                proc.join()
+
+    def receive(self, conn):
+        "Handles a message from, or the exit of, the worker on 'conn'"
+        if conn not in self.workers:
+            return
+        proc, job_id = self.workers[conn]
+        try:
+            msg = conn.recv() if conn.poll() else None
+        except (EOFError, OSError):
+            msg = None
+        if msg != None and conn in self.starting:
+            self.starting.remove(conn)
+            self.start_failures = 0
+        if msg == None:
+            if proc.is_alive():
+                return
+            # died - the job it was running (if any) fails
+            self.retire(conn)
+            if job_id != None:
+                self.failed += 1
+                self.futures.pop(job_id)[0].set_exception(RuntimeError(
+                    f'worker {proc.pid} died (exit code {proc.exitcode})'))
+            return
+        if msg[0] == 'done':
+            _, job_id, (value, error), elapsed, retiring, output = msg
+            future, _, latency = self.futures.pop(job_id)
+            self.workers[conn][1] = None
+            self.completed += 1
+            future.set_result(JobResult(value, error, elapsed, latency,
+                                        proc.pid, *(output or ())))
+            if retiring:
+                self.recycled += 1
+                self.retire(conn)
+                return
+        if self.closing and not self.pending:
+            self.retire(conn, stop=True)
+            return
+        self.idle.append(conn)
+        self.dispatch()
+
+    def retire(self, conn, stop: bool=False):
+        """
+        Forgets the worker on 'conn' (telling it to exit if 'stop'), and
+        replaces it unless the pool is done - after a delay if it died before
+        it was ready
+        """
+        proc = self.workers.pop(conn)[0]
+        if conn in self.idle:           # died waiting for a job
+            self.idle.remove(conn)
+        if stop:
+            with contextlib.suppress(OSError):  # unless it is gone already
+                conn.send(None)
+        conn.close()
+        self.exited.append(proc)        # joined by the collector
+        if conn in self.starting:
+            self.starting.remove(conn)
+            self.start_failures += 1
+            if self.start_failures >= self.max_start_failures:
+                self.fail_pending(RuntimeError('workers fail to start ' +
+                                                f'(exit code {proc.exitcode})'))
+            self.owed += 1
+            delay = 0.1 * 2 ** min(self.start_failures - 1, 16)
+            self.respawn_at = time.monotonic() + min(delay,
+                                                     self.max_respawn_delay)
+        elif not self.closing or self.pending:
+            self.spawn()
+
+    def fail_pending(self, exc: Exception):
+        "Fails the jobs no worker has taken yet with 'exc'"
+        while self.pending:
+            job_id = self.pending.popleft()[0]
+            self.failed += 1
+            self.futures.pop(job_id)[0].set_exception(exc)
+
+    def stats(self):
+        "Throughput (jobs/s since the pool started) and queue latency (s)"
+        with self.lock:
+            latencies = sorted(self.latencies)
+            elapsed = time.monotonic() - self.started
+            stats = { 'workers': len(self.workers),
+                      'pending': len(self.pending),
+                      'completed': self.completed, 'failed': self.failed,
+                      'recycled': self.recycled,
+                      'throughput': self.completed / elapsed }
+        if latencies:
+            stats['latency'] = {
+                'mean': sum(latencies) / len(latencies),
+                'p50': latencies[len(latencies) // 2],
+                'p95': latencies[int(len(latencies) * 0.95)],
+                'max': latencies[-1] }
+        return stats
+
+    def shutdown(self, wait: bool=True):
+        "Stops taking jobs; workers exit once the pending ones are done"
+        with self.lock:
+            self.closing = True
+            while self.idle and not self.pending:
+                self.retire(self.idle.popleft(), stop=True)
+        if wait:
+            self.collector.join()
@@ -0,0 +1,163 @@
+'''
+Fork-per-request execution of sandboxed code from a "zygote": a process
+holding a fully initialized sandbox (wrappers, cauterized globals,
+importer, preloaded modules) whose objects have been moved out of the
+garbage collector's reach with 'gc.freeze()'.  Every job runs in a child
+forked from it, in a copy-on-write image of that sandbox - nothing a job
+does is seen by the next one - and streams its output and result back
+over a pipe, as length-prefixed pickles.
+
+The process creating a 'Zygote' is the one forked: create it in a process
+dedicated to it (e.g. a 'workerpool' worker), before starting threads.
+'''
+
+import os, sys, gc, time, random, select, signal
+import struct, pickle, contextlib
+
+import encap
+from encap import portable
+from jobs import JobResult
+
+
+gFrameHeader = struct.Struct('>I')      # length of the pickle that follows
+
+def send_frame(fd: int, obj):
+    "Writes 'obj' to 'fd' as one frame"
+    data = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+    data = gFrameHeader.pack(len(data)) + data
+    while data:
+        data = data[os.write(fd, data):]
+
+class FrameReader:
+    "Splits what is read from a pipe into frames"
+    def __init__(self, fd: int):
+        self.fd = fd
+        self.buffer = b''
+
+    def read(self):
+        "Frames completed by one read of the pipe, None at its end"
+        chunk = os.read(self.fd, 65536)
+        if not chunk:
+            return None
+        self.buffer += chunk
+        frames = []
+        while len(self.buffer) >= gFrameHeader.size:
+            size = gFrameHeader.unpack_from(self.buffer)[0]
+            end = gFrameHeader.size + size
+            if len(self.buffer) < end:
+                break
+            frames.append(pickle.loads(self.buffer[gFrameHeader.size:end]))
+            self.buffer = self.buffer[end:]
+        return frames
+
+class FrameWriter:
+    "Text stream sending what is written to it as '('output', text)' frames"
+    def __init__(self, fd: int):
+        self.fd = fd
+
+    def write(self, text: str):
+        send_frame(self.fd, ('output', text))
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+class Zygote:
+    """
+    Builds the sandbox every job starts from - 'encap.Sandbox.create(**params)'
+    - and preloads 'preload' into it: names of exported namespaces in its
+    globals (e.g. 'json') have all their attributes built, other names are
+    imported as modules.  The garbage collector then leaves all of it alone.
+    """
+    def __init__(self, preload=(), **params):
+        self.sandbox = encap.Sandbox.create(**params)
+        for name in preload:
+            ns = self.sandbox.globals.get(name)
+            if ns != None:
+                for attr in dir(ns):
+                    getattr(ns, attr)
+            else:
+                res = self.sandbox.run(f'import {name}')
+                if res.error != None:
+                    raise res.error
+        gc.collect()
+        gc.freeze()
+
+    def stream(self, source: str, timeout: float=None):
+        """
+        Runs 'source' in a forked child.  Yields '('output', text)' for what
+        it prints, then '('result', JobResult)'.  A child still running after
+        'timeout' seconds is killed.  One failing to send its result (e.g.
+        a value's 'repr()' raised) sends the error instead, and exits with
+        status 1.
+        """
+        requested = time.monotonic()
+        r, w = os.pipe()
+        pid = os.fork()
+        if pid == 0:                    # child
+            status = 1
+            try:
+                os.close(r)
+                started = time.monotonic()
+                random.seed()           # not the zygote's sequence
+                with contextlib.redirect_stdout(FrameWriter(w)):
+                    res = self.sandbox.run(source)
+                send_frame(w, ('result', portable(res), res.elapsed,
+                               started - requested))
+                status = 0
+            except BaseException as exc:    # e.g. a value's 'repr()' failed
+                with contextlib.suppress(BaseException):
+                    send_frame(w, ('error', f'{type(exc).__name__}: {exc}'))
+            finally:
+                os._exit(status)
+
+        os.close(w)
+        result = None
+        finished = False                # the child is done, or killed
+        try:
+            reader = FrameReader(r)
+            deadline = None if timeout == None else requested + timeout
+            while True:
+                wait = None if deadline == None else\
+                       max(0, deadline - time.monotonic())
+                if not select.select([ r ], [], [], wait)[0]:
+                    os.kill(pid, signal.SIGKILL)
+                    finished = True
+                    result = JobResult(None, 'TimeoutError: job killed after' +
+                                             f' {timeout} s', None, None, pid)
+                    break
+                frames = reader.read()
+                if frames == None:
+                    finished = True
+                    break
+                for frame in frames:
+                    if frame[0] == 'result':
+                        _, (value, error), elapsed, latency = frame
+                        result = JobResult(value, error, elapsed, latency, pid)
+                    elif frame[0] == 'error':
+                        result = JobResult(None, 'RuntimeError: job process' +
+                                                 f' {pid} failed: {frame[1]}',
+                                           None, None, pid)
+                    else:
+                        yield frame
+        finally:
+            os.close(r)
+            if not finished:            # closed early: it may run forever
+                os.kill(pid, signal.SIGKILL)
+            status = os.waitpid(pid, 0)[1]
+        if result == None:
+            result = JobResult(None, f'RuntimeError: job process {pid} died' +
+                                     f' (status {status})', None, None, pid)
+        yield ('result', result)
+
+    def run(self, source: str, timeout: float=None):
+        """
+        Runs 'source' in a forked child, writing what it prints to the
+        standard output.  Returns its 'JobResult'.
+        """
+        for kind, data in self.stream(source, timeout):
+            if kind == 'output':
+                sys.stdout.write(data)
+            else:
+                return data